@@ -0,0 +1,29 @@
+"""add txid to sync_log
+
+Revision ID: 0b6e3f5d8a14
+Revises: f2c8d4a6b913
+Create Date: 2025-05-12 10:22:37.418903
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b6e3f5d8a14'
+down_revision = 'f2c8d4a6b913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The existing rows are all committed: txid 0 sorts them before the new ones
+    op.add_column('sync_log', sa.Column('txid', sa.BigInteger(), server_default='0', nullable=False))
+    op.drop_index('ix_sync_log_timestamp_id', table_name='sync_log')
+    op.create_index('ix_sync_log_txid_timestamp_id', 'sync_log', ['txid', 'timestamp', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_sync_log_txid_timestamp_id', table_name='sync_log')
+    op.create_index('ix_sync_log_timestamp_id', 'sync_log', ['timestamp', 'id'], unique=False)
+    op.drop_column('sync_log', 'txid')
@@ -0,0 +1,25 @@
+"""add content_hash to pecs_translations
+
+Revision ID: 5b8e1f3c9a27
+Revises: 93cdd480f5ce
+Create Date: 2025-04-07 10:12:31.418254
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '5b8e1f3c9a27'
+down_revision = '93cdd480f5ce'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('pecs_translations', sa.Column('content_hash', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=True))
+
+
+def downgrade():
+    op.drop_column('pecs_translations', 'content_hash')
@@ -0,0 +1,25 @@
+"""cascade sync_log user delete
+
+Revision ID: 5c9d2e7f1a36
+Revises: 0b6e3f5d8a14
+Create Date: 2025-05-20 15:08:44.102375
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5c9d2e7f1a36'
+down_revision = '0b6e3f5d8a14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.drop_constraint('sync_log_user_id_fkey', 'sync_log', type_='foreignkey')
+    op.create_foreign_key('sync_log_user_id_fkey', 'sync_log', 'user', ['user_id'], ['id'], ondelete='CASCADE')
+
+
+def downgrade():
+    op.drop_constraint('sync_log_user_id_fkey', 'sync_log', type_='foreignkey')
+    op.create_foreign_key('sync_log_user_id_fkey', 'sync_log', 'user', ['user_id'], ['id'])
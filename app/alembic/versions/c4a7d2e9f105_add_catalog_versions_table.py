@@ -0,0 +1,34 @@
+"""add catalog_versions table
+
+Revision ID: c4a7d2e9f105
+Revises: 5b8e1f3c9a27
+Create Date: 2025-04-09 16:03:48.120377
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4a7d2e9f105'
+down_revision = '5b8e1f3c9a27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('catalog_versions',
+    sa.Column('name', sqlmodel.sql.sqltypes.AutoString(length=50), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.execute(
+        "INSERT INTO catalog_versions (name, version, updated_at) VALUES "
+        "('pecs', 0, timezone('utc', now())), ('categories', 0, timezone('utc', now()))"
+    )
+
+
+def downgrade():
+    op.drop_table('catalog_versions')
@@ -0,0 +1,47 @@
+"""add pecs_usage table
+
+Revision ID: e7b3a91c4d26
+Revises: c4a7d2e9f105
+Create Date: 2025-04-14 10:22:37.504118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b3a91c4d26'
+down_revision = 'c4a7d2e9f105'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('pecs_usage',
+    sa.Column('user_id', sa.Uuid(), nullable=False),
+    sa.Column('pecs_id', sa.Uuid(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('last_used_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['pecs_id'], ['pecs.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'pecs_id')
+    )
+    op.create_index('ix_pecs_usage_user_count', 'pecs_usage', ['user_id', 'count'], unique=False)
+    # Usage of the existing phrases and favorites (a favorite counts as 3 uses,
+    # see PECS_USAGE_FAVORITE_WEIGHT)
+    op.execute(
+        "INSERT INTO pecs_usage (user_id, pecs_id, count, last_used_at) "
+        "SELECT user_id, pecs_id, SUM(uses), timezone('utc', now()) FROM ("
+        " SELECT phrases.user_id, phrase_pecs.pecs_id, COUNT(*) AS uses"
+        " FROM phrase_pecs JOIN phrases ON phrases.id = phrase_pecs.phrase_id"
+        " WHERE phrases.user_id IS NOT NULL"
+        " GROUP BY phrases.user_id, phrase_pecs.pecs_id"
+        " UNION ALL"
+        " SELECT user_id, pecs_id, 3 AS uses FROM favorite_pecs"
+        ") AS uses GROUP BY user_id, pecs_id"
+    )
+
+
+def downgrade():
+    op.drop_index('ix_pecs_usage_user_count', table_name='pecs_usage')
+    op.drop_table('pecs_usage')
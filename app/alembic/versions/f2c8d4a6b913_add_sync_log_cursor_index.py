@@ -0,0 +1,23 @@
+"""add sync_log cursor index
+
+Revision ID: f2c8d4a6b913
+Revises: e7b3a91c4d26
+Create Date: 2025-04-16 09:41:12.730254
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c8d4a6b913'
+down_revision = 'e7b3a91c4d26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_sync_log_timestamp_id', 'sync_log', ['timestamp', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_sync_log_timestamp_id', table_name='sync_log')
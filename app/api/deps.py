@@ -1,14 +1,17 @@
-from collections.abc import Generator
-from typing import Annotated
+import uuid
+from collections.abc import Generator, Sized
+from typing import Annotated, Any
 
 import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
 from pydantic import ValidationError
+from sqlalchemy.orm import make_transient_to_detached
 from sqlmodel import Session
 
 from app.core import security
+from app.core.cache import TTLCache
 from app.core.config import settings
 from app.core.db import engine
 from app.models import TokenPayload, User
@@ -16,6 +19,10 @@ from app.models import TokenPayload, User
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/login/access-token"
 )
+# Same scheme, for the routes that also serve anonymous requests
+optional_oauth2 = OAuth2PasswordBearer(
+    tokenUrl=f"{settings.API_V1_STR}/login/access-token", auto_error=False
+)
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -27,13 +34,41 @@ SessionDep = Annotated[Session, Depends(get_db)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
 
+# Short-lived cache of the authenticated users, keyed by (token subject, token expiry).
+# Values are snapshots of the user columns, never instances bound to a session.
+user_cache: TTLCache[tuple[Any, ...], dict[str, Any]] = TTLCache(
+    maxsize=settings.USER_CACHE_MAX_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS, name="user"
+)
+
+
+def _user_snapshot(user: User) -> dict[str, Any]:
+    return {column.key: getattr(user, column.key) for column in User.__table__.columns}
+
+
+def _user_from_snapshot(session: Session, snapshot: dict[str, Any]) -> User:
+    # Build a fresh instance for this request and attach it to the session
+    # without a SELECT, so lazy relationships and updates keep working
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    return session.merge(user, load=False)
+
+
+def invalidate_cached_user(user_id: uuid.UUID) -> None:
+    """Drop every cached entry of a user. Call it after changing or deleting the user."""
+    user_cache.discard_where(lambda key, snapshot: snapshot["id"] == user_id)
+
+
 def get_current_user(session: SessionDep, token: TokenDep) -> User:
 
     if settings.ENVIRONMENT == "local":
         # You can either:
         # 1. Return a default user (example below)
+        snapshot = user_cache.get(("local",))
+        if snapshot is not None:
+            return _user_from_snapshot(session, snapshot)
         default_user = session.query(User).filter(User.is_superuser == True).first()
         if default_user:
+            user_cache.set(("local",), _user_snapshot(default_user))
             return default_user
        
     try:
@@ -46,9 +81,15 @@ def get_current_user(session: SessionDep, token: TokenDep) -> User:
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user = session.get(User, token_data.sub)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    cache_key = (token_data.sub, payload.get("exp"))
+    snapshot = user_cache.get(cache_key)
+    if snapshot is not None:
+        user = _user_from_snapshot(session, snapshot)
+    else:
+        user = session.get(User, token_data.sub)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        user_cache.set(cache_key, _user_snapshot(user))
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return user
@@ -57,9 +98,31 @@ def get_current_user(session: SessionDep, token: TokenDep) -> User:
 CurrentUser = Annotated[User, Depends(get_current_user)]
 
 
+def get_optional_current_user(
+    session: SessionDep, token: Annotated[str | None, Depends(optional_oauth2)]
+) -> User | None:
+    """The authenticated user, None for anonymous requests and invalid tokens."""
+    try:
+        return get_current_user(session, token or "")
+    except HTTPException:
+        return None
+
+
+OptionalCurrentUser = Annotated[User | None, Depends(get_optional_current_user)]
+
+
 def get_current_active_superuser(current_user: CurrentUser) -> User:
     if not current_user.is_superuser:
         raise HTTPException(
             status_code=403, detail="The user doesn't have enough privileges"
         )
     return current_user
+
+
+def check_bulk_size(items: Sized) -> None:
+    """Reject bulk requests with more than settings.BULK_MAX_ITEMS items."""
+    if len(items) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Too many items: at most {settings.BULK_MAX_ITEMS} are allowed per request",
+        )
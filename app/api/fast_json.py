@@ -0,0 +1,51 @@
+from functools import lru_cache
+from typing import Any, Optional
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from app.core.config import settings
+
+
+@lru_cache(maxsize=None)
+def get_adapter(response_model: Any) -> TypeAdapter:
+    # Built once per response type: the validator and serializer are compiled here
+    return TypeAdapter(response_model)
+
+
+def fast_json(content: Any, response_model: Any, response: Optional[Response] = None) -> Any:
+    """
+    Serialize the result of a route to JSON bytes in one pass.
+
+    FastAPI validates the result against the response_model, dumps it to
+    Python dicts, then encodes them with the json module. Here the result is
+    validated by a TypeAdapter built once per type and serialized directly
+    to bytes by pydantic-core. The route keeps its response_model, so the
+    OpenAPI schema does not change, and the output is the same JSON.
+
+    Args:
+        content: What the route would return (models, ORM objects, dicts)
+        response_model: The response_model of the route, e.g. List[PhraseRead]
+        response: The Response injected in the route, whose headers (set by
+            dependencies such as CatalogCache) are copied
+
+    Returns:
+        The JSON response, or content itself when FAST_JSON_RESPONSES is
+        disabled, for the usual FastAPI serialization
+
+    Usage:
+        @router.get("/", response_model=List[PhraseRead])
+        def get_all_phrases(...):
+            ...
+            return fast_json(result, List[PhraseRead])
+    """
+    if not settings.FAST_JSON_RESPONSES:
+        return content
+    adapter = get_adapter(response_model)
+    body = adapter.dump_json(adapter.validate_python(content, from_attributes=True), by_alias=True)
+    json_response = Response(content=body, media_type="application/json")
+    if response is not None:
+        json_response.headers.update(response.headers)
+        if response.status_code is not None:
+            json_response.status_code = response.status_code
+    return json_response
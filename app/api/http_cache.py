@@ -0,0 +1,119 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, Request, Response
+
+from app.api.deps import SessionDep
+from app.core.config import settings
+from app.services.catalog_version import get_catalog_versions
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/"x" and "x" are the same entity tag
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def parse_byte_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range Range header ("bytes=0-99", "bytes=100-",
+    "bytes=-100") against a body of size bytes.
+
+    Returns:
+        (first, last) byte positions, both included, or None when the header
+        cannot be served as a single range (several ranges, other unit,
+        malformed): the whole body is sent instead
+
+    Raises:
+        ValueError: The range is well formed but outside the body (416)
+    """
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+    first, dash, last = ranges.strip().partition("-")
+    if not dash or not (first or last) or not (first or "0").isdigit() or not (last or "0").isdigit():
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(size - length, 0), size - 1
+    first_byte = int(first)
+    last_byte = int(last) if last else size - 1
+    if first_byte >= size:
+        raise ValueError("Unsatisfiable range")
+    if last_byte < first_byte:
+        return None
+    return first_byte, min(last_byte, size - 1)
+
+
+def _not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+class CatalogCache:
+    """
+    Dependency adding conditional GET support to the catalog routes.
+
+    The ETag and Last-Modified headers are derived from the version counters
+    of the given catalogs, read with one small query. When the client already
+    has the current version the request ends with a 304 before the route runs,
+    so nothing is loaded or serialized.
+
+    The catalog version does not tell whether one item exists: the routes of
+    an item pass item=(model, path parameter), and for an unknown id the
+    route runs (and answers 404) instead of a 304. The item is loaded in the
+    session of the request, where the route finds it without another query.
+
+    Usage:
+        @router.get("/", dependencies=[Depends(CatalogCache("pecs"))])
+        @router.get("/{pecs_id}", dependencies=[Depends(CatalogCache("pecs", item=(PECS, "pecs_id")))])
+    """
+
+    def __init__(self, *catalogs: str, item: Optional[Tuple[Any, str]] = None) -> None:
+        self.catalogs = catalogs
+        self.item = item
+
+    def _item_exists(self, request: Request, session: SessionDep) -> bool:
+        model, param = self.item
+        try:
+            item_id = UUID(request.path_params[param])
+        except (KeyError, ValueError):
+            # Left to the validation of the route
+            return False
+        return session.get(model, item_id) is not None
+
+    def __call__(self, request: Request, response: Response, session: SessionDep) -> None:
+        if self.item is not None and not self._item_exists(request, session):
+            return
+        versions = get_catalog_versions(session, self.catalogs)
+        etag = 'W/"' + ".".join(f"{name}-{versions[name][0]}" for name in self.catalogs) + '"'
+        last_modified = max(updated_at for _, updated_at in versions.values()).replace(tzinfo=timezone.utc)
+
+        headers = {
+            "ETag": etag,
+            "Last-Modified": format_datetime(last_modified.replace(microsecond=0), usegmt=True),
+            "Cache-Control": f"public, max-age={settings.CATALOG_CACHE_MAX_AGE}",
+        }
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            not_modified = etag_matches(if_none_match, etag)
+        else:
+            if_modified_since = request.headers.get("if-modified-since")
+            not_modified = bool(if_modified_since) and _not_modified_since(if_modified_since, last_modified)
+
+        if not_modified:
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
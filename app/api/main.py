@@ -3,7 +3,7 @@ from fastapi import APIRouter
 from app.api.routes import (
     items, login, private, users, utils, posts, nomi, 
     pecs, categories, phrases, favorites, translations,
-    collections, images
+    collections, images, sync
 )
 from app.core.config import settings
 from app.api.routes import analyze
@@ -25,6 +25,7 @@ api_router.include_router(collections.router)
 api_router.include_router(favorites.router)
 api_router.include_router(translations.router)
 api_router.include_router(images.router)
+api_router.include_router(sync.router)
 
 if settings.ENVIRONMENT == "local":
     api_router.include_router(private.router)
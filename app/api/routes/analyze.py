@@ -1,26 +1,56 @@
 from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.concurrency import run_in_threadpool
 from typing import List, Dict, Any, Optional
-import json
+from uuid import UUID
 
-from app.models.analyze_models import PhraseRequest, WordRequest, PictogramResponse
+from app.models import PECS
+from app.models.analyze_models import PhraseRequest, WordRequest, PictogramResponse, NextPECSResponse
 from app.services.pictogram_search import PictogramSearch, find_id_by_name, find_pecs_by_name, create_options_list
-from app.api.deps import SessionDep
+from app.api.deps import OptionalCurrentUser, SessionDep
 from app.services.tokenizer import TextTokenizer
 from app.core.config import settings
+from app.core.log import get_logger
 from app.services.to_singolare import to_singolare
 from app.services.parola_simile import trova_parole_simili
+from app.services.embedding_index import semantic_index
+from app.services.pecs_usage import get_top_usage
+from app.services.next_pecs import next_pecs_index
+from app.services.lexicon import Lexicon, load_lexicon
 
 router = APIRouter(prefix="/analyze", tags=["analyze"])
-
-# Load pictograms data
-with open(settings.PICTOGRAMS_FILE, 'r', encoding='utf-8') as file:
-    pictograms_data = json.load(file)
+logger = get_logger(__name__)
 
 # Initialize tokenizer service (doesn't depend on pictograms file)
 tokenizer = TextTokenizer(settings.API_KEY)
 
+def _pecs_pictogram_id(pecs: PECS) -> str:
+    # Arasaac pictograms are identified by the id in their URL
+    image_url = pecs.image_url or ""
+    if "api.arasaac.org/v1/pictograms/" in image_url:
+        return image_url.split("api.arasaac.org/v1/pictograms/")[1].split("?")[0]
+    return str(pecs.id)
+
+
+def find_semantic_pictogram(db, origin: str, token: str, language: str) -> Optional[Dict[str, Any]]:
+    """
+    Pictogram closest in meaning to the token, from the local embedding index.
+    Used when there is no exact or fuzzy match, before the default pictogram.
+    """
+    for match in semantic_index.search(token, language, k=1):
+        pecs = db.get(PECS, UUID(match.pecs_id))
+        # Custom pictograms are private, even when an index lists them
+        if pecs is not None and pecs.user_id is None:
+            return {
+                "origin": origin,
+                "word": match.name,
+                "id": _pecs_pictogram_id(pecs),
+                "url": pecs.image_url,
+                "error": None
+            }
+    return None
+
 # Function to get pictograms data based on language
-def get_pictograms_data(language: Optional[str] = None):
+def get_pictograms_data(language: Optional[str] = None) -> Lexicon:
     """
     Load pictograms data for the specified language
     
@@ -28,13 +58,10 @@ def get_pictograms_data(language: Optional[str] = None):
         language: Language code (e.g., 'it', 'en', 'de')
         
     Returns:
-        Loaded pictograms data
+        Pictograms lexicon, loaded once per process
     """
     pictograms_file = settings.get_pictograms_file(language)
-    
-    # Load pictograms data
-    with open(pictograms_file, 'r', encoding='utf-8') as file:
-        return json.load(file)
+    return load_lexicon(pictograms_file)
 
 # Function to get search service based on language
 def get_search_service(language: Optional[str] = None):
@@ -54,6 +81,7 @@ def get_search_service(language: Optional[str] = None):
 async def process_phrase(
     request: PhraseRequest,
     db: SessionDep,
+    current_user: OptionalCurrentUser,
     language: Optional[str] = Query(
         None, 
         description="Language code for pictogram search", 
@@ -86,69 +114,24 @@ async def process_phrase(
         
         # Tokenize the sentence
         actual_language = language or settings.DEFAULT_LANGUAGE
-        results = tokenizer.tokenize(sentence, actual_language)
+        # Run in the threadpool: the OpenAI call must not block the event loop
+        results = await run_in_threadpool(tokenizer.tokenize, sentence, actual_language)
         
-        print("Tokenized results:", results)
+        logger.debug("phrase tokenized", language=actual_language, tokens=len(results))
         
+        # Pictograms picked most often by the user come first
+        usage = get_top_usage(db, current_user.id if current_user else None)
         pictograms = []
         
-        # If tokenizer returned a list of tokens
-        if isinstance(results, list):
-            for result in results:
-                # Check if result is a dictionary with 'token' key
-                if isinstance(result, dict) and 'token' in result:
-                    token = result['token']
-                    origin = result.get('origin', token)  # Use token as fallback if origin not present
-                    
-                    # Try to find the PECS in the database
-                    pecs = find_pecs_by_name(db, token, actual_language)
-                    
-                    if len(pecs) > 0:
-                        image_url = pecs[0]['pecs'].image_url
-                        # Extract ID from URL
-                        if "api.arasaac.org/v1/pictograms/" in image_url:
-                            pecs_id = image_url.split("api.arasaac.org/v1/pictograms/")[1].split("?")[0]
-                        else:
-                            pecs_id = str(pecs[0]['pecs'].id)
-                            
-                        pictograms.append({
-                            "origin": origin,
-                            "word": token,
-                            "id": pecs_id,
-                            "url": image_url,
-                            "error": None
-                        })
-                    else:
-                        # If not found in the database, fall back to the old method
-                        pictogram_id = find_id_by_name(token, pictograms_data)
-                        
-                        if pictogram_id:
-                            pictograms.append({
-                                "origin": origin,
-                                "word": token,
-                                "id": pictogram_id,
-                                "url": f"https://api.arasaac.org/v1/pictograms/{pictogram_id}",
-                                "error": None
-                            })
-                        else:
-                            # Use default pictogram if not found
-                            pictograms.append({
-                                "origin": origin,
-                                "word": token,
-                                "id": "3046",
-                                "url": f"https://api.arasaac.org/v1/pictograms/3046",
-                                "error": None
-                            })
-        else:
-            # Fallback to simple tokenization if the tokenizer didn't return a list
-            # This is for backward compatibility
-            tokens = str(results).replace('"', '').split()
-            
-            for token in tokens:
-                token_clean = token.strip()
+        # The tokenizer always returns a list: the local tokenizer answers for a failed call
+        for result in results:
+            # Check if result is a dictionary with 'token' key
+            if isinstance(result, dict) and 'token' in result:
+                token = result['token']
+                origin = result.get('origin', token)  # Use token as fallback if origin not present
                 
                 # Try to find the PECS in the database
-                pecs = find_pecs_by_name(db, token_clean, actual_language)
+                pecs = find_pecs_by_name(db, token, actual_language, usage=usage)
                 
                 if len(pecs) > 0:
                     image_url = pecs[0]['pecs'].image_url
@@ -159,29 +142,33 @@ async def process_phrase(
                         pecs_id = str(pecs[0]['pecs'].id)
                         
                     pictograms.append({
-                        "origin": token_clean,
-                        "word": token_clean,
+                        "origin": origin,
+                        "word": token,
                         "id": pecs_id,
                         "url": image_url,
                         "error": None
                     })
                 else:
                     # If not found in the database, fall back to the old method
-                    pictogram_id = find_id_by_name(token_clean, pictograms_data)
+                    pictogram_id = find_id_by_name(token, pictograms_data)
+                    
+                    semantic = None if pictogram_id else find_semantic_pictogram(db, origin, token, actual_language)
                     
                     if pictogram_id:
                         pictograms.append({
-                            "origin": token_clean,
-                            "word": token_clean,
+                            "origin": origin,
+                            "word": token,
                             "id": pictogram_id,
                             "url": f"https://api.arasaac.org/v1/pictograms/{pictogram_id}",
                             "error": None
                         })
+                    elif semantic:
+                        pictograms.append(semantic)
                     else:
                         # Use default pictogram if not found
                         pictograms.append({
-                            "origin": token_clean,
-                            "word": token_clean,
+                            "origin": origin,
+                            "word": token,
                             "id": "3046",
                             "url": f"https://api.arasaac.org/v1/pictograms/3046",
                             "error": None
@@ -190,7 +177,7 @@ async def process_phrase(
         return pictograms
     
     except Exception as e:
-        print(f"Error processing phrase: {str(e)}")
+        logger.exception("phrase processing failed", language=language)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -198,6 +185,7 @@ async def process_phrase(
 async def get_options(
     request: WordRequest,
     db: SessionDep,
+    current_user: OptionalCurrentUser,
     language: Optional[str] = Query(
         None, 
         description="Language code for pictogram search", 
@@ -209,6 +197,7 @@ async def get_options(
     
     This endpoint finds pictogram options for a given word.
     You can specify a language to use language-specific pictogram data.
+    For authenticated users the pictograms they use most often come first.
     
     Available languages:
     - it: Italian (default)
@@ -222,7 +211,6 @@ async def get_options(
         language: Language code for pictogram search (e.g., 'it', 'en', 'de', 'es', 'fr')
     """
     word = request.word
-    print(word)
     
     if not word:
         raise HTTPException(status_code=400, detail="Word is required")
@@ -230,9 +218,10 @@ async def get_options(
     pictograms = []
     token_clean = word.strip().replace('"', '').lower()
     
-    print(word)
-    results = find_pecs_by_name(db, word, "it", 0.3)
-    print(results)
+    actual_language = language or settings.DEFAULT_LANGUAGE
+    usage = get_top_usage(db, current_user.id if current_user else None)
+    results = find_pecs_by_name(db, word, actual_language, 0.3, usage=usage)
+    logger.debug("options found", word=word, language=actual_language, matches=len(results))
     
     for result in results:
         pecs_record = result["pecs"]
@@ -256,9 +245,46 @@ async def get_options(
             "error": None
         })
     
-    print(pictograms)
+    # Candidates close in meaning ("automobile" -> "macchina"), not only in spelling
+    proposed = {str(result["pecs"].id) for result in results}
+    for match in semantic_index.search(token_clean, actual_language, k=5, exclude=proposed):
+        pecs_record = db.get(PECS, UUID(match.pecs_id))
+        if pecs_record is None or pecs_record.user_id is not None:
+            continue
+        pictograms.append({
+            "origin": word,
+            "word": match.name,
+            "id": _pecs_pictogram_id(pecs_record),
+            "url": pecs_record.image_url or "",
+            "error": None
+        })
+    
     return pictograms
 
+
+@router.get("/next-pecs", response_model=List[NextPECSResponse])
+def get_next_pecs(
+    current_user: OptionalCurrentUser,
+    previous: List[UUID] = Query(
+        [],
+        description="PECS of the phrase being composed, in order; empty for the first one"
+    ),
+    k: int = Query(5, ge=1, le=50, description="Number of predictions")
+):
+    """
+    Predict the next PECS of a phrase being composed
+
+    The predictions come from the pictogram sequences of the saved phrases,
+    preferring the habits of the authenticated user. They are served from an
+    in-memory index, without database queries once the index is loaded.
+
+    Args:
+        previous: PECS ids already in the phrase, in order
+        k: Maximum number of predictions
+    """
+    predictions = next_pecs_index.predict(previous, current_user.id if current_user else None, k)
+    return [NextPECSResponse(pecs_id=p.pecs_id, score=p.score) for p in predictions]
+
 '''
 @router.post("/get-options", response_model=List[PictogramResponse])
 async def get_options(
@@ -295,7 +321,6 @@ async def get_options(
     
     
     word = request.word
-    print(word)
     
     if not word:
         raise HTTPException(status_code=400, detail="Word is required")
@@ -305,12 +330,11 @@ async def get_options(
     token_clean = to_singolare(token_clean, language)
     #token_clean = trova_parole_simili(token_clean, language)
     
-    print(word)
 
     # Try to find the PECS ID in the database first
     actual_language = language or settings.DEFAULT_LANGUAGE
     pecs_id = find_pecs_id_by_name(db, token_clean, actual_language)
-    print("pecs_id--->", pecs_id)
+    logger.debug("pecs lookup", word=token_clean, language=actual_language, pecs_id=pecs_id)
     
     if pecs_id:
         pictograms.append({
@@ -5,6 +5,8 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import select, Session
 
 from app.api.deps import CurrentUser, SessionDep
+from app.api.http_cache import CatalogCache
+from app.core.log import get_logger
 from app.models import (
     PECSCategory, PECSCategoryCreate, PECSCategoryRead, PECSCategoryUpdate,
     CategoryTranslation, CategoryTranslationCreate, CategoryTranslationRead, CategoryTranslationUpdate,
@@ -12,6 +14,8 @@ from app.models import (
     Message
 )
 
+logger = get_logger(__name__)
+
 router = APIRouter(prefix="/categories", tags=["categories"])
 
 
@@ -45,7 +49,7 @@ def get_italian_categories_with_pecs_count(
         CategoryTranslation.language_code == "it"
     )
     translations = session.exec(translations_query).all()
-    print(f"Found {len(translations)} translations for language code: it")
+    logger.debug("category translations", language_code="it", count=len(translations))
     
     # Build the query
     query = select(PECSCategory).join(CategoryTranslation).where(
@@ -63,7 +67,7 @@ def get_italian_categories_with_pecs_count(
     
     # Execute query
     categories = session.exec(query).all()
-    print(f"Found {len(categories)} categories for language code: it")
+    logger.debug("categories found", language_code="it", count=len(categories))
     
     # Add pecs count for each category
     from sqlalchemy import func
@@ -85,7 +89,11 @@ def get_italian_categories_with_pecs_count(
     return result
 
 
-@router.get("/language/{code}", response_model=List[PECSCategoryRead])
+@router.get(
+    "/language/{code}",
+    response_model=List[PECSCategoryRead],
+    dependencies=[Depends(CatalogCache("categories"))],
+)
 def get_categories_by_language(
     code: str,
     session: SessionDep,
@@ -101,7 +109,7 @@ def get_categories_by_language(
         CategoryTranslation.language_code == code
     )
     translations = session.exec(translations_query).all()
-    print(f"Found {len(translations)} translations for language code: {code}")
+    logger.debug("category translations", language_code=code, count=len(translations))
     
     # Build the query
     query = select(PECSCategory).join(CategoryTranslation).where(
@@ -119,7 +127,7 @@ def get_categories_by_language(
     
     # Execute query
     categories = session.exec(query).all()
-    print(f"Found {len(categories)} categories for language code: {code}")
+    logger.debug("categories found", language_code=code, count=len(categories))
     
     return categories
 
@@ -139,7 +147,11 @@ def get_category(
     return category
 
 
-@router.get("/{category_id}/pecs", response_model=List[PECSRead])
+@router.get(
+    "/{category_id}/pecs",
+    response_model=List[PECSRead],
+    dependencies=[Depends(CatalogCache("categories", "pecs", item=(PECSCategory, "category_id")))],
+)
 def get_pecs_in_category(
     category_id: UUID,
     session: SessionDep,
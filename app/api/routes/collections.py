@@ -5,6 +5,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import select, Session, func
 
 from app.api.deps import CurrentUser, SessionDep
+from app.api.fast_json import fast_json
 from app.models import (
     Collection, CollectionCreate, CollectionRead, CollectionUpdate,
     CollectionTranslation, CollectionTranslationCreate, CollectionTranslationRead, CollectionTranslationUpdate,
@@ -54,7 +55,7 @@ def get_all_collections(
         
         result.append(collection_read)
     
-    return result
+    return fast_json(result, List[CollectionRead])
 
 
 @router.get("/language/{code}", response_model=List[CollectionRead])
@@ -110,7 +111,7 @@ def get_collections_by_language(
         
         result.append(collection_read)
     
-    return result
+    return fast_json(result, List[CollectionRead])
 
 
 @router.get("/{collection_id}", response_model=CollectionRead)
@@ -211,7 +212,7 @@ def get_phrases_in_collection(
         
         result.append(phrase_read)
     
-    return result
+    return fast_json(result, List[PhraseRead])
 
 
 @router.post("/", response_model=CollectionRead)
@@ -2,18 +2,77 @@ from typing import Any, List
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import select, Session
+from sqlalchemy import insert
+from sqlmodel import select, Session, SQLModel
 
-from app.api.deps import CurrentUser, SessionDep
+from app.api.deps import CurrentUser, SessionDep, check_bulk_size
+from app.core.config import settings
 from app.models import (
     FavoritePECS, FavoritePhraseBase, FavoritePhrase,
     PECS, PECSRead, Phrase, PhraseRead,
-    Message
+    BulkResult, Message
 )
+from app.services.pecs_usage import record_usage
 
 router = APIRouter(prefix="/users", tags=["favorites"])
 
 
+def add_favorites_bulk(
+    session: Session,
+    user_id: UUID,
+    item_ids: List[UUID],
+    item_model: type[SQLModel],
+    favorite_model: type[SQLModel],
+    item_field: str,
+    item_label: str
+) -> BulkResult:
+    """
+    Add many items to a user's favorites with one query per check and a
+    single multi-row INSERT.
+
+    Args:
+        session: Database session
+        user_id: Owner of the favorites
+        item_ids: IDs of the items to add, in request order
+        item_model: Model of the items (PECS or Phrase)
+        favorite_model: Association model (FavoritePECS or FavoritePhrase)
+        item_field: Name of the item column of the association model
+        item_label: Name of the item used in the messages
+
+    Returns:
+        BulkResult with the status of every item
+    """
+    result = BulkResult()
+    if not item_ids:
+        return result
+
+    favorite_column = getattr(favorite_model, item_field)
+    known = set(session.exec(select(item_model.id).where(item_model.id.in_(set(item_ids)))).all())
+    existing = set(session.exec(
+        select(favorite_column).where(
+            favorite_model.user_id == user_id,
+            favorite_column.in_(known)
+        )
+    ).all()) if known else set()
+
+    rows = []
+    for index, item_id in enumerate(item_ids):
+        if item_id not in known:
+            result.add(index, "failed", id=item_id, detail=f"{item_label} not found")
+        elif item_id in existing:
+            result.add(index, "skipped", id=item_id, detail=f"{item_label} is already in favorites")
+        else:
+            existing.add(item_id)
+            rows.append({"user_id": user_id, item_field: item_id})
+            result.add(index, "created", id=item_id)
+
+    if rows:
+        session.exec(insert(favorite_model).values(rows))
+        session.commit()
+
+    return result
+
+
 @router.get("/{user_id}/favorites/pecs", response_model=List[PECSRead])
 def get_favorite_pecs(
     user_id: UUID,
@@ -36,6 +95,31 @@ def get_favorite_pecs(
     return pecs_list
 
 
+@router.post("/{user_id}/favorites/pecs/bulk", response_model=BulkResult)
+def add_pecs_to_favorites_bulk(
+    user_id: UUID,
+    pecs_ids: List[UUID],
+    session: SessionDep,
+    current_user: CurrentUser
+) -> Any:
+    """
+    Add many PECS to user's favorites in a single request.
+
+    Returns the status of every PECS, in the order they were submitted.
+    """
+    # Check if user has permission
+    if user_id != current_user.id and not current_user.is_superuser:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    check_bulk_size(pecs_ids)
+
+    result = add_favorites_bulk(session, user_id, pecs_ids, PECS, FavoritePECS, "pecs_id", "PECS")
+    created = [item.id for item in result.results if item.status == "created"]
+    if created:
+        record_usage(session, user_id, created, weight=settings.PECS_USAGE_FAVORITE_WEIGHT)
+        session.commit()
+    return result
+
+
 @router.post("/{user_id}/favorites/pecs/{pecs_id}", response_model=Message)
 def add_pecs_to_favorites(
     user_id: UUID,
@@ -73,6 +157,7 @@ def add_pecs_to_favorites(
     )
     
     session.add(favorite)
+    record_usage(session, user_id, [pecs_id], weight=settings.PECS_USAGE_FAVORITE_WEIGHT)
     session.commit()
     
     return Message(message="PECS added to favorites successfully")
@@ -132,6 +217,26 @@ def get_favorite_phrases(
     return phrases
 
 
+@router.post("/{user_id}/favorites/phrases/bulk", response_model=BulkResult)
+def add_phrases_to_favorites_bulk(
+    user_id: UUID,
+    phrase_ids: List[UUID],
+    session: SessionDep,
+    current_user: CurrentUser
+) -> Any:
+    """
+    Add many phrases to user's favorites in a single request.
+
+    Returns the status of every phrase, in the order they were submitted.
+    """
+    # Check if user has permission
+    if user_id != current_user.id and not current_user.is_superuser:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    check_bulk_size(phrase_ids)
+
+    return add_favorites_bulk(session, user_id, phrase_ids, Phrase, FavoritePhrase, "phrase_id", "Phrase")
+
+
 @router.post("/{user_id}/favorites/phrases/{phrase_id}", response_model=Message)
 def add_phrase_to_favorites(
     user_id: UUID,
@@ -5,9 +5,12 @@ from sqlmodel import func, select
 
 from app.api.deps import CurrentUser, SessionDep
 from app.core.config import settings
+from app.core.log import get_logger
 from app.models import Image, ImageCreate, ImagePublic, ImagesPublic, ImageUpdate, Message, User
 from app.services.supabase_storage import supabase_storage
 
+logger = get_logger(__name__)
+
 router = APIRouter(prefix="/images", tags=["images"])
 
 @router.post("/upload")
@@ -137,16 +140,14 @@ async def list_images() -> Any:
                 
                 if signed_url_data and 'signedURL' in signed_url_data:
                     file_url = signed_url_data['signedURL']
-                    print(f"Generated signed URL for list: {file_url}")
                 else:
                     # Fallback to public URL
                     file_url = supabase_storage.supabase.storage.from_(supabase_storage.bucket_name).get_public_url(file["name"])
-                    print(f"Fallback to public URL for list: {file_url}")
+                    logger.debug("supabase public url fallback", path=file["name"])
             except Exception as sign_e:
-                print(f"Error creating signed URL for list: {str(sign_e)}")
+                logger.warning("supabase signed url failed", path=file["name"], error=str(sign_e))
                 # Fallback to public URL
                 file_url = supabase_storage.supabase.storage.from_(supabase_storage.bucket_name).get_public_url(file["name"])
-                print(f"Fallback to public URL for list: {file_url}")
                 
             # Remove any query parameters from public URLs (but keep them for signed URLs)
             if '?' in file_url and 'token=' not in file_url:
@@ -197,16 +198,14 @@ async def get_image(filename: str) -> Any:
             
             if signed_url_data and 'signedURL' in signed_url_data:
                 file_url = signed_url_data['signedURL']
-                print(f"Generated signed URL for get: {file_url}")
             else:
                 # Fallback to public URL
                 file_url = supabase_storage.supabase.storage.from_(supabase_storage.bucket_name).get_public_url(filename)
-                print(f"Fallback to public URL for get: {file_url}")
+                logger.debug("supabase public url fallback", path=filename)
         except Exception as sign_e:
-            print(f"Error creating signed URL for get: {str(sign_e)}")
+            logger.warning("supabase signed url failed", path=filename, error=str(sign_e))
             # Fallback to public URL
             file_url = supabase_storage.supabase.storage.from_(supabase_storage.bucket_name).get_public_url(filename)
-            print(f"Fallback to public URL for get: {file_url}")
             
         # Remove any query parameters from public URLs (but keep them for signed URLs)
         if '?' in file_url and 'token=' not in file_url:
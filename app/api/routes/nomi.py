@@ -1,8 +1,10 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import insert
 from sqlmodel import Session, select
 
-from app.api.deps import get_db, get_current_active_superuser, SessionDep, CurrentUser
+from app.api.deps import get_db, get_current_active_superuser, check_bulk_size, SessionDep, CurrentUser
+from app.models.bulk import BulkResult
 from app.models.nome import Nome, NomeCreate, NomeUpdate
 from app.models.user import User
 
@@ -52,6 +54,61 @@ def create_nome(
     return nome
 
 
+@router.post("/bulk", response_model=BulkResult)
+def create_nomi_bulk(
+    *,
+    db: SessionDep,
+    nomi_in: List[NomeCreate],
+    current_user: User = Depends(get_current_active_superuser),
+):
+    """
+    Create many nomi (names) in a single request.
+
+    Existing rows are loaded with a single query and the new ones are written
+    with one multi-row INSERT. Items identical to an existing nome (same
+    pictogram_id, name and lang) or to a previous item of the request are
+    skipped, so the same payload can be sent again safely.
+
+    Returns the status of every item, in the order they were submitted.
+    """
+    check_bulk_size(nomi_in)
+    result = BulkResult()
+    if not nomi_in:
+        return result
+
+    pictogram_ids = {nome.pictogram_id for nome in nomi_in}
+    languages = {nome.lang for nome in nomi_in}
+    existing = set(db.exec(
+        select(Nome.pictogram_id, Nome.name, Nome.lang)
+        .where(Nome.pictogram_id.in_(pictogram_ids), Nome.lang.in_(languages))
+    ).all())
+
+    # Index of the item in the request -> row to insert
+    new_rows = {}
+    for index, nome in enumerate(nomi_in):
+        key = (nome.pictogram_id, nome.name, nome.lang)
+        if key in existing:
+            continue
+        existing.add(key)
+        new_rows[index] = nome.model_dump()
+
+    created_ids = {}
+    if new_rows:
+        ids = db.scalars(
+            insert(Nome).returning(Nome.id, sort_by_parameter_order=True),
+            list(new_rows.values())
+        ).all()
+        created_ids = dict(zip(new_rows, ids))
+        db.commit()
+
+    for index in range(len(nomi_in)):
+        if index in created_ids:
+            result.add(index, "created", id=created_ids[index])
+        else:
+            result.add(index, "skipped", detail="Nome already exists")
+    return result
+
+
 @router.get("/{nome_id}", response_model=Nome)
 def read_nome(
     *,
@@ -1,11 +1,13 @@
 from typing import Any, List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlmodel import select, Session
 from pydantic import BaseModel
 
 from app.api.deps import CurrentUser, SessionDep
+from app.api.fast_json import fast_json
+from app.api.http_cache import CatalogCache
 from app.models import (
     PECS, PECSCreate, PECSRead, PECSUpdate,
     PECSTranslation, PECSTranslationCreate, PECSTranslationRead, PECSTranslationUpdate,
@@ -24,9 +26,14 @@ class CategoryWithTranslations(BaseModel):
     translations: List[CategoryTranslationResponse]
 
 
-@router.get("/", response_model=List[PECSRead])
+@router.get(
+    "/",
+    response_model=List[PECSRead],
+    dependencies=[Depends(CatalogCache("pecs"))],
+)
 def get_all_pecs(
     session: SessionDep,
+    response: Response,
     language: Optional[str] = Query(None, description="Filter by language code"),
     skip: int = 0,
     limit: int = 100
@@ -42,7 +49,7 @@ def get_all_pecs(
     query = query.offset(skip).limit(limit)
     pecs_list = session.exec(query).all()
     
-    return pecs_list
+    return fast_json(pecs_list, List[PECSRead], response)
 
 
 @router.get("/custom", response_model=List[PECSRead])
@@ -64,10 +71,15 @@ def get_custom_pecs(
     return pecs_list
 
 
-@router.get("/language/{code}", response_model=List[PECSRead])
+@router.get(
+    "/language/{code}",
+    response_model=List[PECSRead],
+    dependencies=[Depends(CatalogCache("pecs"))],
+)
 def get_pecs_by_language(
     code: str,
     session: SessionDep,
+    response: Response,
     skip: int = 0,
     limit: int = 100
 ) -> Any:
@@ -79,10 +91,14 @@ def get_pecs_by_language(
     ).offset(skip).limit(limit)
     
     pecs_list = session.exec(query).all()
-    return pecs_list
+    return fast_json(pecs_list, List[PECSRead], response)
 
 
-@router.get("/{pecs_id}", response_model=PECSRead)
+@router.get(
+    "/{pecs_id}",
+    response_model=PECSRead,
+    dependencies=[Depends(CatalogCache("pecs", item=(PECS, "pecs_id")))],
+)
 def get_pecs(
     pecs_id: UUID,
     session: SessionDep
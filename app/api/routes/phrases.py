@@ -6,6 +6,9 @@ from fastapi import APIRouter, Depends, HTTPException, Query, Body
 from sqlmodel import select, Session
 
 from app.api.deps import CurrentUser, SessionDep
+from app.api.fast_json import fast_json
+from app.api.http_cache import CatalogCache
+from app.core.log import get_logger
 from app.models import (Collection,
     Phrase, PhraseCreate, PhraseRead, PhraseUpdate,
     PhraseTranslation, PhraseTranslationCreate, PhraseTranslationRead, PhraseTranslationUpdate,
@@ -15,9 +18,12 @@ from app.models import (Collection,
     Message
 )
 from pydantic import BaseModel
-from app.services.token_phrase import token_2_phrase
+from app.services.token_phrase import atoken_2_phrase
+from app.services.pecs_usage import record_usage
+from app.services.next_pecs import next_pecs_index
 
 router = APIRouter(prefix="/phrases", tags=["phrases"])
+logger = get_logger(__name__)
 
 
 class TransformPecsRequest(BaseModel):
@@ -28,6 +34,12 @@ class ImageURLResponse(BaseModel):
     image_url: str
 
 
+def _index_phrase(phrase: Phrase) -> None:
+    # Keep the next-pictogram prediction in sync with the saved sequence
+    items = sorted(phrase.pecs_items, key=lambda item: item.position)
+    next_pecs_index.set_phrase(phrase.id, phrase.user_id, [item.pecs_id for item in items])
+
+
 @router.get("/", response_model=List[PhraseRead])
 def get_all_phrases(
     session: SessionDep,
@@ -47,7 +59,7 @@ def get_all_phrases(
         language_code = None
         if phrase.translations and len(phrase.translations) > 0:
             language_code = phrase.translations[0].language_code
-        print("language_code", language_code)
+        logger.debug("phrase language", phrase_id=phrase.id, language_code=language_code)
         
         # Create a new list for enhanced pecs_items
         enhanced_pecs_items = []
@@ -61,18 +73,15 @@ def get_all_phrases(
                 if pecs.translations and len(pecs.translations) > 0:
                     # First try to find a translation with the same language code
                     if language_code:
-                        print("Cercando traduzione in lingua:", language_code)
                         for t in pecs.translations:
-                            print("Traduzione disponibile:", t.language_code, t.name)
                             if t.language_code == language_code:
                                 translation = t
-                                print("Trovata traduzione in lingua:", language_code)
                                 break
                     
                     # If no translation found with the same language code, use the first one
                     if not translation:
                         translation = pecs.translations[0]
-                        print("Nessuna traduzione trovata in lingua:", language_code, "usando:", translation.language_code)
+                        logger.debug("pecs translation fallback", pecs_id=pecs.id, language_code=language_code, used=translation.language_code)
                 
                 # Costruisci pecs_info con language_code della frase, anche se la traduzione è in un'altra lingua
                 pecs_info = {
@@ -81,7 +90,6 @@ def get_all_phrases(
                     "name": translation.name if translation else None,
                     "language_code": language_code if language_code else (translation.language_code if translation else None)
                 }
-                print("pecs_info costruito:", pecs_info)
             
             # Create a new PhrasePECSRead object with pecs_info
             enhanced_pecs_items.append(PhrasePECSRead(
@@ -103,7 +111,7 @@ def get_all_phrases(
         
         result.append(phrase_read)
     
-    return result
+    return fast_json(result, List[PhraseRead])
 
 
 @router.get("/language/{code}", response_model=List[PhraseRead])
@@ -157,9 +165,6 @@ def get_phrases_by_language(
                 "name": translation.name if translation else None,
                 "language_code": language_code if language_code else (translation.language_code if translation else None)
             }
-            print("IMPORTANTE - pecs_info costruito:", pecs_info)
-            print("IMPORTANTE - language_code della frase:", language_code)
-            print("IMPORTANTE - language_code della traduzione PECS:", translation.language_code if translation else None)
             
             # Create a new PhrasePECSRead object with pecs_info
             enhanced_pecs_items.append(PhrasePECSRead(
@@ -181,7 +186,7 @@ def get_phrases_by_language(
         
         result.append(phrase_read)
     
-    return result
+    return fast_json(result, List[PhraseRead])
 
 
 @router.get("/{phrase_id}", response_model=PhraseRead)
@@ -193,7 +198,6 @@ def get_phrase(
     Retrieve a specific phrase by ID.
     """
     phrase = session.get(Phrase, phrase_id)
-    print("phrase---------", phrase)
     if not phrase:
         raise HTTPException(status_code=404, detail="Phrase not found")
     
@@ -201,15 +205,12 @@ def get_phrase(
     language_code = None
     if phrase.translations and len(phrase.translations) > 0:
         language_code = phrase.translations[0].language_code
-    print("language_code", language_code)
+    logger.debug("phrase language", phrase_id=phrase.id, language_code=language_code)
     # Create a new list for enhanced pecs_items
     enhanced_pecs_items = []
     
     for pecs_item in phrase.pecs_items:
-        print(pecs_item)
         pecs = session.get(PECS, pecs_item.pecs_id)
-        print("pecs->", pecs)
-        print("pecs-nnnnn>", pecs.translations)
         
         pecs_info = None
         if pecs:
@@ -235,9 +236,6 @@ def get_phrase(
                 "name": translation.name if translation else None,
                 "language_code": language_code if language_code else (translation.language_code if translation else None)
             }
-            print("IMPORTANTE - pecs_info costruito:", pecs_info)
-            print("IMPORTANTE - language_code della frase:", language_code)
-            print("IMPORTANTE - language_code della traduzione PECS:", translation.language_code if translation else None)
             
         
         # Create a new PhrasePECSRead object with pecs_info
@@ -312,7 +310,6 @@ def get_pecs_in_phrase(
                 "name": translation.name if translation else None,
                 "language_code": language_code if language_code else (translation.language_code if translation else None)
             }
-            print(pecs_info)
         
         result.append(PhrasePECSRead(
             phrase_id=pp.phrase_id,
@@ -340,7 +337,7 @@ def create_phrase(
         origin=phrase_in.origin if hasattr(phrase_in, 'origin') else None
     )
     # Stampa il payload ricevuto
-    print(f"Payload ricevuto: {phrase_in}")
+    logger.debug("create phrase", translations=len(phrase_in.translations or []), pecs=len(phrase_in.pecs_items or []))
     session.add(phrase)
     session.commit()
     session.refresh(phrase)
@@ -361,6 +358,7 @@ def create_phrase(
     
     # Add PECS items if provided
     if phrase_in.pecs_items:
+        used_pecs_ids = []
         for pecs_item in phrase_in.pecs_items:
             # Verify PECS exists
             pecs_id = pecs_item.get("pecs_id")
@@ -413,7 +411,7 @@ def create_phrase(
                             if t.language_code == language_code:
                                 # Found a PECS with the same image and a translation in the language of the phrase
                                 pecs = p
-                                print(f"Found a better PECS with translation in {language_code}: {pecs.id}")
+                                logger.debug("pecs with translation found", pecs_id=pecs.id, language_code=language_code)
                                 break
                         else:
                             # Continue the outer loop if the inner loop wasn't broken
@@ -452,14 +450,13 @@ def create_phrase(
                 origin=origin
             )
             session.add(phrase_pecs)
+            used_pecs_ids.append(pecs.id)
         
+        record_usage(session, phrase.user_id, used_pecs_ids)
         session.commit()
         session.refresh(phrase)
     
     # Add collections if provided
-    print(f"DEBUG - collection_ids type: {type(phrase_in.collection_ids)}")
-    print(f"DEBUG - collection_ids: {phrase_in.collection_ids}")
-    print(f"DEBUG - Raw request data: {phrase_in.model_dump()}")
     
     # Try to handle collection_ids even if they're in a different format
     collection_ids = []
@@ -467,39 +464,34 @@ def create_phrase(
     # If collection_ids is directly available
     if phrase_in.collection_ids:
         collection_ids = phrase_in.collection_ids
-        print(f"DEBUG - Using direct collection_ids: {collection_ids}")
     
     if collection_ids:
-        print(f"DEBUG - Processing {len(collection_ids)} collection IDs")
+        logger.debug("add phrase to collections", phrase_id=phrase.id, collections=len(collection_ids))
         for collection_id in collection_ids:
             try:
                 # Ensure collection_id is a UUID
                 if isinstance(collection_id, str):
                     collection_id = UUID(collection_id)
-                    print(f"DEBUG - Converted string to UUID: {collection_id}")
                 
-                print(f"DEBUG - Processing collection_id: {collection_id}")
                 # Verify collection exists
                 collection = session.get(Collection, collection_id)
                 if not collection:
-                    print(f"DEBUG - Collection not found: {collection_id}")
+                    logger.debug("collection not found", collection_id=collection_id)
                     continue  # Skip invalid collection
                 
-                print(f"DEBUG - Collection found: {collection_id}")
                 # Create association
                 phrase_collection = PhraseCollection(
                     phrase_id=phrase.id,
                     collection_id=collection_id
                 )
                 session.add(phrase_collection)
-                print(f"DEBUG - Added association for phrase {phrase.id} and collection {collection_id}")
             except Exception as e:
-                print(f"DEBUG - Error processing collection_id {collection_id}: {str(e)}")
+                logger.warning("invalid collection_id", collection_id=collection_id, error=str(e))
         
         session.commit()
-        print(f"DEBUG - Committed associations")
         session.refresh(phrase)
     
+    _index_phrase(phrase)
     return phrase
 
 
@@ -561,10 +553,12 @@ def update_phrase(
             select(PhrasePECS).where(PhrasePECS.phrase_id == phrase.id)
         ).all()
         
+        previous_pecs_ids = {item.pecs_id for item in existing_items}
         for item in existing_items:
             session.delete(item)
         
         # Add new PECS items
+        used_pecs_ids = []
         for pecs_item in update_data["pecs_items"]:
             # Verify PECS exists
             pecs_id = pecs_item.get("pecs_id")
@@ -619,52 +613,52 @@ def update_phrase(
                 origin=origin
             )
             session.add(phrase_pecs)
+            if pecs.id not in previous_pecs_ids:
+                used_pecs_ids.append(pecs.id)
+        
+        # Only the pictograms added to the phrase count as new uses
+        record_usage(session, phrase.user_id, used_pecs_ids)
     
     # Handle collections
-    print(f"DEBUG UPDATE - collection_ids in update_data: {update_data.get('collection_ids')}")
     if "collection_ids" in update_data and update_data["collection_ids"]:
         # Remove existing collection associations
         existing_collections = session.exec(
             select(PhraseCollection).where(PhraseCollection.phrase_id == phrase.id)
         ).all()
         
-        print(f"DEBUG UPDATE - Removing {len(existing_collections)} existing collection associations")
         for item in existing_collections:
             session.delete(item)
         
         # Add new collection associations
         collection_ids = update_data["collection_ids"]
-        print(f"DEBUG UPDATE - Adding {len(collection_ids)} new collection associations")
+        logger.debug("replace phrase collections", phrase_id=phrase.id, removed=len(existing_collections), added=len(collection_ids))
         
         for collection_id in collection_ids:
             try:
                 # Ensure collection_id is a UUID
                 if isinstance(collection_id, str):
                     collection_id = UUID(collection_id)
-                    print(f"DEBUG UPDATE - Converted string to UUID: {collection_id}")
                 
-                print(f"DEBUG UPDATE - Processing collection_id: {collection_id}")
                 # Verify collection exists
                 collection = session.get(Collection, collection_id)
                 if not collection:
-                    print(f"DEBUG UPDATE - Collection not found: {collection_id}")
+                    logger.debug("collection not found", collection_id=collection_id)
                     continue  # Skip invalid collection
                 
-                print(f"DEBUG UPDATE - Collection found: {collection_id}")
                 # Create association
                 phrase_collection = PhraseCollection(
                     phrase_id=phrase.id,
                     collection_id=collection_id
                 )
                 session.add(phrase_collection)
-                print(f"DEBUG UPDATE - Added association for phrase {phrase.id} and collection {collection_id}")
             except Exception as e:
-                print(f"DEBUG UPDATE - Error processing collection_id {collection_id}: {str(e)}")
+                logger.warning("invalid collection_id", collection_id=collection_id, error=str(e))
     
     session.add(phrase)
     session.commit()
     session.refresh(phrase)
     
+    _index_phrase(phrase)
     return phrase
 
 
@@ -687,6 +681,7 @@ def delete_phrase(
     
     session.delete(phrase)
     session.commit()
+    next_pecs_index.remove_phrase(phrase_id)
     
     return Message(message="Phrase deleted successfully")
 
@@ -730,6 +725,7 @@ def add_pecs_to_phrase(
         session.add(existing)
         session.commit()
         session.refresh(existing)
+        _index_phrase(phrase)
         
         # Get the language code from the phrase translations
         language_code = None
@@ -799,8 +795,10 @@ def add_pecs_to_phrase(
     )
     
     session.add(phrase_pecs)
+    record_usage(session, phrase.user_id, [pecs_id])
     session.commit()
     session.refresh(phrase_pecs)
+    _index_phrase(phrase)
     
     # Get the language code from the phrase translations
     language_code = None
@@ -881,6 +879,7 @@ def update_pecs_position_in_phrase(
     session.add(phrase_pecs)
     session.commit()
     session.refresh(phrase_pecs)
+    _index_phrase(phrase)
     
     # Get the language code from the phrase translations
     language_code = None
@@ -920,7 +919,11 @@ def update_pecs_position_in_phrase(
     )
 
 
-@router.get("/pecs/{pecs_id}/image", response_model=ImageURLResponse)
+@router.get(
+    "/pecs/{pecs_id}/image",
+    response_model=ImageURLResponse,
+    dependencies=[Depends(CatalogCache("pecs", item=(PECS, "pecs_id")))],
+)
 def get_pecs_image_url(
     pecs_id: UUID,
     session: SessionDep
@@ -968,15 +971,17 @@ def remove_pecs_from_phrase(
     # Remove association
     session.delete(phrase_pecs)
     session.commit()
+    _index_phrase(phrase)
     
     return Message(message="PECS removed from phrase successfully")
 
 @router.post("/transform-pecs", response_model=List[PECSOutput])
-def transform_pecs_format(
+async def transform_pecs_format(
     request: TransformPecsRequest
 ) -> List[PECSOutput]:
     """
     Transform PECS items from the input format to the output format with tokens and phrases.
+    Results are memoized by pictogram sequence and language.
     """
     transformed_items = []
     
@@ -984,7 +989,7 @@ def transform_pecs_format(
     for item in request.pecs:
         sequence += item.name + ' '
 
-    result = token_2_phrase(sequence, request.language)
+    result = await atoken_2_phrase(sequence, request.language)
 
     for key, val in result['mapping'].items():
         transformed_item = PECSOutput(
@@ -0,0 +1,153 @@
+from typing import Any, Iterator, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+
+from app.api.deps import CurrentUser, SessionDep
+from app.api.http_cache import etag_matches, parse_byte_range
+from app.models import SyncChange, SyncChanges
+from app.services.catalog_snapshot import (
+    SNAPSHOT_CATALOGS,
+    available_encodings,
+    get_snapshot_file,
+    snapshot_builder,
+    snapshot_languages,
+    write_snapshot,
+)
+from app.services.catalog_version import get_catalog_versions
+from app.services.sync_log import Cursor, get_changes, latest_cursor
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+
+@router.get("/changes", response_model=SyncChanges)
+def get_sync_changes(
+    session: SessionDep,
+    current_user: CurrentUser,
+    since: Optional[str] = Query(None, description="Cursor returned by the previous call"),
+    limit: int = Query(1000, ge=1, le=5000, description="Maximum number of log entries read")
+) -> Any:
+    """
+    Changes of the PECS, categories, phrases and collections since a cursor.
+
+    Each changed entity is returned once, with its last action (create,
+    update or delete); the client fetches the created and updated ones by id.
+    Entity types: pictogram (PECS), category, sequence (phrase) and
+    sequence_group (collection).
+
+    Without since, no changes are returned: full_sync is true and the client
+    downloads the full lists, then syncs from the returned cursor. Call it
+    before the download, so that no change made meanwhile is missed.
+    """
+    if since is None:
+        return SyncChanges(cursor=latest_cursor(session).encode(), full_sync=True)
+    try:
+        cursor = Cursor.decode(since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    result = get_changes(session, cursor, current_user.id, limit)
+    return SyncChanges(
+        changes=[
+            SyncChange(entity_type=entity_type, entity_id=entity_id, action=action, timestamp=timestamp)
+            for entity_type, entity_id, action, timestamp in result.changes
+        ],
+        cursor=result.cursor.encode(),
+        has_more=result.has_more
+    )
+
+
+def _read_file(file, start: int, length: int, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    try:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+@router.get(
+    "/snapshot/{language}",
+    response_class=StreamingResponse,
+    responses={
+        200: {"content": {"application/gzip": {}, "application/zstd": {}}},
+        206: {"description": "Partial content, for a Range request"},
+        304: {"description": "Not modified"},
+        416: {"description": "Range not satisfiable"},
+    },
+)
+def get_catalog_snapshot(
+    language: str,
+    request: Request,
+    session: SessionDep,
+    current_user: CurrentUser,
+    encoding: str = Query("gzip", description="gzip, or zstd when the server supports it")
+) -> Any:
+    """
+    Compressed snapshot of the shared PECS catalog and the categories of a
+    language, to set up a new device with one download.
+
+    The content is columnar JSON: the "pecs", "categories" and
+    "category_items" objects hold one array per field. Its "sync_cursor" is
+    the /sync/changes cursor to start syncing from, so a snapshot a few
+    changes old is fine. The custom PECS of the user are not included.
+
+    The ETag is strong and the download can be resumed with Range
+    (a single range) and If-Range. When the catalog changed since the
+    snapshot was built, the previous one is served while a new one is built.
+    """
+    if encoding not in available_encodings():
+        raise HTTPException(status_code=400, detail=f"Unsupported encoding, use one of {available_encodings()}")
+
+    snapshot = get_snapshot_file(language, encoding)
+    if snapshot is None:
+        if language not in snapshot_languages(session):
+            raise HTTPException(status_code=404, detail="Language not found")
+        # First request for the language: built now, once
+        write_snapshot(session, language)
+        snapshot = get_snapshot_file(language, encoding)
+    else:
+        versions = get_catalog_versions(session, SNAPSHOT_CATALOGS)
+        if any(snapshot.catalog_versions.get(name, 0) < versions[name][0] for name in SNAPSHOT_CATALOGS):
+            snapshot_builder.schedule([language], delay=0)
+
+    etag = f'"{snapshot.etag}"'
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": f'attachment; filename="{snapshot.path.rsplit("/", 1)[-1]}"',
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    first, last = 0, snapshot.size - 1
+    status_code = 200
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    # A Range with a stale If-Range gets the whole new snapshot
+    if range_header is not None and (if_range is None or if_range.strip() == etag):
+        try:
+            byte_range = parse_byte_range(range_header, snapshot.size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{snapshot.size}"})
+        if byte_range is not None:
+            first, last = byte_range
+            status_code = 206
+            headers["Content-Range"] = f"bytes {first}-{last}/{snapshot.size}"
+
+    # Opened now: the file stays readable if a newer snapshot replaces it
+    file = open(snapshot.path, "rb")
+    headers["Content-Length"] = str(last - first + 1)
+    return StreamingResponse(
+        _read_file(file, first, last - first + 1),
+        status_code=status_code,
+        media_type=snapshot.media_type,
+        headers=headers,
+    )
@@ -1,15 +1,18 @@
+import uuid
 from typing import Any, List, Dict
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Body
+from sqlalchemy import insert
 from sqlmodel import select, Session
 
-from app.api.deps import CurrentUser, SessionDep
+from app.api.deps import CurrentUser, SessionDep, check_bulk_size
 from app.models import (
     PECS, PECSTranslation, PECSTranslationCreate, PECSTranslationRead, PECSTranslationUpdate,
     PECSCategory, CategoryTranslation, CategoryTranslationCreate, CategoryTranslationRead, CategoryTranslationUpdate,
-    Message
+    BulkResult, Message
 )
+from app.services.sync_log import record_sync_changes
 
 router = APIRouter(prefix="/translations", tags=["translations"])
 
@@ -36,6 +39,62 @@ def get_pecs_translations(
     return translations
 
 
+@router.post("/pecs/bulk", response_model=BulkResult)
+def add_pecs_translations_bulk(
+    session: SessionDep,
+    current_user: CurrentUser,
+    translations: List[PECSTranslationCreate]
+) -> Any:
+    """
+    Add many PECS translations in a single request.
+
+    The PECS and the existing translations are checked with one query each
+    and the new translations are written with one multi-row INSERT.
+    An item fails if its PECS does not exist or a field is empty, and is
+    skipped if the translation for that language already exists.
+
+    Returns the status of every item, in the order they were submitted.
+    """
+    check_bulk_size(translations)
+    result = BulkResult()
+    if not translations:
+        return result
+
+    pecs_ids = {translation.pecs_id for translation in translations}
+    known_pecs = set(session.exec(select(PECS.id).where(PECS.id.in_(pecs_ids))).all())
+    existing = set(session.exec(
+        select(PECSTranslation.pecs_id, PECSTranslation.language_code)
+        .where(PECSTranslation.pecs_id.in_(known_pecs))
+    ).all()) if known_pecs else set()
+
+    rows = []
+    for index, translation in enumerate(translations):
+        if not translation.language_code:
+            result.add(index, "failed", detail="Language code is required")
+        elif not translation.name:
+            result.add(index, "failed", detail="Name is required")
+        elif translation.pecs_id not in known_pecs:
+            result.add(index, "failed", detail="PECS not found")
+        elif (translation.pecs_id, translation.language_code) in existing:
+            result.add(
+                index, "skipped",
+                detail=f"Translation for language '{translation.language_code}' already exists"
+            )
+        else:
+            existing.add((translation.pecs_id, translation.language_code))
+            row = {"id": uuid.uuid4(), **translation.model_dump()}
+            rows.append(row)
+            result.add(index, "created", id=row["id"])
+
+    if rows:
+        session.exec(insert(PECSTranslation).values(rows))
+        # Bulk statements are not seen by the flush events
+        record_sync_changes(session, "pictogram", {row["pecs_id"] for row in rows})
+        session.commit()
+
+    return result
+
+
 @router.post("/pecs/{pecs_id}", response_model=PECSTranslationRead)
 def add_pecs_translation(
     pecs_id: UUID,
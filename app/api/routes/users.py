@@ -9,6 +9,7 @@ from app.api.deps import (
     CurrentUser,
     SessionDep,
     get_current_active_superuser,
+    invalidate_cached_user,
 )
 from app.core.config import settings
 from app.core.security import get_password_hash, verify_password
@@ -93,6 +94,7 @@ def update_user_me(
     current_user.sqlmodel_update(user_data)
     session.add(current_user)
     session.commit()
+    invalidate_cached_user(current_user.id)
     session.refresh(current_user)
     return current_user
 
@@ -114,6 +116,7 @@ def update_password_me(
     current_user.hashed_password = hashed_password
     session.add(current_user)
     session.commit()
+    invalidate_cached_user(current_user.id)
     return Message(message="Password updated successfully")
 
 
@@ -136,6 +139,7 @@ def delete_user_me(session: SessionDep, current_user: CurrentUser) -> Any:
         )
     session.delete(current_user)
     session.commit()
+    invalidate_cached_user(current_user.id)
     return Message(message="User deleted successfully")
 
 
@@ -202,6 +206,7 @@ def update_user(
             )
 
     db_user = crud.update_user(session=session, db_user=db_user, user_in=user_in)
+    invalidate_cached_user(user_id)
     return db_user
 
 
@@ -223,4 +228,5 @@ def delete_user(
     session.exec(statement)  # type: ignore
     session.delete(user)
     session.commit()
+    invalidate_cached_user(user_id)
     return Message(message="User deleted successfully")
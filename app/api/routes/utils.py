@@ -3,7 +3,10 @@ from pydantic.networks import EmailStr
 from sqlmodel import Session, select
 
 from app.api.deps import get_current_active_superuser, get_db, SessionDep
+from app.core.compression import compression_stats
 from app.models import Message
+from app.services.circuit_breaker import all_breakers
+from app.services.prompts import prompt_registry
 from app.utils import generate_test_email, send_email
 
 router = APIRouter(prefix="/utils", tags=["utils"])
@@ -32,6 +35,42 @@ async def health_check() -> bool:
     return True
 
 
+@router.get(
+    "/llm-status/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def llm_status() -> list[dict]:
+    """
+    State and counters of the circuit breakers of the LLM services.
+    """
+    return [breaker.snapshot() for breaker in all_breakers().values()]
+
+
+@router.get(
+    "/compression-stats/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def compression_stats_report() -> list[dict]:
+    """
+    Bytes sent before and after compression by this worker, per encoding.
+    """
+    return compression_stats.snapshot()
+
+
+@router.get(
+    "/llm-prompts/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def llm_prompts() -> list[dict]:
+    """
+    Hash and size of the LLM prompts rendered by this worker.
+    """
+    return [
+        {"service": prompt.service, "language": prompt.language, "hash": prompt.hash, "chars": len(prompt.system)}
+        for prompt in prompt_registry.rendered()
+    ]
+
+
 @router.get("/db-check/")
 async def db_check(db: SessionDep) -> Message:
     """
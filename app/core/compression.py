@@ -0,0 +1,213 @@
+"""
+Response compression middleware.
+
+The catalog and phrase listings are repetitive JSON (the same Arasaac URL
+prefix on every item) and compress 5-10x, which matters for the tablets on
+slow school networks. The encoding is negotiated from Accept-Encoding among
+the available ones, in the server preference order of
+COMPRESSION_ENCODINGS: brotli and zstd need the optional brotli and
+zstandard packages, gzip is always available.
+
+Only complete bodies (one message, as the JSON routes send) of a
+compressible media type and at least COMPRESSION_MINIMUM_SIZE bytes are
+compressed; streamed, already encoded and partial responses pass through.
+Bodies over COMPRESSION_THREAD_MIN_SIZE are compressed in a worker thread,
+so the event loop keeps serving the other requests meanwhile.
+"""
+import gzip
+import threading
+from typing import Callable, Dict, List, Optional
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+from app.core.config import settings
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+
+
+def _compressors() -> Dict[str, Callable[[bytes], bytes]]:
+    compressors = {
+        "gzip": lambda data: gzip.compress(data, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0),
+    }
+    if brotli is not None:
+        compressors["br"] = lambda data: brotli.compress(data, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    if zstandard is not None:
+        compressors["zstd"] = lambda data: zstandard.ZstdCompressor(level=settings.COMPRESSION_ZSTD_LEVEL).compress(data)
+    return compressors
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Encoding -> q value of an Accept-Encoding header."""
+    accepted: Dict[str, float] = {}
+    for part in header.split(","):
+        name, _, parameters = part.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        for parameter in parameters.split(";"):
+            key, _, value = parameter.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name.strip().lower()] = quality
+    return accepted
+
+
+def choose_encoding(header: str, available: List[str]) -> Optional[str]:
+    """
+    The encoding to use for a request, None for identity: the accepted one
+    with the highest q value, ties broken by the order of available.
+    """
+    accepted = parse_accept_encoding(header)
+    best, best_quality = None, 0.0
+    for encoding in available:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class CompressionStats:
+    """Bytes before and after compression, per encoding, since the start of the worker."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[str, List[int]] = {}
+
+    def record(self, encoding: str, uncompressed: int, compressed: int) -> None:
+        with self._lock:
+            counters = self._counters.setdefault(encoding, [0, 0, 0])
+            counters[0] += 1
+            counters[1] += uncompressed
+            counters[2] += compressed
+
+    def snapshot(self) -> List[dict]:
+        with self._lock:
+            return [
+                {
+                    "encoding": encoding,
+                    "responses": responses,
+                    "uncompressed_bytes": uncompressed,
+                    "compressed_bytes": compressed,
+                    "ratio": round(uncompressed / compressed, 2) if compressed else None,
+                }
+                for encoding, (responses, uncompressed, compressed) in sorted(self._counters.items())
+            ]
+
+
+compression_stats = CompressionStats()
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing the responses with gzip, brotli or zstd.
+
+    Usage:
+        app.add_middleware(CompressionMiddleware)
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: Optional[int] = None) -> None:
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MINIMUM_SIZE if minimum_size is None else minimum_size
+        self.compressors = _compressors()
+        # Server preference, limited to the installed compressors
+        self.encodings = [encoding for encoding in settings.COMPRESSION_ENCODINGS if encoding in self.compressors]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _CompressingSender(self, encoding, send))
+
+    async def compress(self, encoding: str, body: bytes) -> bytes:
+        compressor = self.compressors[encoding]
+        if len(body) >= settings.COMPRESSION_THREAD_MIN_SIZE:
+            return await anyio.to_thread.run_sync(compressor, body)
+        return compressor(body)
+
+
+class _CompressingSender:
+    """The send callable of one response: holds the start message until the body is known."""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send) -> None:
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start: Optional[Message] = None
+        self.passthrough = False
+
+    async def __call__(self, message: Message) -> None:
+        if self.passthrough:
+            await self.send(message)
+            return
+        if message["type"] == "http.response.start":
+            self.start = message
+            headers = Headers(raw=message["headers"])
+            if not self._compressible(message["status"], headers):
+                self.passthrough = True
+                await self.send(message)
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        if message.get("more_body", False) or len(body) < self.middleware.minimum_size:
+            # Streamed, or too small to be worth it
+            await self._pass_through(self.start)
+            await self.send(message)
+            return
+
+        compressed = await self.middleware.compress(self.encoding, body)
+        if len(compressed) >= len(body):
+            await self._pass_through(self.start)
+            await self.send(message)
+            return
+        compression_stats.record(self.encoding, len(body), len(compressed))
+
+        headers = MutableHeaders(raw=self.start["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers["Content-Length"] = str(len(compressed))
+        headers.add_vary_header("Accept-Encoding")
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            # A strong ETag names the uncompressed bytes
+            headers["ETag"] = "W/" + etag
+        await self.send(self.start)
+        await self.send({"type": "http.response.body", "body": compressed})
+
+    def _compressible(self, status: int, headers: Headers) -> bool:
+        if status < 200 or status in (204, 206, 304) or "content-encoding" in headers:
+            return False
+        media_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        return media_type.startswith(COMPRESSIBLE_TYPES)
+
+    async def _pass_through(self, start: Message) -> None:
+        self.passthrough = True
+        # The response could have been compressed for another client
+        MutableHeaders(raw=start["headers"]).add_vary_header("Accept-Encoding")
+        await self.send(start)
@@ -1,5 +1,6 @@
 # Set the PICTOGRAMS_FILE and API_KEY attributes
 
+import logging
 import os
 import pathlib
 import secrets
@@ -39,12 +40,85 @@ class Settings(BaseSettings):
     SECRET_KEY: str = secrets.token_urlsafe(32)
     # 60 minutes * 24 hours * 8 days = 8 days
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8
+    # Cache of the authenticated users (0 disables it)
+    USER_CACHE_TTL_SECONDS: int = 30
+    USER_CACHE_MAX_SIZE: int = 1024
     FRONTEND_HOST: str = "http://localhost:5174"
     ENVIRONMENT: Literal["local", "staging", "production"] = "local"
     OPENAI_API_KEY: str | None = None
     DEFAULT_LANGUAGE: str = "it"
     API_KEY: str | None = None  # Alias for OPENAI_API_KEY for backward compatibility
     PICTOGRAMS_FILE: str | None = None  # Will be set dynamically by get_pictograms_file
+    BULK_MAX_ITEMS: int = 1000  # Maximum number of items accepted by the bulk endpoints
+    CATALOG_CACHE_MAX_AGE: int = 60  # Cache-Control max-age of the PECS and category catalog routes
+    FAST_JSON_RESPONSES: bool = False  # Opt-in: serialize the large list routes with app.api.fast_json
+    # Response compression (see app.core.compression)
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_ENCODINGS: list[str] = ["br", "zstd", "gzip"]  # Server preference, when the client accepts several
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # Smaller bodies are sent as they are
+    COMPRESSION_THREAD_MIN_SIZE: int = 256 * 1024  # Larger bodies are compressed off the event loop
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 5  # 0-11: above 6 the gain is small and the cost high
+    COMPRESSION_ZSTD_LEVEL: int = 3
+    # Request metrics on /metrics (see app.core.metrics), off by default: the
+    # endpoint is outside the API and describes every route
+    METRICS_ENABLED: bool = False
+    METRICS_TOKEN: str | None = None  # When set, /metrics requires "Authorization: Bearer <token>"
+    # Local development: warn when one request runs the same SQL statement more
+    # times than this (see app.core.query_counter), 0 disables
+    QUERY_REPEAT_WARN_THRESHOLD: int = 10
+    # Structured logging (see app.core.log)
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: Literal["json", "text"] = "json"
+    # Path prefix -> fraction of the requests whose DEBUG and INFO records are kept,
+    # e.g. {"/api/v1/analyze": 0.1}; the longest matching prefix wins, default 1
+    LOG_SAMPLE_RATES: dict[str, float] = {}
+    # Coalescing of identical concurrent LLM calls, also across the workers through file locks
+    SINGLE_FLIGHT_CROSS_WORKER: bool = True
+    SINGLE_FLIGHT_DIR: str | None = None  # Defaults to a directory in the system temp dir
+    OPENAI_BASE_URL: str | None = None  # None for the default OpenAI API URL
+    # OpenAI client limits, they bound the latency of the LLM routes
+    LLM_TIMEOUT_SECONDS: float = 15.0
+    LLM_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    LLM_MAX_RETRIES: int = 1
+    # Connection pool shared by the OpenAI clients (see app.core.llm_clients)
+    LLM_POOL_MAX_CONNECTIONS: int = 50
+    LLM_POOL_MAX_KEEPALIVE: int = 20
+    LLM_POOL_KEEPALIVE_EXPIRY: float = 60.0
+    LLM_HTTP2: bool = True  # Used only when the h2 package is installed
+    # TextTokenizer.tokenize_batch: sentences packed in one request up to a token budget
+    TOKENIZE_BATCH_TOKEN_BUDGET: int = 1500
+    TOKENIZE_BATCH_MAX_SENTENCES: int = 40
+    TOKENIZE_BATCH_RETRIES: int = 1  # Batched retries of the items missing from a response
+    TOKENIZE_BATCH_CONCURRENCY: int = 4
+    # Semantic pictogram index (see app.services.embedding_index), needs numpy
+    EMBEDDING_INDEX_DIR: str | None = None  # Defaults to app/data/embeddings
+    SEMANTIC_MIN_SCORE: float = 0.5  # Minimum cosine similarity of a semantic match
+    LLM_PHRASE_MODEL: str = "gpt-4"  # Model of token_2_phrase / phrase_2_token
+    # Memoization of token_2_phrase / phrase_2_token by pictogram sequence and language
+    PHRASE_CACHE_TTL_SECONDS: int = 60 * 60 * 24
+    PHRASE_CACHE_MAX_SIZE: int = 4096
+    # Circuit breaker of the LLM services (see app.services.circuit_breaker)
+    LLM_BREAKER_FAILURE_RATE: float = 0.5
+    LLM_BREAKER_WINDOW_SIZE: int = 20
+    LLM_BREAKER_MIN_CALLS: int = 5
+    LLM_BREAKER_SLOW_CALL_SECONDS: float = 8.0
+    LLM_BREAKER_OPEN_SECONDS: float = 30.0
+    # Per-user pictogram usage ranking (see app.services.pecs_usage)
+    PECS_USAGE_TOP_N: int = 200  # Most used pictograms of a user kept in memory
+    PECS_USAGE_CACHE_TTL_SECONDS: int = 300
+    PECS_USAGE_CACHE_MAX_USERS: int = 1024
+    PECS_USAGE_BOOST: float = 0.3  # Added to the similarity of the user's most used pictogram
+    PECS_USAGE_FAVORITE_WEIGHT: int = 3  # Uses counted when a pictogram is added to the favorites
+    # Next-pictogram prediction (see app.services.next_pecs)
+    NEXT_PECS_REFRESH_SECONDS: int = 600  # Full rebuild from the database, 0 disables it
+    NEXT_PECS_USER_WEIGHT: float = 0.6  # Weight of the user's own phrases against all the phrases
+    # Per-language catalog snapshots (see app.services.catalog_snapshot)
+    SNAPSHOT_DIR: str | None = None  # Defaults to a directory in the system temp dir
+    SNAPSHOT_GZIP_LEVEL: int = 9
+    SNAPSHOT_ZSTD_LEVEL: int = 19  # Built once per catalog change, so the slow levels pay off
+    SNAPSHOT_DEBOUNCE_SECONDS: int = 30  # Wait after a catalog change, to merge the following ones
+    SNAPSHOT_AUTO_BUILD: bool = True
     
     # Supabase configuration
     SUPABASE_URL: str | None = None
@@ -154,12 +228,12 @@ class Settings(BaseSettings):
         lang_file = data_dir / f"{lang}_pittogrammi.json"
         
         if lang_file.exists():
-            print(f"Using language file: {lang_file}")
+            logging.getLogger(__name__).debug("Using language file: %s", lang_file)
             return str(lang_file)
         
         # Fallback to default file in app directory
         default_file = os.path.join(app_dir, "pittogrammi.json")
-        print(f"Using default file: {default_file}")
+        logging.getLogger(__name__).debug("Using default file: %s", default_file)
         with open(default_file, 'w', encoding='utf-8') as f:
             f.write('{"pittogrammi": []}')
         
@@ -3,6 +3,11 @@ from sqlmodel import Session, create_engine, select
 from app import crud
 from app.core.config import settings
 from app.models import User, UserCreate
+# Registers the session events that keep the catalog versions and the sync log up to date
+import app.services.catalog_version  # noqa: F401
+import app.services.sync_log  # noqa: F401
+# Schedules the rebuild of the catalog snapshots after a catalog change
+import app.services.catalog_snapshot  # noqa: F401
 
 engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
 
@@ -0,0 +1,108 @@
+"""
+Application-scoped OpenAI clients.
+
+All the LLM services share the clients of this registry instead of creating
+their own, so the TLS connections to the API are kept alive and reused. Each
+client has a tuned httpx connection pool, explicit timeouts and HTTP/2 when
+the h2 package is installed. The clients are closed on application shutdown
+(see the lifespan in app.main). Their calls, latency and tokens are
+recorded in app.core.metrics.
+"""
+import threading
+from typing import Dict, Optional
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+from app.core.config import settings
+from app.core.metrics import LLM_ASYNC_EVENT_HOOKS, LLM_EVENT_HOOKS
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(settings.LLM_TIMEOUT_SECONDS, connect=settings.LLM_CONNECT_TIMEOUT_SECONDS)
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.LLM_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=settings.LLM_POOL_KEEPALIVE_EXPIRY,
+    )
+
+
+class LLMClients:
+    """
+    Registry of the shared OpenAI clients, one sync and one async client per
+    API key and base URL.
+
+    Args:
+        base_url: OpenAI API base URL, None for the default one (the offline
+            tests point it to a local stub server)
+    """
+
+    def __init__(self, base_url: Optional[str] = None) -> None:
+        self.base_url = base_url
+        self._clients: Dict[Optional[str], OpenAI] = {}
+        self._async_clients: Dict[Optional[str], AsyncOpenAI] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def http2(self) -> bool:
+        return settings.LLM_HTTP2 and HTTP2_AVAILABLE
+
+    def client(self, api_key: Optional[str] = None) -> OpenAI:
+        """Shared sync client, api_key defaults to OPENAI_API_KEY."""
+        api_key = api_key or settings.OPENAI_API_KEY
+        with self._lock:
+            client = self._clients.get(api_key)
+            if client is None:
+                http_client = httpx.Client(
+                    limits=_limits(), timeout=_timeout(), http2=self.http2, event_hooks=LLM_EVENT_HOOKS
+                )
+                client = self._clients[api_key] = OpenAI(
+                    api_key=api_key,
+                    base_url=self.base_url,
+                    timeout=_timeout(),
+                    max_retries=settings.LLM_MAX_RETRIES,
+                    http_client=http_client,
+                )
+            return client
+
+    def async_client(self, api_key: Optional[str] = None) -> AsyncOpenAI:
+        """Shared async client, api_key defaults to OPENAI_API_KEY."""
+        api_key = api_key or settings.OPENAI_API_KEY
+        with self._lock:
+            client = self._async_clients.get(api_key)
+            if client is None:
+                http_client = httpx.AsyncClient(
+                    limits=_limits(), timeout=_timeout(), http2=self.http2, event_hooks=LLM_ASYNC_EVENT_HOOKS
+                )
+                client = self._async_clients[api_key] = AsyncOpenAI(
+                    api_key=api_key,
+                    base_url=self.base_url,
+                    timeout=_timeout(),
+                    max_retries=settings.LLM_MAX_RETRIES,
+                    http_client=http_client,
+                )
+            return client
+
+    async def aclose(self) -> None:
+        """Close all the clients and their connection pools."""
+        with self._lock:
+            clients = list(self._clients.values())
+            async_clients = list(self._async_clients.values())
+            self._clients.clear()
+            self._async_clients.clear()
+        for client in clients:
+            client.close()
+        for async_client in async_clients:
+            await async_client.close()
+
+
+llm_clients = LLMClients(base_url=settings.OPENAI_BASE_URL)
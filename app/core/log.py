@@ -0,0 +1,191 @@
+"""
+Structured, leveled logging.
+
+    logger = get_logger(__name__)
+    logger.debug("pecs_info built", pecs_id=pecs.id, language_code=language_code)
+
+Each record is an event name plus key=value fields, written as one JSON
+object per line (LOG_FORMAT=json) or as text. A record below the logger
+level costs one level check: nothing is formatted or converted.
+
+Records go through a queue to a single writer thread (QueueHandler and
+QueueListener), so logging never blocks a request on a slow stdout. The
+fields are converted to plain values before being queued, in the thread
+that logs them, as the ORM objects cannot be read from another thread.
+
+Per-route sampling: LogContextMiddleware decides once per request whether
+its DEBUG and INFO records are kept, with the LOG_SAMPLE_RATES rate of the
+longest matching path prefix (all of them by default). Warnings and errors
+are always kept. Every record of a request carries its request_id.
+"""
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+
+# request_id and sampling decision of the request being served
+request_context: ContextVar[Optional[Dict[str, Any]]] = ContextVar("request_context", default=None)
+
+_PLAIN = (str, int, float, bool, type(None))
+
+
+def _plain(value: Any) -> Any:
+    return value if isinstance(value, _PLAIN) else str(value)
+
+
+class StructuredLogger:
+    """Logger taking an event name and keyword fields."""
+
+    __slots__ = ("_logger",)
+
+    def __init__(self, name: str) -> None:
+        self._logger = logging.getLogger(name)
+
+    def is_enabled(self, level: int) -> bool:
+        """For the fields that are expensive to compute."""
+        if not self._logger.isEnabledFor(level):
+            return False
+        context = request_context.get()
+        return level >= logging.WARNING or context is None or context["sampled"]
+
+    def _log(self, level: int, event: str, fields: Dict[str, Any], exc_info: bool = False) -> None:
+        if not self.is_enabled(level):
+            return
+        context = request_context.get()
+        extra = {"fields": {key: _plain(value) for key, value in fields.items()}}
+        if context is not None:
+            extra["request_id"] = context["request_id"]
+        self._logger.log(level, event, extra=extra, exc_info=exc_info, stacklevel=3)
+
+    def debug(self, event: str, **fields: Any) -> None:
+        self._log(logging.DEBUG, event, fields)
+
+    def info(self, event: str, **fields: Any) -> None:
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event: str, **fields: Any) -> None:
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event: str, **fields: Any) -> None:
+        self._log(logging.ERROR, event, fields)
+
+    def exception(self, event: str, **fields: Any) -> None:
+        """An error with the traceback of the exception being handled."""
+        self._log(logging.ERROR, event, fields, exc_info=True)
+
+
+def get_logger(name: str) -> StructuredLogger:
+    return StructuredLogger(name)
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id is not None:
+            entry["request_id"] = request_id
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self) -> None:
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        message = super().formatMessage(record)
+        fields = dict(getattr(record, "fields", {}))
+        request_id = getattr(record, "request_id", None)
+        if request_id is not None:
+            fields["request_id"] = request_id
+        if fields:
+            message += " " + " ".join(f"{key}={value!r}" for key, value in fields.items())
+        return message
+
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Unlike QueueHandler.prepare, leaves the formatting to the writer
+        # thread; only what depends on the caller is resolved here
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging() -> None:
+    """Route the app loggers through the queue, once per process."""
+    global _listener
+    if _listener is not None:
+        return
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JSONFormatter() if settings.LOG_FORMAT == "json" else TextFormatter())
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    _listener = QueueListener(records, output, respect_handler_level=False)
+    _listener.start()
+    atexit.register(stop_logging)
+
+    logger = logging.getLogger("app")
+    logger.setLevel(settings.LOG_LEVEL.upper())
+    logger.addHandler(_QueueHandler(records))
+    logger.propagate = False
+
+
+def stop_logging() -> None:
+    """Write the queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def sample_rate(path: str) -> float:
+    rates = settings.LOG_SAMPLE_RATES
+    prefix = max((prefix for prefix in rates if path.startswith(prefix)), key=len, default=None)
+    return 1.0 if prefix is None else rates[prefix]
+
+
+class LogContextMiddleware:
+    """Sets the request_id and the sampling decision of each request."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        rate = sample_rate(scope["path"])
+        token = request_context.set({
+            "request_id": uuid.uuid4().hex[:16],
+            "sampled": rate >= 1.0 or random.random() < rate,
+        })
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_context.reset(token)
@@ -0,0 +1,353 @@
+"""
+Request metrics in the Prometheus text format, served on /metrics.
+
+Per route template (/api/v1/phrases/{phrase_id}, not the actual paths):
+the request count and latency, and per request the number and time of the
+SQL statements and the time spent waiting for the LLM. Comparing
+http_request_db_duration_seconds and http_request_llm_duration_seconds with
+http_request_duration_seconds of a route tells whether it is DB- or
+LLM-bound.
+
+The SQL statements are counted by SQLAlchemy engine events on every engine,
+the LLM calls by httpx event hooks on the shared OpenAI clients (see
+app.core.llm_clients), with the tokens reported in the usage of each
+response. The hit and miss counters of the named TTLCaches and the
+compression stats are exported as they are.
+
+The metrics live in the process: each worker serves its own, which
+Prometheus aggregates over the scraped instances. No client library is
+needed.
+"""
+import json
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import httpx
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.cache import named_caches
+from app.core.compression import compression_stats
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+Labels = Tuple[str, ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_sample(name: str, labels: Dict[str, str], value: float) -> str:
+    if labels:
+        name += "{" + ",".join(f'{key}="{_escape(str(label))}"' for key, label in labels.items()) + "}"
+    return f"{name} {value!r}" if isinstance(value, float) else f"{name} {value}"
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def samples(self) -> Iterable[Sample]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield self.name + "_total", dict(zip(self.labelnames, labels)), value
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(
+        self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket (not cumulative), +Inf count, sum]
+        self._values: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                counts = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            else:
+                counts[len(self.buckets)] += 1
+            counts[-1] += value
+
+    def count(self, *labels: str) -> int:
+        counts = self._values.get(labels)
+        return int(sum(counts[:-1])) if counts else 0
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            values = sorted((labels, list(counts)) for labels, counts in self._values.items())
+        for labels, counts in values:
+            base = dict(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts[:-1]):
+                cumulative += bucket_count
+                yield self.name + "_bucket", {**base, "le": "+Inf" if bound == float("inf") else repr(float(bound))}, cumulative
+            yield self.name + "_count", base, cumulative
+            yield self.name + "_sum", base, counts[-1]
+
+
+class _Collected(_Metric):
+    """Metric whose samples are read, when rendered, from another component."""
+
+    def __init__(self, name: str, type: str, help: str, collect: Callable[[], Iterable[Sample]]) -> None:
+        super().__init__(name, help)
+        self.type = type
+        self._collect = collect
+
+    def samples(self) -> Iterable[Sample]:
+        return self._collect()
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(
+        self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def collected(self, name: str, type: str, help: str, collect: Callable[[], Iterable[Sample]]) -> None:
+        self.register(_Collected(name, type, help, collect))
+
+    def render(self) -> str:
+        """All the metrics in the Prometheus text exposition format 0.0.4."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(_format_sample(*sample) for sample in metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_requests = registry.counter(
+    "http_requests", "HTTP requests by route template and status.", ("method", "route", "status")
+)
+http_duration = registry.histogram(
+    "http_request_duration_seconds", "Time to the end of the response, by route template.", ("method", "route")
+)
+http_db_queries = registry.histogram(
+    "http_request_db_queries", "SQL statements run by one request.", ("route",), QUERY_COUNT_BUCKETS
+)
+http_db_duration = registry.histogram(
+    "http_request_db_duration_seconds", "Time spent in SQL statements by one request.", ("route",)
+)
+http_llm_duration = registry.histogram(
+    "http_request_llm_duration_seconds", "Time spent waiting for the LLM by one request.", ("route",)
+)
+db_queries = registry.counter("db_queries", "SQL statements run, also outside of the requests.")
+db_duration = registry.histogram("db_query_duration_seconds", "Time of the SQL statements.")
+llm_requests = registry.counter("llm_requests", "Requests to the OpenAI API, retries included.", ("model", "status"))
+llm_duration = registry.histogram(
+    "llm_request_duration_seconds", "Time of the requests to the OpenAI API, body included.", ("model",)
+)
+llm_tokens = registry.counter("llm_tokens", "Tokens reported by the OpenAI API.", ("model", "type"))
+
+
+def _cache_samples(attribute: str) -> Callable[[], Iterable[Sample]]:
+    def collect() -> Iterable[Sample]:
+        for name, cache in sorted(named_caches.items()):
+            yield f"cache_{attribute}_total", {"cache": name}, getattr(cache, attribute)
+    return collect
+
+
+def _compression_samples(field: str) -> Callable[[], Iterable[Sample]]:
+    def collect() -> Iterable[Sample]:
+        for stats in compression_stats.snapshot():
+            yield f"compression_{field}_total", {"encoding": stats["encoding"]}, stats[field]
+    return collect
+
+
+registry.collected("cache_hits", "counter", "Hits of the in-memory caches.", _cache_samples("hits"))
+registry.collected("cache_misses", "counter", "Misses of the in-memory caches.", _cache_samples("misses"))
+registry.collected(
+    "compression_responses", "counter", "Responses compressed, by encoding.", _compression_samples("responses")
+)
+registry.collected(
+    "compression_uncompressed_bytes", "counter", "Response bytes before compression.",
+    _compression_samples("uncompressed_bytes"),
+)
+registry.collected(
+    "compression_compressed_bytes", "counter", "Response bytes after compression.",
+    _compression_samples("compressed_bytes"),
+)
+
+
+def route_template(scope: Scope) -> str:
+    """The template of the route matched by the router, "unmatched" when none did."""
+    # The unmatched paths share one label, they would make one series each
+    return getattr(scope.get("route"), "path_format", None) or "unmatched"
+
+
+class RequestMetrics:
+    """What one request spent in the database and the LLM."""
+
+    __slots__ = ("db_queries", "db_seconds", "llm_calls", "llm_seconds")
+
+    def __init__(self) -> None:
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+
+
+# Metrics of the request being served; the sync routes run in the
+# threadpool with a copy of the context, which holds the same object
+current_request: ContextVar[Optional[RequestMetrics]] = ContextVar("current_request", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    context._metrics_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - context._metrics_start
+    db_queries.inc()
+    db_duration.observe(elapsed)
+    request = current_request.get()
+    if request is not None:
+        request.db_queries += 1
+        request.db_seconds += elapsed
+
+
+def _model(request: httpx.Request) -> str:
+    try:
+        return str(json.loads(request.content).get("model") or "unknown")
+    except (ValueError, AttributeError, httpx.RequestNotRead):
+        return "unknown"
+
+
+def _record_llm_response(response: httpx.Response) -> None:
+    elapsed = time.perf_counter() - response.request.extensions.get("metrics_start", time.perf_counter())
+    model = _model(response.request)
+    llm_requests.inc(model, str(response.status_code))
+    llm_duration.observe(elapsed, model)
+    request = current_request.get()
+    if request is not None:
+        request.llm_calls += 1
+        request.llm_seconds += elapsed
+    try:
+        usage = response.json().get("usage") or {}
+    except (ValueError, AttributeError):
+        return
+    for kind in ("prompt_tokens", "completion_tokens"):
+        if usage.get(kind):
+            llm_tokens.inc(model, kind.split("_")[0], amount=usage[kind])
+
+
+def _streamed(response: httpx.Response) -> bool:
+    return response.headers.get("content-type", "").startswith("text/event-stream")
+
+
+def _start_llm_request(request: httpx.Request) -> None:
+    request.extensions["metrics_start"] = time.perf_counter()
+
+
+def _end_llm_request(response: httpx.Response) -> None:
+    if not _streamed(response):
+        # Read here so that the time includes the body; the client reuses it
+        response.read()
+        _record_llm_response(response)
+
+
+async def _astart_llm_request(request: httpx.Request) -> None:
+    _start_llm_request(request)
+
+
+async def _aend_llm_request(response: httpx.Response) -> None:
+    if not _streamed(response):
+        await response.aread()
+        _record_llm_response(response)
+
+
+# event_hooks of the httpx clients of the OpenAI clients
+LLM_EVENT_HOOKS = {"request": [_start_llm_request], "response": [_end_llm_request]}
+LLM_ASYNC_EVENT_HOOKS = {"request": [_astart_llm_request], "response": [_aend_llm_request]}
+
+
+class MetricsMiddleware:
+    """
+    Records the latency, status, SQL statements and LLM time of each request.
+
+    Usage:
+        app.add_middleware(MetricsMiddleware)
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request = RequestMetrics()
+        token = current_request.set(request)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_request.reset(token)
+            template = route_template(scope)
+            http_requests.inc(scope["method"], template, str(status))
+            http_duration.observe(elapsed, scope["method"], template)
+            http_db_queries.observe(request.db_queries, template)
+            http_db_duration.observe(request.db_seconds, template)
+            http_llm_duration.observe(request.llm_seconds, template)
@@ -0,0 +1,134 @@
+"""
+Counting of the SQL statements, to find the N+1 query patterns.
+
+A route that lazy-loads a relationship per row runs the same statement,
+with different parameters, once per row: the statements are grouped by
+their shape (the SQL with the literals and IN lists folded) to show them.
+
+    with count_queries(engine) as queries:
+        ...
+    print(len(queries), queries.report())
+
+The tests declare query budgets with app.tests.utils.queries, and in local
+development RepeatedQueryMiddleware logs a warning for each statement shape
+a request runs more than QUERY_REPEAT_WARN_THRESHOLD times.
+"""
+import re
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.log import get_logger
+from app.core.metrics import route_template
+
+logger = get_logger(__name__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![A-Za-z0-9.])\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:[^()]|\([^()]*\))*\)", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """The statement with the literals and the IN lists folded, so that the runs of the same query match."""
+    shape = _STRING.sub("?", statement)
+    # Bound parameter names are numbered too (%(pecs_id_1)s): folded with the numbers
+    shape = _NUMBER.sub("?", shape)
+    shape = _IN_LIST.sub("IN (...)", shape)
+    return _SPACE.sub(" ", shape).strip()
+
+
+class QueryLog:
+    """The SQL statements run in a block of code or a request."""
+
+    def __init__(self) -> None:
+        self.statements: List[str] = []
+        self._lock = threading.Lock()
+
+    def add(self, statement: str) -> None:
+        with self._lock:
+            self.statements.append(statement)
+
+    def __len__(self) -> int:
+        return len(self.statements)
+
+    def repeated(self, threshold: int = 2) -> List[Tuple[str, int]]:
+        """(shape, count) of the shapes run at least threshold times, most frequent first."""
+        counts = Counter(statement_shape(statement) for statement in self.statements)
+        return [(shape, count) for shape, count in counts.most_common() if count >= threshold]
+
+    def report(self, threshold: int = 2) -> str:
+        repeated = self.repeated(threshold)
+        if not repeated:
+            return "No repeated statements"
+        return "Repeated statements:\n" + "\n".join(f"  {count}x {shape}" for shape, count in repeated)
+
+
+@contextmanager
+def count_queries(engine=Engine) -> Iterator[QueryLog]:
+    """
+    Log the statements run on engine (by default on every engine) in the
+    block, in any thread.
+    """
+    queries = QueryLog()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        queries.add(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield queries
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+# Statements of the request being served, when RepeatedQueryMiddleware is installed
+current_queries: ContextVar[Optional[QueryLog]] = ContextVar("current_queries", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    queries = current_queries.get()
+    if queries is not None:
+        queries.add(statement)
+
+
+class RepeatedQueryMiddleware:
+    """
+    Development aid: logs a warning for each statement shape run more than
+    threshold times by one request, the sign of a lazy load per row.
+
+    Usage:
+        app.add_middleware(RepeatedQueryMiddleware)
+    """
+
+    def __init__(self, app: ASGIApp, threshold: Optional[int] = None) -> None:
+        self.app = app
+        self.threshold = settings.QUERY_REPEAT_WARN_THRESHOLD if threshold is None else threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        queries = QueryLog()
+        token = current_queries.set(queries)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_queries.reset(token)
+            for shape, count in queries.repeated(self.threshold + 1):
+                logger.warning(
+                    "repeated sql statement",
+                    method=scope["method"],
+                    route=route_template(scope),
+                    count=count,
+                    statements=len(queries),
+                    statement=shape[:500],
+                )
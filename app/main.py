@@ -1,23 +1,42 @@
+from contextlib import asynccontextmanager
+
 import sentry_sdk
 from fastapi import FastAPI
 from fastapi.routing import APIRoute
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
+from app.api.routes import metrics
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
+from app.core.log import LogContextMiddleware, setup_logging, stop_logging
+from app.core.metrics import MetricsMiddleware
+from app.core.query_counter import RepeatedQueryMiddleware
+from app.core.llm_clients import llm_clients
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
     return f"{route.tags[0]}-{route.name}"
 
 
+setup_logging()
+
 if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
     sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Close the pooled connections of the shared OpenAI clients
+    await llm_clients.aclose()
+    stop_logging()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
+    lifespan=lifespan,
 )
 
 # Set all CORS enabled origins
@@ -30,4 +49,19 @@ if settings.all_cors_origins:
         allow_headers=["*"],
     )
 
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+if settings.ENVIRONMENT == "local" and settings.QUERY_REPEAT_WARN_THRESHOLD:
+    app.add_middleware(RepeatedQueryMiddleware)
+
+# Outermost, so that the request_id covers the whole request
+app.add_middleware(LogContextMiddleware)
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
+
+if settings.METRICS_ENABLED:
+    app.include_router(metrics.router)
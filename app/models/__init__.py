@@ -5,11 +5,11 @@ from .auth import Message, Token, TokenPayload, NewPassword, UpdatePassword
 from .user import User, UserCreate, UserPublic, UsersPublic, UserUpdate, UserUpdateMe, UserRegister
 from .post import Post, PostCreate, PostUpdate, PostPublic, PostsPublic
 from .nome import Nome, NomeCreate, NomeUpdate
-from .analyze_models import PhraseRequest, WordRequest, PictogramResponse
+from .analyze_models import PhraseRequest, WordRequest, PictogramResponse, NextPECSResponse
 from .image import Image, ImageBase, ImageCreate, ImageUpdate, ImagePublic, ImagesPublic
 
 # SyncLog models
-from .sync_log import SyncLog, SyncLogBase, SyncLogCreate, SyncLogRead
+from .sync_log import SyncLog, SyncLogBase, SyncLogCreate, SyncLogRead, SyncChange, SyncChanges
 
 # PECS models
 from .pecs import (
@@ -32,6 +32,9 @@ from .collection import (
     PhraseCollection
 )
 from .favorite import FavoritePECS, FavoritePECSBase, FavoritePhrase, FavoritePhraseBase
+from .bulk import BulkItemResult, BulkResult
+from .catalog_version import CatalogVersion
+from .pecs_usage import PECSUsage
 
 __all__ = [
     "Item",
@@ -63,8 +66,9 @@ __all__ = [
     "PhraseRequest",
     "WordRequest",
     "PictogramResponse",
+    "NextPECSResponse",
     # SyncLog
-    'SyncLog', 'SyncLogBase', 'SyncLogCreate', 'SyncLogRead',
+    'SyncLog', 'SyncLogBase', 'SyncLogCreate', 'SyncLogRead', 'SyncChange', 'SyncChanges',
     # PECS
     'PECS', 'PECSBase', 'PECSCreate', 'PECSUpdate', 'PECSRead',
     'PECSTranslation', 'PECSTranslationBase', 'PECSTranslationCreate', 'PECSTranslationUpdate', 'PECSTranslationRead',
@@ -82,6 +86,12 @@ __all__ = [
     'PhraseCollection',
     # Favorites
     'FavoritePECS', 'FavoritePECSBase', 'FavoritePhrase', 'FavoritePhraseBase',
+    # Bulk operations
+    'BulkItemResult', 'BulkResult',
+    # Catalog versions
+    'CatalogVersion',
+    # Usage statistics
+    'PECSUsage',
     # Images
     'Image', 'ImageBase', 'ImageCreate', 'ImageUpdate', 'ImagePublic', 'ImagesPublic'
 ]
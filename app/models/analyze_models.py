@@ -1,5 +1,6 @@
 # models/analyze_models.py
 from typing import Optional
+from uuid import UUID
 from sqlmodel import SQLModel
 
 # Classi per le richieste API
@@ -15,3 +16,7 @@ class PictogramResponse(SQLModel):
     url: Optional[str] = None
     error: Optional[str] = None
     origin: Optional[str] = None
+
+class NextPECSResponse(SQLModel):
+    pecs_id: UUID
+    score: float  # Estimated probability of being the next pictogram
@@ -0,0 +1,24 @@
+from typing import List, Literal, Optional, Union
+from uuid import UUID
+
+from sqlmodel import SQLModel
+
+
+class BulkItemResult(SQLModel):
+    """Outcome of a single item of a bulk request"""
+    index: int  # Position of the item in the request array
+    status: Literal["created", "skipped", "failed"]
+    id: Optional[Union[UUID, int]] = None
+    detail: Optional[str] = None
+
+
+class BulkResult(SQLModel):
+    """Response of a bulk request, with one result per submitted item"""
+    created: int = 0
+    skipped: int = 0
+    failed: int = 0
+    results: List[BulkItemResult] = []
+
+    def add(self, index: int, status: str, id: Optional[Union[UUID, int]] = None, detail: Optional[str] = None) -> None:
+        self.results.append(BulkItemResult(index=index, status=status, id=id, detail=detail))
+        setattr(self, status, getattr(self, status) + 1)
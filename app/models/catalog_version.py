@@ -0,0 +1,17 @@
+# models/catalog_version.py
+from datetime import datetime, timezone
+from sqlmodel import Field, SQLModel
+
+
+def _utcnow() -> datetime:
+    # Stored without timezone, always UTC
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class CatalogVersion(SQLModel, table=True):
+    """Version counter of a catalog, bumped on every write to its tables"""
+    __tablename__ = "catalog_versions"
+
+    name: str = Field(primary_key=True, max_length=50)  # 'pecs', 'categories'
+    version: int = Field(default=0)
+    updated_at: datetime = Field(default_factory=_utcnow)
@@ -53,7 +53,9 @@ class PECSTranslation(PECSTranslationBase, table=True):
     
     id: UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     pecs_id: UUID = Field(foreign_key="pecs.id")
-    
+    # Hash of the imported source content, used by the incremental pictogram sync
+    content_hash: Optional[str] = Field(default=None, max_length=64)
+
     # Relationships
     pecs: "PECS" = Relationship(back_populates="translations")
     
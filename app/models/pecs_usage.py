@@ -0,0 +1,26 @@
+# models/pecs_usage.py
+from datetime import datetime, timezone
+from uuid import UUID
+
+from sqlalchemy import Index
+from sqlmodel import Field, SQLModel
+
+
+def _utcnow() -> datetime:
+    # Stored without timezone, always UTC
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class PECSUsage(SQLModel, table=True):
+    """How many times a user used a PECS (in saved phrases and favorites)"""
+    __tablename__ = "pecs_usage"
+    __table_args__ = (
+        # Top-N of a user by a single index range scan
+        Index("ix_pecs_usage_user_count", "user_id", "count"),
+    )
+
+    # Derived data: deleted with the user or the PECS
+    user_id: UUID = Field(foreign_key="user.id", primary_key=True, ondelete="CASCADE")
+    pecs_id: UUID = Field(foreign_key="pecs.id", primary_key=True, ondelete="CASCADE")
+    count: int = Field(default=0)
+    last_used_at: datetime = Field(default_factory=_utcnow)
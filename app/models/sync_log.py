@@ -1,6 +1,7 @@
 # models/sync_log.py
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
+from sqlalchemy import BigInteger, Index
 from sqlmodel import Field, SQLModel, Relationship
 from pydantic import validator
 import uuid
@@ -13,7 +14,8 @@ class SyncLogBase(SQLModel):
     entity_type: str = Field(max_length=20)  # 'category', 'pictogram', 'sequence', 'sequence_group'
     entity_id: UUID
     action: str = Field(max_length=10)  # 'create', 'update', 'delete'
-    user_id: Optional[UUID] = Field(default=None, foreign_key="user.id")
+    # The rows of a user are private and deleted with the user
+    user_id: Optional[UUID] = Field(default=None, foreign_key="user.id", ondelete="CASCADE")
     
     @validator('entity_type')
     def validate_entity_type(cls, v):
@@ -41,9 +43,30 @@ class SyncLogRead(SyncLogBase):
 
 class SyncLog(SyncLogBase, table=True):
     __tablename__ = "sync_log"
+    __table_args__ = (
+        # Keyset pagination of /sync/changes
+        Index("ix_sync_log_txid_timestamp_id", "txid", "timestamp", "id"),
+    )
     
     id: UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     timestamp: datetime = Field(default_factory=datetime.now)
+    # PostgreSQL id of the writing transaction (txid_current()), 0 elsewhere
+    txid: int = Field(default=0, sa_type=BigInteger)
     
     # Relazioni
-    user: Optional[User] = Relationship(sa_relationship_kwargs={"foreign_keys": "SyncLog.user_id"})
\ No newline at end of file
+    user: Optional[User] = Relationship(sa_relationship_kwargs={"foreign_keys": "SyncLog.user_id"})
+
+
+class SyncChange(SQLModel):
+    # Last change of an entity since the cursor
+    entity_type: str
+    entity_id: UUID
+    action: str
+    timestamp: datetime
+
+
+class SyncChanges(SQLModel):
+    changes: List[SyncChange] = []
+    cursor: str  # Opaque, pass it as since in the next call
+    has_more: bool = False  # More changes after the cursor: call again
+    full_sync: bool = False  # No cursor was given: download the full lists first
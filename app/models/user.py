@@ -43,7 +43,12 @@ class User(UserBase, table=True):
     items: List["Item"] = Relationship(back_populates="owner", sa_relationship_kwargs={"cascade": "all, delete"})
     posts: List["Post"] = Relationship(back_populates="owner", sa_relationship_kwargs={"cascade": "all, delete"})
 
-    sync_logs: List["SyncLog"] = Relationship(back_populates="user")
+    # Deleted by the database (ON DELETE CASCADE): nulling the user_id would
+    # make the private rows shared
+    sync_logs: List["SyncLog"] = Relationship(
+        back_populates="user",
+        sa_relationship_kwargs={"cascade": "all, delete-orphan", "passive_deletes": True}
+    )
     
     # PECS relationships
     pecs: List["PECS"] = Relationship(back_populates="user")
@@ -0,0 +1,303 @@
+"""
+Per-language snapshots of the PECS catalog, downloaded by the new devices.
+
+A snapshot holds the shared PECS (not the custom ones of the users) with a
+translation in the language, the categories, and the category membership, as columnar JSON (one array per
+field) compressed with gzip and, when the zstandard package is installed,
+zstd. It also holds the catalog versions it was built from and a
+/sync/changes cursor taken before reading the catalog: a device downloads
+the snapshot once, then syncs the changes from that cursor, so an outdated
+snapshot is never wrong, only longer to catch up.
+
+The snapshots are built in a background thread after a commit that changed
+the catalog (debounced by SNAPSHOT_DEBOUNCE_SECONDS), and on demand when
+the endpoint finds the stored one older than the catalog; meanwhile the
+previous snapshot is served. Each file is named after the hash of its
+content, which is also its ETag, and <language>.json points to the
+current one.
+"""
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from itertools import chain
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, Session
+from sqlmodel import select
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+from app.core.config import settings
+from app.core.log import get_logger
+from app.models import CategoryTranslation, PECS, PECSCategory, PECSCategoryItem, PECSTranslation
+from app.services.catalog_version import catalogs_for_tables, get_catalog_versions
+from app.services.sync_log import latest_cursor
+
+logger = get_logger(__name__)
+
+SNAPSHOT_CATALOGS = ("pecs", "categories")
+# Bump when the layout of the snapshot changes
+SNAPSHOT_FORMAT = 1
+# Snapshots kept per language and encoding, for the downloads in progress
+KEEP_FILES = 2
+
+EXTENSIONS = {"gzip": "json.gz", "zstd": "json.zst"}
+MEDIA_TYPES = {"gzip": "application/gzip", "zstd": "application/zstd"}
+
+
+def available_encodings() -> List[str]:
+    return ["gzip", "zstd"] if zstandard is not None else ["gzip"]
+
+
+def snapshot_dir() -> str:
+    return settings.SNAPSHOT_DIR or os.path.join(tempfile.gettempdir(), "pecs-api-snapshots")
+
+
+def _columns(rows: Iterable[Dict[str, Any]], fields: List[str]) -> Dict[str, List[Any]]:
+    columns: Dict[str, List[Any]] = {field: [] for field in fields}
+    for row in rows:
+        for field in fields:
+            columns[field].append(row[field])
+    return columns
+
+
+def build_snapshot_data(session: Session, language: str) -> Dict[str, Any]:
+    """The content of the snapshot of a language, read with four queries."""
+    # Taken first: the changes made while reading are replayed by the sync
+    cursor = latest_cursor(session)
+    versions = get_catalog_versions(session, SNAPSHOT_CATALOGS)
+
+    pecs_rows = session.exec(
+        select(PECS, PECSTranslation.name)
+        .join(PECSTranslation, PECSTranslation.pecs_id == PECS.id)
+        .where(PECSTranslation.language_code == language, PECS.user_id.is_(None))
+        .order_by(PECS.id)
+    ).all()
+    category_rows = session.exec(
+        select(PECSCategory, CategoryTranslation.name)
+        .join(CategoryTranslation, CategoryTranslation.category_id == PECSCategory.id)
+        .where(CategoryTranslation.language_code == language)
+        .order_by(PECSCategory.id)
+    ).all()
+    pecs_ids = {pecs.id for pecs, _ in pecs_rows}
+    items = session.exec(
+        select(PECSCategoryItem.pecs_id, PECSCategoryItem.category_id)
+        .order_by(PECSCategoryItem.category_id, PECSCategoryItem.pecs_id)
+    ).all()
+
+    def text(value: Any) -> Optional[str]:
+        return None if value is None else str(value)
+
+    return {
+        "format": SNAPSHOT_FORMAT,
+        "language": language,
+        "catalog_versions": {name: versions[name][0] for name in SNAPSHOT_CATALOGS},
+        "sync_cursor": cursor.encode(),
+        "pecs": _columns((
+            {
+                "id": str(pecs.id),
+                "image_url": pecs.image_url,
+                "is_custom": pecs.is_custom,
+                "name_custom": pecs.name_custom,
+                "name": name,
+            }
+            for pecs, name in pecs_rows
+        ), ["id", "image_url", "is_custom", "name_custom", "name"]),
+        "categories": _columns((
+            {
+                "id": str(category.id),
+                "parent_id": text(category.parent_id),
+                "icon": category.icon,
+                "color": category.color,
+                "is_custom": category.is_custom,
+                "is_visible": category.is_visible,
+                "name_custom": category.name_custom,
+                "name": name,
+            }
+            for category, name in category_rows
+        ), ["id", "parent_id", "icon", "color", "is_custom", "is_visible", "name_custom", "name"]),
+        "category_items": _columns((
+            {"pecs_id": str(pecs_id), "category_id": str(category_id)}
+            for pecs_id, category_id in items
+            if pecs_id in pecs_ids
+        ), ["pecs_id", "category_id"]),
+    }
+
+
+def encode_snapshot(data: Dict[str, Any], encoding: str) -> bytes:
+    raw = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=settings.SNAPSHOT_ZSTD_LEVEL).compress(raw)
+    # mtime=0: the same content always gives the same bytes (and ETag)
+    return gzip.compress(raw, compresslevel=settings.SNAPSHOT_GZIP_LEVEL, mtime=0)
+
+
+@dataclass(frozen=True)
+class SnapshotFile:
+    path: str
+    etag: str
+    size: int
+    catalog_versions: Dict[str, int]
+    media_type: str
+
+
+def _manifest_path(language: str) -> str:
+    return os.path.join(snapshot_dir(), f"{language}.json")
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def write_snapshot(session: Session, language: str) -> Dict[str, Any]:
+    """Build and store the snapshots of a language, returns its manifest."""
+    data = build_snapshot_data(session, language)
+    directory = snapshot_dir()
+    os.makedirs(directory, exist_ok=True)
+
+    files = {}
+    for encoding in available_encodings():
+        content = encode_snapshot(data, encoding)
+        etag = hashlib.sha256(content).hexdigest()[:20]
+        name = f"{language}-{etag}.{EXTENSIONS[encoding]}"
+        path = os.path.join(directory, name)
+        if not os.path.exists(path):
+            _write_atomic(path, content)
+        files[encoding] = {"file": name, "etag": etag, "size": len(content)}
+
+    manifest = {"catalog_versions": data["catalog_versions"], "files": files}
+    _write_atomic(_manifest_path(language), json.dumps(manifest).encode("utf-8"))
+    _remove_old_files(directory, language, {entry["file"] for entry in files.values()})
+    return manifest
+
+
+def _remove_old_files(directory: str, language: str, current: set) -> None:
+    for extension in EXTENSIONS.values():
+        old = [
+            os.path.join(directory, name) for name in os.listdir(directory)
+            if name.startswith(f"{language}-") and name.endswith(f".{extension}") and name not in current
+        ]
+        old.sort(key=os.path.getmtime, reverse=True)
+        for path in old[KEEP_FILES - 1:]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def read_manifest(language: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_manifest_path(language), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def get_snapshot_file(language: str, encoding: str) -> Optional[SnapshotFile]:
+    manifest = read_manifest(language)
+    entry = manifest["files"].get(encoding) if manifest else None
+    if entry is None:
+        return None
+    path = os.path.join(snapshot_dir(), entry["file"])
+    if not os.path.exists(path):
+        return None
+    return SnapshotFile(
+        path=path,
+        etag=entry["etag"],
+        size=entry["size"],
+        catalog_versions=manifest["catalog_versions"],
+        media_type=MEDIA_TYPES[encoding],
+    )
+
+
+def snapshot_languages(session: Session) -> List[str]:
+    return list(session.exec(select(PECSTranslation.language_code).distinct()).all())
+
+
+class SnapshotBuilder:
+    """Runs the snapshot builds in a background thread, one at a time."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # Languages to build, None for all of them
+        self._pending: set = set()
+        self._timer: Optional[threading.Timer] = None
+        self._running = False
+
+    def schedule(self, languages: Optional[Iterable[str]] = None, delay: Optional[float] = None) -> None:
+        """
+        Build the snapshots of the given languages (all when None) after
+        delay seconds; the requests made meanwhile are merged.
+        """
+        with self._lock:
+            if languages is None:
+                self._pending.add(None)
+            else:
+                self._pending.update(languages)
+            self._start_locked(settings.SNAPSHOT_DEBOUNCE_SECONDS if delay is None else delay)
+
+    def _start_locked(self, delay: float) -> None:
+        if self._timer is None and not self._running and self._pending:
+            self._timer = threading.Timer(delay, self._run)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _run(self) -> None:
+        from app.core.db import engine
+
+        with self._lock:
+            pending, self._pending = self._pending, set()
+            self._timer = None
+            self._running = True
+        try:
+            with Session(engine) as session:
+                languages = snapshot_languages(session) if None in pending else sorted(pending)
+                for language in languages:
+                    write_snapshot(session, language)
+        except Exception:
+            logger.exception("catalog snapshot build failed")
+        finally:
+            with self._lock:
+                self._running = False
+                # Requested during the build
+                self._start_locked(settings.SNAPSHOT_DEBOUNCE_SECONDS)
+
+
+snapshot_builder = SnapshotBuilder()
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_after_flush(session: Session, flush_context) -> None:
+    objects = chain(session.new, session.dirty, session.deleted)
+    if catalogs_for_tables(getattr(obj, "__tablename__", "") for obj in objects):
+        session.info["catalog_changed"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_on_bulk_statement(state: ORMExecuteState) -> None:
+    if state.is_insert or state.is_update or state.is_delete:
+        table = getattr(state.statement, "table", None)
+        if table is not None and catalogs_for_tables([table.name]):
+            state.session.info["catalog_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _build_after_commit(session: Session) -> None:
+    if session.info.pop("catalog_changed", False) and settings.SNAPSHOT_AUTO_BUILD:
+        snapshot_builder.schedule()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_after_rollback(session: Session) -> None:
+    session.info.pop("catalog_changed", None)
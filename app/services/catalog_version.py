@@ -0,0 +1,88 @@
+"""
+Version counters of the PECS and category catalogs.
+
+Every flush or bulk statement that writes one of the catalog tables bumps the
+version of the matching catalog in the same transaction, so the counters are
+shared by all the workers and roll back with the write. The counters drive
+the HTTP caching of the catalog routes (see app.api.http_cache).
+"""
+from datetime import datetime, timezone
+from itertools import chain
+from typing import Dict, Iterable, Set, Tuple
+
+from sqlalchemy import event, insert, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import ORMExecuteState, Session
+from sqlmodel import select
+
+from app.models import CatalogVersion
+
+# Table name -> catalogs whose content depends on it
+CATALOG_TABLES: Dict[str, Tuple[str, ...]] = {
+    "pecs": ("pecs",),
+    "pecs_translations": ("pecs",),
+    "pecs_category_items": ("pecs",),
+    "pecs_categories": ("categories",),
+    "categories_translations": ("categories",),
+}
+
+
+def catalogs_for_tables(table_names: Iterable[str]) -> Set[str]:
+    return {
+        catalog
+        for table_name in table_names
+        for catalog in CATALOG_TABLES.get(table_name, ())
+    }
+
+
+def bump_catalog_versions(connection: Connection, names: Iterable[str]) -> None:
+    """Increment the version of the given catalogs, creating the missing rows."""
+    table = CatalogVersion.__table__
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    # Sorted to always lock the rows in the same order
+    for name in sorted(set(names)):
+        result = connection.execute(
+            update(table)
+            .where(table.c.name == name)
+            .values(version=table.c.version + 1, updated_at=now)
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(table).values(name=name, version=1, updated_at=now))
+
+
+def get_catalog_versions(session: Session, names: Iterable[str]) -> Dict[str, Tuple[int, datetime]]:
+    """
+    Read the current version of the given catalogs with a single query.
+
+    Returns:
+        Mapping catalog name -> (version, updated_at in UTC). Catalogs that
+        were never written have version 0 and no row yet.
+    """
+    names = list(names)
+    rows = session.exec(
+        select(CatalogVersion.name, CatalogVersion.version, CatalogVersion.updated_at)
+        .where(CatalogVersion.name.in_(names))
+    ).all()
+    versions = {name: (version, updated_at) for name, version, updated_at in rows}
+    epoch = datetime(1970, 1, 1)
+    return {name: versions.get(name, (0, epoch)) for name in names}
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_after_flush(session: Session, flush_context) -> None:
+    # new, dirty and deleted still describe the flushed objects here
+    objects = chain(session.new, session.dirty, session.deleted)
+    names = catalogs_for_tables(getattr(obj, "__tablename__", "") for obj in objects)
+    if names:
+        bump_catalog_versions(session.connection(), names)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _bump_on_bulk_statement(state: ORMExecuteState) -> None:
+    # insert()/update()/delete() statements executed through the session
+    if not (state.is_insert or state.is_update or state.is_delete):
+        return
+    table = getattr(state.statement, "table", None)
+    names = catalogs_for_tables([table.name] if table is not None else [])
+    if names:
+        bump_catalog_versions(state.session.connection(), names)
@@ -0,0 +1,221 @@
+"""
+Latency-aware circuit breaker for the LLM services.
+
+The breaker watches the outcome of the last calls: exceptions, error payloads
+and calls slower than `slow_call_seconds` count as failures. When the failure
+rate of the window reaches `failure_rate` the circuit opens and the calls go
+straight to the fallback for `open_seconds`. Then it becomes half-open: a
+single probe call is let through, and the circuit closes again if it succeeds
+or reopens if it fails.
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, TypeVar
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def is_error_payload(result: Any) -> bool:
+    """The LLM services return {"error": ...} instead of raising."""
+    return isinstance(result, dict) and "error" in result
+
+
+class CircuitBreaker:
+    """
+    Args:
+        name: Name shown in the status endpoint
+        failure_rate: Failure rate (0-1) of the window that opens the circuit
+        window_size: Number of recent calls considered
+        min_calls: Minimum number of calls in the window before it can open
+        slow_call_seconds: Calls slower than this count as failures
+        open_seconds: Time spent open before a probe call is allowed
+        timer: Clock, replaceable in tests
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        window_size: int = 20,
+        min_calls: int = 5,
+        slow_call_seconds: float = 10.0,
+        open_seconds: float = 30.0,
+        timer: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self._timer = timer
+        self._lock = threading.Lock()
+        self._window: Deque[bool] = deque(maxlen=window_size)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_running = False
+        self.counters: Dict[str, int] = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "slow_calls": 0,
+            "rejected": 0,
+            "fallbacks": 0,
+            "opened": 0,
+        }
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and self._timer() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+        return self._state
+
+    def _allow(self) -> bool:
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._probe_running:
+                self._probe_running = True
+                return True
+            self.counters["rejected"] += 1
+            return False
+
+    def _record(self, success: bool, slow: bool) -> None:
+        with self._lock:
+            self.counters["calls"] += 1
+            self.counters["successes" if success else "failures"] += 1
+            if slow:
+                self.counters["slow_calls"] += 1
+
+            if self._state == HALF_OPEN:
+                self._probe_running = False
+                if success:
+                    self._state = CLOSED
+                    self._window.clear()
+                else:
+                    self._open()
+                return
+
+            self._window.append(success)
+            failures = self._window.count(False)
+            if (
+                self._state == CLOSED
+                and len(self._window) >= self.min_calls
+                and failures / len(self._window) >= self.failure_rate
+            ):
+                self._open()
+
+    def _open(self) -> None:
+        self._state = OPEN
+        self._opened_at = self._timer()
+        self.counters["opened"] += 1
+
+    def call(
+        self,
+        fn: Callable[[], T],
+        fallback: Callable[[], T],
+        is_failure: Callable[[Any], bool] = is_error_payload
+    ) -> T:
+        """
+        Run fn through the breaker.
+
+        The fallback result is returned when the circuit is open or when fn
+        fails (raises or returns a failure according to is_failure).
+        """
+        if not self._allow():
+            return self._fallback(fallback)
+
+        start = self._timer()
+        try:
+            result = fn()
+        except Exception:
+            self._record(success=False, slow=self._timer() - start > self.slow_call_seconds)
+            return self._fallback(fallback)
+
+        return self._outcome(result, start, fallback, is_failure)
+
+    async def acall(
+        self,
+        fn: Callable[[], Awaitable[T]],
+        fallback: Callable[[], T],
+        is_failure: Callable[[Any], bool] = is_error_payload
+    ) -> T:
+        """Same as call, for a coroutine function."""
+        if not self._allow():
+            return self._fallback(fallback)
+
+        start = self._timer()
+        try:
+            result = await fn()
+        except Exception:
+            self._record(success=False, slow=self._timer() - start > self.slow_call_seconds)
+            return self._fallback(fallback)
+
+        return self._outcome(result, start, fallback, is_failure)
+
+    def _outcome(self, result: T, start: float, fallback: Callable[[], T], is_failure: Callable[[Any], bool]) -> T:
+        slow = self._timer() - start > self.slow_call_seconds
+        failed = is_failure(result)
+        self._record(success=not (failed or slow), slow=slow)
+        # A slow but valid answer is still better than the fallback
+        if failed:
+            return self._fallback(fallback)
+        return result
+
+    def _fallback(self, fallback: Callable[[], T]) -> T:
+        with self._lock:
+            self.counters["fallbacks"] += 1
+        return fallback()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """State and counters, as exposed by the status endpoint."""
+        with self._lock:
+            state = self._current_state()
+            window = list(self._window)
+            return {
+                "name": self.name,
+                "state": state,
+                "failure_rate": round(window.count(False) / len(window), 3) if window else 0.0,
+                "window_calls": len(window),
+                "retry_in_seconds": (
+                    round(max(0.0, self.open_seconds - (self._timer() - self._opened_at)), 1)
+                    if state == OPEN else None
+                ),
+                **self.counters,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Return the breaker of an LLM service, created on first use from settings."""
+    with _registry_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(
+                name,
+                failure_rate=settings.LLM_BREAKER_FAILURE_RATE,
+                window_size=settings.LLM_BREAKER_WINDOW_SIZE,
+                min_calls=settings.LLM_BREAKER_MIN_CALLS,
+                slow_call_seconds=settings.LLM_BREAKER_SLOW_CALL_SECONDS,
+                open_seconds=settings.LLM_BREAKER_OPEN_SECONDS,
+            )
+        return breaker
+
+
+def all_breakers() -> Dict[str, CircuitBreaker]:
+    with _registry_lock:
+        return dict(_breakers)
@@ -0,0 +1,275 @@
+"""
+Semantic index of the pictogram names, for matching on CPU without the LLM.
+
+The index is built offline by script/build_embedding_index.py from static
+word vectors (fastText/word2vec .vec text files). Each PECSTranslation name
+of the shared catalog (the users' custom pictograms are private and never
+indexed) becomes the normalized mean of the vectors of its words. For each language
+the index directory holds:
+
+- <lang>.names.npy  float16 matrix, one row per pictogram name
+- <lang>.items.json the (pecs_id, name) of each row
+- <lang>.vocab.npy  float16 matrix of the query vocabulary
+- <lang>.vocab.json the words of each vocabulary row
+
+The matrices are memory-mapped, so the workers share the pages and load
+nothing until the first query. A query is embedded from the vocabulary and
+scored against all the names with vectorized dot products.
+
+NumPy is an optional dependency: without it (or without the index files) the
+index reports itself unavailable and the routes skip the semantic step.
+"""
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.models import PECS, PECSTranslation
+
+DEFAULT_INDEX_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "embeddings")
+
+_WORD = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+# Rows of the float16 matrix converted to float32 at a time while scoring
+SCORE_CHUNK_ROWS = 4096
+
+
+def tokenize_words(text: str) -> List[str]:
+    return [word.lower() for word in _WORD.findall(text)]
+
+
+@dataclass(frozen=True)
+class SemanticMatch:
+    pecs_id: str
+    name: str
+    score: float
+
+
+class _LanguageIndex:
+    def __init__(self, names, items: List[Dict[str, str]], vocab, words: List[str]) -> None:
+        self.names = names
+        self.items = items
+        self.vocab = vocab
+        self.word_rows = {word: row for row, word in enumerate(words)}
+
+    def embed(self, text: str):
+        rows = [self.word_rows[word] for word in tokenize_words(text) if word in self.word_rows]
+        if not rows:
+            return None
+        vector = self.vocab[rows].astype(np.float32).mean(axis=0)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+
+    def scores(self, query):
+        # float16 has no fast matrix product: score by float32 chunks
+        scores = np.empty(self.names.shape[0], dtype=np.float32)
+        for start in range(0, self.names.shape[0], SCORE_CHUNK_ROWS):
+            chunk = self.names[start:start + SCORE_CHUNK_ROWS]
+            scores[start:start + len(chunk)] = chunk.astype(np.float32) @ query
+        return scores
+
+
+class EmbeddingIndex:
+    """
+    Args:
+        index_dir: Directory of the index files
+    """
+
+    def __init__(self, index_dir: Optional[str] = None) -> None:
+        self.index_dir = index_dir or settings.EMBEDDING_INDEX_DIR or DEFAULT_INDEX_DIR
+        self._indexes: Dict[str, Optional[_LanguageIndex]] = {}
+        self._lock = threading.Lock()
+
+    def _paths(self, language: str) -> Dict[str, str]:
+        return {
+            part: os.path.join(self.index_dir, f"{language}.{part}")
+            for part in ("names.npy", "items.json", "vocab.npy", "vocab.json")
+        }
+
+    def _index(self, language: str) -> Optional[_LanguageIndex]:
+        if language in self._indexes:
+            return self._indexes[language]
+        with self._lock:
+            if language not in self._indexes:
+                self._indexes[language] = self._load(language)
+            return self._indexes[language]
+
+    def _load(self, language: str) -> Optional[_LanguageIndex]:
+        if np is None:
+            return None
+        paths = self._paths(language)
+        if not all(os.path.exists(path) for path in paths.values()):
+            return None
+        with open(paths["items.json"], "r", encoding="utf-8") as f:
+            items = json.load(f)
+        with open(paths["vocab.json"], "r", encoding="utf-8") as f:
+            words = json.load(f)
+        return _LanguageIndex(
+            names=np.load(paths["names.npy"], mmap_mode="r"),
+            items=items,
+            vocab=np.load(paths["vocab.npy"], mmap_mode="r"),
+            words=words,
+        )
+
+    def available(self, language: str) -> bool:
+        return self._index(language) is not None
+
+    def search(
+        self,
+        text: str,
+        language: str,
+        k: int = 5,
+        min_score: Optional[float] = None,
+        exclude: Iterable[str] = ()
+    ) -> List[SemanticMatch]:
+        """
+        The k pictogram names closest in meaning to text.
+
+        Args:
+            text: Word or short expression to match
+            language: Language code
+            k: Maximum number of matches
+            min_score: Minimum cosine similarity, defaults to SEMANTIC_MIN_SCORE
+            exclude: PECS ids to leave out (e.g. already proposed)
+
+        Returns:
+            Matches by decreasing score, empty when the index is not
+            available or no word of text is in the vocabulary
+        """
+        index = self._index(language)
+        if index is None or k <= 0:
+            return []
+        query = index.embed(text)
+        if query is None:
+            return []
+
+        min_score = settings.SEMANTIC_MIN_SCORE if min_score is None else min_score
+        scores = index.scores(query)
+        if not len(scores):
+            return []
+        excluded = set(exclude)
+        # Some extra rows in case the best ones are excluded
+        top = min(len(scores), k + len(excluded))
+        candidates = np.argpartition(-scores, top - 1)[:top]
+        candidates = candidates[np.argsort(-scores[candidates])]
+
+        matches = []
+        for row in candidates:
+            score = float(scores[row])
+            item = index.items[row]
+            if score < min_score:
+                break
+            if item["pecs_id"] in excluded:
+                continue
+            matches.append(SemanticMatch(pecs_id=item["pecs_id"], name=item["name"], score=round(score, 4)))
+            if len(matches) == k:
+                break
+        return matches
+
+
+def load_word_vectors(
+    path: str,
+    max_words: Optional[int] = None,
+    required: Optional[Set[str]] = None
+) -> Tuple[List[str], "np.ndarray"]:
+    """
+    Read a .vec text file (first line "count dimension", then "word v1 v2 ...").
+
+    The first max_words words (the files are sorted by frequency) are kept,
+    plus the required ones found further down.
+    """
+    required = required or set()
+    words: List[str] = []
+    vectors = []
+    seen: Set[str] = set()
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        header = f.readline().split()
+        dimension = int(header[1])
+        for position, line in enumerate(f):
+            word, _, values = line.rstrip().partition(" ")
+            word = word.lower()
+            if word in seen:
+                continue
+            if max_words is not None and position >= max_words and word not in required:
+                continue
+            vector = np.array(values.split(), dtype=np.float32)
+            if vector.shape[0] != dimension:
+                continue
+            seen.add(word)
+            words.append(word)
+            vectors.append(vector)
+    return words, np.vstack(vectors) if vectors else np.zeros((0, dimension), dtype=np.float32)
+
+
+def _normalize(matrix: "np.ndarray") -> "np.ndarray":
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def load_index_items(session: Session, language: str) -> List[Tuple[str, str]]:
+    """(pecs_id, name) of the shared pictograms of a language, the rows of the index."""
+    rows = session.exec(
+        select(PECSTranslation.pecs_id, PECSTranslation.name)
+        .join(PECS, PECS.id == PECSTranslation.pecs_id)
+        .where(PECSTranslation.language_code == language, PECS.user_id.is_(None))
+    ).all()
+    return [(str(pecs_id), name) for pecs_id, name in rows]
+
+
+def build_index(
+    items: Sequence[Tuple[str, str]],
+    words: List[str],
+    vectors: "np.ndarray",
+    index_dir: str,
+    language: str
+) -> int:
+    """
+    Write the index of a language.
+
+    Args:
+        items: (pecs_id, name) of the pictograms
+        words: Vocabulary, as returned by load_word_vectors
+        vectors: Word vectors, one row per word
+        index_dir: Output directory
+        language: Language code
+
+    Returns:
+        Number of names indexed (the names without any known word are skipped)
+    """
+    vectors = _normalize(vectors.astype(np.float32))
+    rows = {word: row for row, word in enumerate(words)}
+
+    kept = []
+    name_vectors = []
+    for pecs_id, name in items:
+        word_rows = [rows[word] for word in tokenize_words(name) if word in rows]
+        if not word_rows:
+            continue
+        kept.append({"pecs_id": str(pecs_id), "name": name})
+        name_vectors.append(vectors[word_rows].mean(axis=0))
+
+    dimension = vectors.shape[1]
+    names = _normalize(np.vstack(name_vectors)) if name_vectors else np.zeros((0, dimension), dtype=np.float32)
+
+    os.makedirs(index_dir, exist_ok=True)
+    np.save(os.path.join(index_dir, f"{language}.names.npy"), names.astype(np.float16))
+    np.save(os.path.join(index_dir, f"{language}.vocab.npy"), vectors.astype(np.float16))
+    with open(os.path.join(index_dir, f"{language}.items.json"), "w", encoding="utf-8") as f:
+        json.dump(kept, f, ensure_ascii=False)
+    with open(os.path.join(index_dir, f"{language}.vocab.json"), "w", encoding="utf-8") as f:
+        json.dump(words, f, ensure_ascii=False)
+    return len(kept)
+
+
+semantic_index = EmbeddingIndex()
@@ -0,0 +1,338 @@
+"""
+Lemma tables: inflected form -> base form, per language.
+
+The tables are built offline by script/build_lemmas.py from the pictogram
+lexicon (app/data/<lang>_pittogrammi.json). For every single-word name the
+builder generates the regular inflections (plurals, gender, present tense and
+participles of verbs), and only the forms found in the bundled word list of
+the language (app/services/dizionari/dizionario_<lang>.txt) are kept: the
+suffix rules alone produce too many wrong forms. The languages without a word
+list have no table and keep the rules of to_singolare.
+The result is saved in app/data/lemmi/<lang>.tsv, one base form per line
+followed by its inflected forms, and loaded once at first use.
+
+Every lookup is a dictionary access, and the base forms are exactly the
+pictogram names, so a normalized token can be matched to a pictogram
+without fuzzy search or an LLM call.
+"""
+import json
+import os
+import sys
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LEMMA_DIR = os.path.join(APP_DIR, "data", "lemmi")
+LEXICON_PATH = os.path.join(APP_DIR, "data", "{language}_pittogrammi.json")
+DICTIONARY_PATH = os.path.join(APP_DIR, "services", "dizionari", "dizionario_{language}.txt")
+
+LANGUAGES = ("it", "en", "es", "fr", "de")
+
+# Shorter names are mostly articles and pronouns (la -> las, un -> une),
+# whose forms are words of their own
+MIN_BASE_LENGTH = 3
+
+# Generated forms, with the priority used when a form could come from more
+# than one base form (lower wins): nouns, then verbs, then the gender forms,
+# generated for every name although most of them are not adjectives
+NOUN, VERB, ADJECTIVE = 0, 1, 2
+
+FormsFunction = Callable[[str, Set[str]], Iterable[Tuple[str, int]]]
+
+
+def _it_is_verb(word: str, dictionary: Set[str]) -> bool:
+    """
+    Whether an infinitive-looking word is a verb. The nouns in -are/-ere/-ire
+    (altare, bicchiere) have their plural in -i, unless that is the plural of
+    another word (amari is the plural of amaro, not of amare).
+    """
+    if not word.endswith(("are", "ere", "ire")):
+        return False
+    stem = word[:-1]
+    return not (stem + "i" in dictionary and stem + "o" not in dictionary and stem + "io" not in dictionary)
+
+
+def _it_is_verb_form(form: str, dictionary: Set[str]) -> bool:
+    """Whether a gender form is also the present tense of a verb: mostra (mostrare), corre, giochi."""
+    stem = form[:-1]
+    if form.endswith("a"):
+        infinitives = ("are",)
+    elif form.endswith("e"):
+        infinitives = ("ere", "ire")
+    else:
+        infinitives = ("are", "ere", "ire")
+    candidates = [stem + infinitive for infinitive in infinitives]
+    if form.endswith(("chi", "ghi")):
+        # giochi -> giocare
+        candidates.append(form[:-2] + "are")
+    return any(candidate in dictionary and _it_is_verb(candidate, dictionary) for candidate in candidates)
+
+
+def _it_forms(word: str, dictionary: Set[str]) -> Iterable[Tuple[str, int]]:
+    stem = word[:-1]
+    is_verb = _it_is_verb(word, dictionary)
+    if word.endswith(("co", "go")):
+        yield stem + "hi", NOUN
+        yield stem + "i", NOUN
+    elif word.endswith(("ca", "ga")):
+        yield stem + "he", NOUN
+    elif word.endswith(("cia", "gia")):
+        yield word[:-2] + "e", NOUN
+        yield stem + "e", NOUN
+    elif word.endswith("io"):
+        yield stem, NOUN
+    if word.endswith("o"):
+        yield stem + "i", NOUN
+        gender_forms = (stem + "a", stem + "e")
+    elif word.endswith("a"):
+        yield stem + "e", NOUN
+        # Masculine nouns in -a (problema -> problemi) are the exception
+        gender_forms = (stem + "i",)
+    else:
+        gender_forms = ()
+        if word.endswith("e") and not is_verb:
+            yield stem + "i", NOUN
+    # Most names are nouns: their gender forms are words of their own when a
+    # verb conjugates to them (mostro -> mostra, the present of mostrare)
+    for form in gender_forms:
+        if not _it_is_verb_form(form, dictionary):
+            yield form, ADJECTIVE
+
+    endings = {
+        "are": ("o", "i", "a", "iamo", "ate", "ano", "ato", "ata", "ati", "ate", "ando"),
+        "ere": ("o", "i", "e", "iamo", "ete", "ono", "uto", "uta", "uti", "ute", "endo"),
+        "ire": ("o", "i", "e", "iamo", "ite", "ono", "isco", "isci", "isce", "iscono", "ito", "ita", "iti", "ite", "endo"),
+    }
+    for infinitive, suffixes in endings.items():
+        if word.endswith(infinitive) and len(word) > 4 and is_verb:
+            verb_stem = word[:-3]
+            for suffix in suffixes:
+                if verb_stem.endswith(("c", "g")) and suffix[0] in "ie" and infinitive == "are":
+                    # giocare -> giochi
+                    yield verb_stem + "h" + suffix, VERB
+                elif verb_stem.endswith("i") and suffix.startswith("i"):
+                    # mangiare -> mangi, mangiamo
+                    yield verb_stem + suffix[1:], VERB
+                else:
+                    yield verb_stem + suffix, VERB
+
+
+_ES_ACCENTS = str.maketrans("áéíóú", "aeiou")
+
+
+def _es_forms(word: str, dictionary: Set[str]) -> Iterable[Tuple[str, int]]:
+    if word.endswith("z"):
+        yield word[:-1] + "ces", NOUN
+    elif word[-1] in "aeiouáéó":
+        yield word + "s", NOUN
+    else:
+        # The accent of the last syllable is dropped: calcetín -> calcetines
+        yield word.translate(_ES_ACCENTS) + "es", NOUN
+    if word.endswith("o"):
+        yield word[:-1] + "a", ADJECTIVE
+        yield word[:-1] + "as", ADJECTIVE
+
+    endings = {
+        "ar": ("o", "as", "a", "amos", "áis", "an", "ado", "ada", "ados", "adas", "ando"),
+        "er": ("o", "es", "e", "emos", "éis", "en", "ido", "ida", "idos", "idas", "iendo"),
+        "ir": ("o", "es", "e", "imos", "ís", "en", "ido", "ida", "idos", "idas", "iendo"),
+    }
+    for infinitive, suffixes in endings.items():
+        if word.endswith(infinitive) and len(word) > 3:
+            for suffix in suffixes:
+                yield word[:-2] + suffix, VERB
+
+
+def _fr_forms(word: str, dictionary: Set[str]) -> Iterable[Tuple[str, int]]:
+    if word.endswith("al"):
+        yield word[:-2] + "aux", NOUN
+    elif word.endswith(("eau", "eu")):
+        yield word + "x", NOUN
+    elif word[-1] not in "sxz":
+        yield word + "s", NOUN
+    if word[-1] != "e":
+        yield word + "e", ADJECTIVE
+        yield word + "es", ADJECTIVE
+
+    endings = {
+        "er": ("e", "es", "ons", "ez", "ent", "é", "ée", "és", "ées", "ant"),
+        "ir": ("is", "it", "issons", "issez", "issent", "i", "ie", "is", "ies", "issant"),
+    }
+    for infinitive, suffixes in endings.items():
+        if word.endswith(infinitive) and len(word) > 3:
+            for suffix in suffixes:
+                yield word[:-2] + suffix, VERB
+
+
+_UMLAUTS = str.maketrans({"a": "ä", "o": "ö", "u": "ü"})
+
+
+def _de_forms(word: str, dictionary: Set[str]) -> Iterable[Tuple[str, int]]:
+    if word.endswith("e"):
+        yield word + "n", NOUN
+    elif word.endswith(("el", "er")):
+        yield word + "n", NOUN
+    elif word.endswith("in"):
+        # Lehrerin -> Lehrerinnen
+        yield word + "nen", NOUN
+    elif not word.endswith("en"):
+        yield word + "e", NOUN
+        yield word + "en", NOUN
+        yield word + "er", NOUN
+        yield word + "s", NOUN
+        # Umlaut in the last syllable: Haus -> Häuser
+        vowel = max(word.rfind(v) for v in "aou")
+        if vowel > 0 and word[vowel - 1:vowel + 1] == "au":
+            vowel -= 1
+        if vowel >= 0:
+            umlaut = word[:vowel] + word[vowel].translate(_UMLAUTS) + word[vowel + 1:]
+            yield umlaut + "e", NOUN
+            yield umlaut + "er", NOUN
+
+    if word.endswith("en") and len(word) > 4:
+        stem = word[:-2]
+        for suffix in ("e", "st", "t", "et", "end"):
+            yield stem + suffix, VERB
+        yield "ge" + stem + "t", VERB
+
+
+def _en_forms_factory() -> FormsFunction:
+    import inflect
+
+    engine = inflect.engine()
+
+    def forms(word: str, dictionary: Set[str]) -> Iterable[Tuple[str, int]]:
+        plural = engine.plural_noun(word)
+        if plural:
+            yield plural, NOUN
+        # Verbs: third person, past and gerund
+        yield (word + "es" if word.endswith(("s", "sh", "ch", "x", "z")) else word + "s"), VERB
+        stem = word[:-1] if word.endswith("e") else word
+        yield stem + "ed", VERB
+        yield stem + "ing", VERB
+
+    return forms
+
+
+_FORMS: Dict[str, FormsFunction] = {
+    "it": _it_forms,
+    "es": _es_forms,
+    "fr": _fr_forms,
+    "de": _de_forms,
+}
+
+
+def load_lexicon(language: str) -> Set[str]:
+    """Lowercase pictogram names of a language."""
+    path = LEXICON_PATH.format(language=language)
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        return {name for name in ((item.get("nome") or "").strip().lower() for item in json.load(f)) if name}
+
+
+def load_dictionary(language: str) -> Optional[Set[str]]:
+    """Bundled word list of a language used to validate the generated forms, None when there is none."""
+    path = DICTIONARY_PATH.format(language=language)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return {line.strip().lower() for line in f if line.strip()}
+
+
+def _is_word(word: str) -> bool:
+    return word.isalpha() and word == word.lower()
+
+
+def build_lemma_table(
+    names: Iterable[str],
+    language: str,
+    dictionary: Set[str]
+) -> Dict[str, List[str]]:
+    """
+    Generate the inflected forms of the single-word names.
+
+    Args:
+        names: Base forms (the pictogram names)
+        language: Language code
+        dictionary: Known words, only the forms in it are kept
+
+    Returns:
+        Mapping base form -> sorted inflected forms. Every lowercase alphabetic
+        name is a key, also when it has no forms; the names shorter than
+        MIN_BASE_LENGTH are not inflected. A form that is itself a name or that
+        comes from more than one name is assigned once (see NOUN/ADJECTIVE/VERB).
+    """
+    names = {name for name in names if _is_word(name)}
+    forms_of = _en_forms_factory() if language == "en" else _FORMS.get(language)
+
+    best: Dict[str, Tuple[int, str]] = {}
+    if forms_of is not None:
+        for name in sorted(names):
+            if len(name) < MIN_BASE_LENGTH:
+                continue
+            for form, priority in forms_of(name, dictionary):
+                if form == name or form in names or not _is_word(form) or form not in dictionary:
+                    continue
+                if form not in best or (priority, name) < best[form]:
+                    best[form] = (priority, name)
+
+    table: Dict[str, List[str]] = {name: [] for name in names}
+    for form, (_, name) in best.items():
+        table[name].append(form)
+    for forms in table.values():
+        forms.sort()
+    return table
+
+
+def write_lemma_file(table: Dict[str, List[str]], path: str) -> None:
+    """Write a table as lines "base<TAB>form form ...", sorted by base form."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="\n") as f:
+        for name in sorted(table):
+            f.write(f"{name}\t{' '.join(table[name])}\n")
+    os.replace(tmp_path, path)
+
+
+class LemmaTables:
+    """The lemma tables of all the languages, each loaded on first use."""
+
+    def __init__(self, lemma_dir: str = LEMMA_DIR) -> None:
+        self.lemma_dir = lemma_dir
+        self._tables: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def _table(self, language: str) -> Dict[str, str]:
+        table = self._tables.get(language)
+        if table is not None:
+            return table
+        with self._lock:
+            if language not in self._tables:
+                self._tables[language] = self._load(language)
+            return self._tables[language]
+
+    def _load(self, language: str) -> Dict[str, str]:
+        table: Dict[str, str] = {}
+        path = os.path.join(self.lemma_dir, f"{language}.tsv")
+        if not os.path.exists(path):
+            return table
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                name, _, forms = line.rstrip("\n").partition("\t")
+                # The forms of a name share its string object
+                name = sys.intern(name)
+                table[name] = name
+                for form in forms.split():
+                    table[form] = name
+        return table
+
+    def lemma(self, word: str, language: str) -> Optional[str]:
+        """Base form (pictogram name) of a word, None when it is unknown."""
+        return self._table(language).get(word.lower())
+
+    def is_loaded(self, language: str) -> bool:
+        return language in self._tables
+
+
+lemma_tables = LemmaTables()
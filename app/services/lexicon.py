@@ -0,0 +1,171 @@
+"""
+Compact binary form of the pictogram lexicons (app/data/<lang>_pittogrammi.json).
+
+The JSON files stay the source format; each one is compiled into a
+<lang>_pittogrammi.lex file next to it (script/build_lexicons.py, or on
+first use when it is missing or older than the JSON) and memory-mapped, so
+the lexicon costs a few hundred KB per language shared by all the worker
+processes through the page cache, instead of a list of dicts per worker.
+
+Layout, little-endian:
+
+    header   b"PLEX", format version (uint32), number of entries n (uint32)
+    ids      int32[n]    pictogram id of each entry, entries sorted by name
+    offsets  uint32[n+1] start of each name in the names blob, plus its end
+    order    uint32[n]   entry of each position of the JSON file
+    names    UTF-8 names concatenated, sorted by their bytes
+
+Exact lookups are a binary search over the sorted names; items() walks the
+entries in the order of the JSON file, which the callers rely on to break
+ties the same way as before.
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.core.log import get_logger
+
+logger = get_logger(__name__)
+
+MAGIC = b"PLEX"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sII")
+
+
+def lexicon_path(json_path: str) -> str:
+    return os.path.splitext(json_path)[0] + ".lex"
+
+
+def compile_lexicon(items: List[Dict]) -> bytes:
+    """Binary lexicon of the {"id", "nome"} entries of a *_pittogrammi.json file."""
+    # Entries without an id get 0, never a real pictogram id
+    entries = [((item.get("nome") or "").encode("utf-8"), int(item.get("id") or 0)) for item in items]
+    # Stable: the entries with the same name keep the order of the file
+    by_name = sorted(range(len(entries)), key=lambda position: entries[position][0])
+
+    ids = array("i", (entries[position][1] for position in by_name))
+    order = array("I", bytes(4 * len(entries)))
+    offsets = array("I", [0])
+    names = bytearray()
+    for entry, position in enumerate(by_name):
+        order[position] = entry
+        names += entries[position][0]
+        offsets.append(len(names))
+    return b"".join((
+        HEADER.pack(MAGIC, FORMAT_VERSION, len(entries)),
+        ids.tobytes(),
+        offsets.tobytes(),
+        order.tobytes(),
+        bytes(names),
+    ))
+
+
+def build_lexicon_file(json_path: str) -> str:
+    """Compile a *_pittogrammi.json file into its .lex file, returns its path."""
+    with open(json_path, "r", encoding="utf-8") as f:
+        items = json.load(f)
+    path = lexicon_path(json_path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(compile_lexicon(items if isinstance(items, list) else []))
+    os.replace(tmp_path, path)
+    return path
+
+
+class Lexicon:
+    """Read-only view of a binary lexicon, from a memory map or bytes."""
+
+    def __init__(self, data) -> None:
+        self._buffer = data
+        view = memoryview(data)
+        magic, version, count = HEADER.unpack_from(view)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("Not a pictogram lexicon, or built by another version")
+        start = HEADER.size
+        self._ids = view[start:start + 4 * count].cast("i")
+        start += 4 * count
+        self._offsets = view[start:start + 4 * (count + 1)].cast("I")
+        start += 4 * (count + 1)
+        self._order = view[start:start + 4 * count].cast("I")
+        start += 4 * count
+        self._names = view[start:]
+        self._count = count
+
+    @classmethod
+    def open(cls, path: str) -> "Lexicon":
+        with open(path, "rb") as f:
+            # The map stays valid after the file is closed
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _name_bytes(self, entry: int) -> bytes:
+        return bytes(self._names[self._offsets[entry]:self._offsets[entry + 1]])
+
+    def find_id(self, name: str) -> Optional[int]:
+        """Id of the first pictogram (in file order) with exactly this name."""
+        if not name:
+            return None
+        key = name.encode("utf-8")
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._name_bytes(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._count and self._name_bytes(low) == key:
+            return self._ids[low]
+        return None
+
+    def items(self) -> Iterator[Tuple[int, str]]:
+        """(id, name) of every entry in the order of the JSON file; names may be empty."""
+        names, offsets, ids = self._names, self._offsets, self._ids
+        for entry in self._order:
+            yield ids[entry], str(names[offsets[entry]:offsets[entry + 1]], "utf-8")
+
+
+_lexicons: Dict[str, Lexicon] = {}
+_lock = threading.Lock()
+
+
+def _open_or_build(json_path: str) -> Lexicon:
+    path = lexicon_path(json_path)
+    try:
+        if os.path.getmtime(path) >= os.path.getmtime(json_path):
+            return Lexicon.open(path)
+    except (OSError, ValueError):
+        # Missing, or built by another version
+        pass
+    try:
+        return Lexicon.open(build_lexicon_file(json_path))
+    except OSError as e:
+        logger.warning("lexicon not writable, compiled in memory", path=path, error=str(e))
+    with open(json_path, "r", encoding="utf-8") as f:
+        items = json.load(f)
+    return Lexicon(compile_lexicon(items if isinstance(items, list) else []))
+
+
+def load_lexicon(json_path: str) -> Lexicon:
+    """
+    Lexicon of a *_pittogrammi.json file, loaded once per process.
+
+    The .lex file is built when missing or older than the JSON. When it
+    cannot be written (read-only deploy) the lexicon is compiled in memory.
+    A missing JSON file gives an empty lexicon.
+    """
+    with _lock:
+        lexicon = _lexicons.get(json_path)
+        if lexicon is None:
+            if os.path.exists(json_path):
+                lexicon = _open_or_build(json_path)
+            else:
+                logger.error("lexicon file not found", path=json_path)
+                lexicon = Lexicon(compile_lexicon([]))
+            _lexicons[json_path] = lexicon
+        return lexicon
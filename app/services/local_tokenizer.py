@@ -0,0 +1,116 @@
+"""
+Deterministic tokenizer used when the OpenAI tokenizer is unavailable.
+
+Sentences are split into words and matched against the pictogram lexicon
+(app/data/<lang>_pittogrammi.json), preferring the longest multi-word names
+("olio di oliva"). Words that are not in the lexicon are tried in their
+singular form (to_singolare) and otherwise kept as they are, while articles,
+prepositions and conjunctions are dropped. The output has the same shape as
+TextTokenizer.tokenize: [{"origin": ..., "token": ...}].
+"""
+import os
+import re
+import threading
+from typing import Dict, List, Set, Tuple
+
+from app.services.lexicon import load_lexicon
+from app.services.to_singolare import to_singolare
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+# Longest lexicon name (in words) looked up in the sentences
+MAX_NAME_WORDS = 4
+
+_WORD = re.compile(r"[^\W\d_]+(?:-[^\W\d_]+)*", re.UNICODE)
+
+STOPWORDS: Dict[str, Set[str]] = {
+    "it": {
+        "il", "lo", "la", "i", "gli", "le", "l", "un", "uno", "una",
+        "di", "a", "da", "in", "con", "su", "per", "tra", "fra",
+        "del", "dello", "della", "dei", "degli", "delle", "al", "allo", "alla", "ai", "agli", "alle",
+        "dal", "dallo", "dalla", "dai", "dagli", "dalle", "nel", "nello", "nella", "nei", "negli", "nelle",
+        "sul", "sullo", "sulla", "sui", "sugli", "sulle", "e", "ed", "o", "ma", "che", "poi",
+    },
+    "en": {
+        "the", "a", "an", "of", "to", "in", "on", "at", "by", "for", "with", "from",
+        "and", "or", "but", "then", "that",
+    },
+    "es": {
+        "el", "la", "los", "las", "un", "una", "unos", "unas", "de", "del", "a", "al",
+        "en", "con", "por", "para", "y", "e", "o", "u", "pero", "que", "luego",
+    },
+    "fr": {
+        "le", "la", "les", "l", "un", "une", "des", "de", "du", "d", "à", "au", "aux",
+        "en", "dans", "avec", "pour", "par", "sur", "et", "ou", "mais", "que", "puis",
+    },
+    "de": {
+        "der", "die", "das", "den", "dem", "des", "ein", "eine", "einen", "einem", "einer", "eines",
+        "zu", "zum", "zur", "in", "im", "mit", "von", "vom", "für", "auf", "an", "am",
+        "und", "oder", "aber", "dann", "dass",
+    },
+}
+
+
+class LocalTokenizer:
+    """Lexicon based tokenizer, one lexicon per language loaded on first use."""
+
+    def __init__(self, data_dir: str = DATA_DIR) -> None:
+        self.data_dir = data_dir
+        self._lexicons: Dict[str, Tuple[Set[str], int]] = {}
+        self._lock = threading.Lock()
+
+    def _lexicon(self, language: str) -> Tuple[Set[str], int]:
+        with self._lock:
+            if language not in self._lexicons:
+                names: Set[str] = set()
+                path = os.path.join(self.data_dir, f"{language}_pittogrammi.json")
+                if os.path.exists(path):
+                    for _, name in load_lexicon(path).items():
+                        name = name.strip().lower()
+                        if name:
+                            names.add(name)
+                longest = max((len(name.split()) for name in names), default=1)
+                self._lexicons[language] = (names, min(longest, MAX_NAME_WORDS))
+            return self._lexicons[language]
+
+    def tokenize(self, sentence: str, language_code: str = "en") -> List[Dict[str, str]]:
+        """
+        Tokenize a sentence without any external call.
+
+        Args:
+            sentence: The sentence to tokenize
+            language_code: ISO language code (en, it, de, fr, es)
+
+        Returns:
+            List of {"origin", "token"} dictionaries
+        """
+        names, max_words = self._lexicon(language_code)
+        stopwords = STOPWORDS.get(language_code, set())
+        words = _WORD.findall(sentence)
+        lowered = [word.lower() for word in words]
+
+        tokens = []
+        position = 0
+        while position < len(words):
+            # Longest lexicon name starting at this word
+            for size in range(min(max_words, len(words) - position), 1, -1):
+                span = lowered[position:position + size]
+                candidate = " ".join(span)
+                # Names made only of stopwords ("at the") are not real content
+                if candidate in names and not all(word in stopwords for word in span):
+                    tokens.append({"origin": " ".join(words[position:position + size]), "token": candidate})
+                    position += size
+                    break
+            else:
+                word = lowered[position]
+                if word not in stopwords:
+                    token = word
+                    if word not in names:
+                        singular = to_singolare(word, language_code)
+                        token = singular if singular in names else word
+                    tokens.append({"origin": words[position], "token": token})
+                position += 1
+        return tokens
+
+
+local_tokenizer = LocalTokenizer()
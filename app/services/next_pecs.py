@@ -0,0 +1,302 @@
+"""
+Next-pictogram prediction for phrase composition.
+
+An n-gram transition index over the pictogram sequences of the saved phrases
+(PhrasePECS ordered by position): for each context, the one or two previous
+pictograms or the start of the phrase, it counts which pictogram comes next.
+There is one global index and one per user; the prediction interpolates the
+two, trigram and bigram contexts, and the overall pictogram frequency.
+
+The index is loaded from the database on first use and then kept up to date
+incrementally by the phrase routes (set_phrase / remove_phrase). The workers
+only see their own writes, so the index is rebuilt in the background every
+NEXT_PECS_REFRESH_SECONDS.
+
+Memory layout: the PECS ids are interned to small integers and the
+successors of a context are two parallel int arrays (ids and counts) kept
+sorted by decreasing count, so the top-k of a context is a slice and a
+prediction touches a handful of short arrays.
+"""
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.log import get_logger
+
+logger = get_logger(__name__)
+
+START = -1
+
+# Weight of each context length in the interpolation: two previous
+# pictograms, one, none (the overall frequency)
+ORDER_WEIGHTS = {2: 0.6, 1: 0.3, 0: 0.1}
+
+Context = Tuple[int, ...]
+
+
+@dataclass(frozen=True)
+class NextPECS:
+    pecs_id: UUID
+    score: float
+
+
+class _Successors:
+    """Counts of the pictograms following a context, sorted by decreasing count."""
+    __slots__ = ("ids", "counts", "total")
+
+    def __init__(self) -> None:
+        self.ids = array("l")
+        self.counts = array("l")
+        self.total = 0
+
+    def add(self, pecs: int, delta: int) -> None:
+        try:
+            position = self.ids.index(pecs)
+        except ValueError:
+            if delta <= 0:
+                return
+            self.ids.append(pecs)
+            self.counts.append(0)
+            position = len(self.ids) - 1
+        self.total += delta
+        self.counts[position] += delta
+        count = self.counts[position]
+
+        # Restore the order by moving the entry up or down
+        while position > 0 and self.counts[position - 1] < count:
+            self._swap(position, position - 1)
+            position -= 1
+        while position + 1 < len(self.ids) and self.counts[position + 1] > count:
+            self._swap(position, position + 1)
+            position += 1
+        if count <= 0:
+            # Zero counts sink to the end
+            while self.ids and self.counts[-1] <= 0:
+                self.ids.pop()
+                self.counts.pop()
+
+    def _swap(self, a: int, b: int) -> None:
+        self.ids[a], self.ids[b] = self.ids[b], self.ids[a]
+        self.counts[a], self.counts[b] = self.counts[b], self.counts[a]
+
+
+class _Model:
+    __slots__ = ("contexts",)
+
+    def __init__(self) -> None:
+        self.contexts: Dict[Context, _Successors] = {}
+
+    def add(self, sequence: Sequence[int], delta: int) -> None:
+        previous = (START, START)
+        for pecs in sequence:
+            for context in ((), previous[1:], previous):
+                successors = self.contexts.get(context)
+                if successors is None:
+                    if delta <= 0:
+                        continue
+                    successors = self.contexts[context] = _Successors()
+                successors.add(pecs, delta)
+                if successors.total <= 0:
+                    del self.contexts[context]
+            previous = (previous[1], pecs)
+
+    def probabilities(self, context: Context, limit: int) -> Iterable[Tuple[int, float]]:
+        successors = self.contexts.get(context)
+        if successors is None or successors.total <= 0:
+            return ()
+        total = successors.total
+        return ((pecs, count / total) for pecs, count in zip(successors.ids[:limit], successors.counts[:limit]))
+
+
+PhraseLoader = Callable[[], Iterable[Tuple[UUID, UUID, Sequence[UUID]]]]
+
+
+def load_phrases_from_db() -> List[Tuple[UUID, UUID, List[UUID]]]:
+    """(phrase_id, user_id, pecs ids by position) of all the phrases, with one query."""
+    from app.core.db import engine
+    from app.models import Phrase, PhrasePECS
+
+    phrases: Dict[UUID, Tuple[UUID, List[UUID]]] = {}
+    with Session(engine) as session:
+        rows = session.exec(
+            select(PhrasePECS.phrase_id, Phrase.user_id, PhrasePECS.pecs_id)
+            .join(Phrase, Phrase.id == PhrasePECS.phrase_id)
+            .order_by(PhrasePECS.phrase_id, PhrasePECS.position)
+        )
+        for phrase_id, user_id, pecs_id in rows:
+            phrases.setdefault(phrase_id, (user_id, []))[1].append(pecs_id)
+    return [(phrase_id, user_id, sequence) for phrase_id, (user_id, sequence) in phrases.items()]
+
+
+class _State:
+    """The global and per-user models, and the sequence indexed for each phrase."""
+
+    def __init__(self) -> None:
+        self.ids: Dict[UUID, int] = {}
+        self.uuids: List[UUID] = []
+        self.global_model = _Model()
+        self.users: Dict[UUID, _Model] = {}
+        self.phrases: Dict[UUID, Tuple[UUID, array]] = {}
+
+    def intern(self, pecs_id: UUID) -> int:
+        number = self.ids.get(pecs_id)
+        if number is None:
+            number = self.ids[pecs_id] = len(self.uuids)
+            self.uuids.append(pecs_id)
+        return number
+
+    def _apply(self, user_id: UUID, sequence: Sequence[int], delta: int) -> None:
+        self.global_model.add(sequence, delta)
+        user_model = self.users.get(user_id)
+        if user_model is None:
+            user_model = self.users[user_id] = _Model()
+        user_model.add(sequence, delta)
+        if not user_model.contexts:
+            del self.users[user_id]
+
+    def set_phrase(self, phrase_id: UUID, user_id: Optional[UUID], pecs_ids: Sequence[UUID]) -> None:
+        previous = self.phrases.pop(phrase_id, None)
+        if previous is not None:
+            self._apply(previous[0], previous[1], -1)
+        if pecs_ids and user_id is not None:
+            sequence = array("l", (self.intern(pecs_id) for pecs_id in pecs_ids))
+            self.phrases[phrase_id] = (user_id, sequence)
+            self._apply(user_id, sequence, 1)
+
+
+class NextPECSIndex:
+    """
+    Args:
+        loader: Returns (phrase_id, user_id, pecs ids by position) of every
+            phrase, defaults to load_phrases_from_db
+        refresh_seconds: Age after which the index is rebuilt in the
+            background, 0 to never rebuild it
+    """
+
+    def __init__(self, loader: Optional[PhraseLoader] = None, refresh_seconds: Optional[float] = None) -> None:
+        self.loader = loader or load_phrases_from_db
+        self.refresh_seconds = settings.NEXT_PECS_REFRESH_SECONDS if refresh_seconds is None else refresh_seconds
+        self._state: Optional[_State] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._refreshing = False
+        # Writes received while a rebuild reads the database
+        self._pending: Optional[List[Tuple[UUID, Optional[UUID], List[UUID]]]] = None
+
+    def rebuild(self) -> None:
+        """Reload all the phrases; the current index serves the queries meanwhile."""
+        with self._lock:
+            self._pending = []
+        try:
+            state = _State()
+            for phrase_id, user_id, pecs_ids in self.loader():
+                state.set_phrase(phrase_id, user_id, pecs_ids)
+            with self._lock:
+                # Replayed: they may be missing from what the loader read
+                for phrase_id, user_id, pecs_ids in self._pending:
+                    state.set_phrase(phrase_id, user_id, pecs_ids)
+                self._state = state
+                self._loaded_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._pending = None
+
+    def _ensure_loaded(self) -> None:
+        if self._state is None:
+            with self._load_lock:
+                if self._state is None:
+                    self.rebuild()
+        elif self.refresh_seconds and time.monotonic() - self._loaded_at > self.refresh_seconds:
+            self._refresh_in_background()
+
+    def _refresh_in_background(self) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def refresh() -> None:
+            try:
+                self.rebuild()
+            except Exception:
+                logger.exception("next pictogram index rebuild failed")
+                with self._lock:
+                    # Retry at the next period
+                    self._loaded_at = time.monotonic()
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def set_phrase(self, phrase_id: UUID, user_id: Optional[UUID], pecs_ids: Sequence[UUID]) -> None:
+        """Record the current pictogram sequence of a created or updated phrase."""
+        pecs_ids = list(pecs_ids)
+        with self._lock:
+            # Not loaded yet: the first load reads the phrase from the database
+            if self._state is not None:
+                self._state.set_phrase(phrase_id, user_id, pecs_ids)
+            if self._pending is not None:
+                self._pending.append((phrase_id, user_id, pecs_ids))
+
+    def remove_phrase(self, phrase_id: UUID) -> None:
+        self.set_phrase(phrase_id, None, [])
+
+    def predict(self, previous: Sequence[UUID], user_id: Optional[UUID] = None, k: int = 5) -> List[NextPECS]:
+        """
+        The k pictograms most likely to follow previous.
+
+        Args:
+            previous: Pictograms of the phrase so far, in order (empty for the
+                first pictogram)
+            user_id: Author of the phrase, to prefer their own habits
+            k: Maximum number of predictions
+
+        Returns:
+            Predictions by decreasing score; the scores are probabilities
+            interpolated over the contexts that have data
+        """
+        self._ensure_loaded()
+        if k <= 0:
+            return []
+
+        with self._lock:
+            state = self._state
+            # Unknown pictograms give contexts without data
+            numbers = [state.ids.get(pecs_id, -2) for pecs_id in previous[-2:]]
+            tail = (START, START) + tuple(numbers)
+            contexts = {2: tail[-2:], 1: tail[-1:], 0: ()}
+
+            models = [(state.global_model, 1 - settings.NEXT_PECS_USER_WEIGHT)]
+            user_model = state.users.get(user_id) if user_id is not None else None
+            if user_model is not None:
+                models.append((user_model, settings.NEXT_PECS_USER_WEIGHT))
+
+            scores: Dict[int, float] = {}
+            weight_total = 0.0
+            # A few more candidates per context than requested: the
+            # interpolation may reorder them
+            limit = 2 * k
+            for model, model_weight in models:
+                for order, context in contexts.items():
+                    probabilities = list(model.probabilities(context, limit))
+                    if not probabilities:
+                        continue
+                    weight = model_weight * ORDER_WEIGHTS[order]
+                    weight_total += weight
+                    for number, probability in probabilities:
+                        scores[number] = scores.get(number, 0.0) + weight * probability
+
+            if not weight_total:
+                return []
+            best = sorted(scores.items(), key=lambda item: -item[1])[:k]
+            return [NextPECS(pecs_id=state.uuids[number], score=round(score / weight_total, 4)) for number, score in best]
+
+
+next_pecs_index = NextPECSIndex()
@@ -1,32 +1,46 @@
-import os
+import difflib
+from functools import lru_cache
+
+from app.services.word_dictionary import load_dictionary
+
+# Distanza di modifica massima cercata: le parole brevi hanno molti vicini a
+# distanza 2, quasi tutti sbagliati
+PAROLE_BREVI = 5
+
+
+@lru_cache(maxsize=4096)
 def trova_parole_simili(parola, lingua, num_risultati=5):
-    
     """
-    Trova parole simili o sinonimi usando dizionari locali.
+    Correzione ortografica di una parola con i dizionari locali.
+
+    Il dizionario della lingua (app/services/word_dictionary.py) è caricato
+    una volta sola e mappato in memoria. Le parole presenti nel dizionario
+    sono restituite così come sono; per le altre si cercano le parole a
+    distanza di modifica 1 (2 per le parole di più di PAROLE_BREVI lettere)
+    e tra queste si sceglie la più simile con difflib, come prima si faceva
+    sull'intero dizionario.
+
     Args:
-        parola: La parola di cui cercare simili/sinonimi
+        parola: La parola da correggere
         lingua: Codice lingua (en, it, fr, es, de)
-        num_risultati: Numero massimo di risultati da restituire
+        num_risultati: Numero massimo di risultati di difflib
     Returns:
-        Lista di parole simili o sinonimi
+        La parola corretta, o la parola stessa se non ci sono candidati
     """
-    import difflib
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-    
-
-    dizionario_path = os.path.join(BASE_DIR, "dizionari", f"dizionario_{lingua}.txt")
+    dizionario = load_dictionary(lingua)
     # Controlla se il dizionario esiste
-    if not os.path.exists(dizionario_path):
-        print(dizionario_path)
-        return ["-> Dizionario non trovato. Esegui prima scarica_dizionari()" + dizionario_path]
-    
-    # Carica il dizionario
-    with open(dizionario_path, 'r', encoding='utf-8') as f:
-        dizionario = [line.strip() for line in f]
-    
+    if dizionario is None:
+        return ["-> Dizionario non trovato. Esegui prima scarica_dizionari() " + lingua]
+
+    if not parola or parola in dizionario:
+        return parola
+
+    distanza = 1 if len(parola) <= PAROLE_BREVI else 2
+    candidati = [candidato for candidato, _ in dizionario.similar(parola, distanza)]
+
     # Trova parole simili usando difflib
-    risultati = difflib.get_close_matches(parola, dizionario, n=num_risultati, cutoff=0.7)
-    
+    risultati = difflib.get_close_matches(parola, candidati, n=num_risultati, cutoff=0.7)
+
     res = parola
     if len(risultati) > 0:
         res = risultati[0]
@@ -0,0 +1,122 @@
+"""
+Per-user pictogram usage, used to rank the search results.
+
+The pecs_usage table aggregates how many times each user used each PECS. It
+is updated incrementally, with one upsert per write, when a phrase with
+pictograms is saved and when a PECS is added to the favorites (which counts
+as PECS_USAGE_FAVORITE_WEIGHT uses).
+
+The searches read a compact in-memory copy of the PECS_USAGE_TOP_N most used
+pictograms of the user: it is loaded with a single index range scan on first
+use, updated by the writes of this worker and expired after
+PECS_USAGE_CACHE_TTL_SECONDS, which bounds how stale the writes of the other
+workers can be.
+"""
+import math
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from uuid import UUID
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlmodel import select
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models import PECSUsage
+
+# user_id -> {pecs_id: count} of the most used pictograms of the user
+usage_cache: TTLCache[UUID, Dict[UUID, int]] = TTLCache(
+    maxsize=settings.PECS_USAGE_CACHE_MAX_USERS, ttl=settings.PECS_USAGE_CACHE_TTL_SECONDS, name="pecs_usage"
+)
+
+_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def record_usage(session: Session, user_id: Optional[UUID], pecs_ids: Iterable[UUID], weight: int = 1) -> None:
+    """
+    Add weight uses of each PECS to the statistics of a user.
+
+    The upsert runs in the session transaction: commit the session afterwards,
+    together with the write that used the pictograms.
+    """
+    if user_id is None:
+        return
+    uses: Counter = Counter()
+    for pecs_id in pecs_ids:
+        uses[pecs_id] += weight
+    if not uses:
+        return
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    insert = _INSERTS[session.get_bind().dialect.name]
+    statement = insert(PECSUsage.__table__).values([
+        {"user_id": user_id, "pecs_id": pecs_id, "count": count, "last_used_at": now}
+        # Sorted to always lock the rows in the same order
+        for pecs_id, count in sorted(uses.items())
+    ])
+    session.execute(statement.on_conflict_do_update(
+        index_elements=["user_id", "pecs_id"],
+        set_={
+            "count": PECSUsage.__table__.c.count + statement.excluded.count,
+            "last_used_at": statement.excluded.last_used_at,
+        },
+    ))
+
+    top = usage_cache.get(user_id)
+    if top is not None:
+        # A new dict: the cached one may be read by other requests
+        top = dict(top)
+        for pecs_id, count in uses.items():
+            top[pecs_id] = top.get(pecs_id, 0) + count
+        usage_cache.set(user_id, _trim(top))
+
+
+def _trim(usage: Dict[UUID, int]) -> Dict[UUID, int]:
+    if len(usage) <= settings.PECS_USAGE_TOP_N:
+        return usage
+    return dict(Counter(usage).most_common(settings.PECS_USAGE_TOP_N))
+
+
+def get_top_usage(session: Session, user_id: Optional[UUID]) -> Dict[UUID, int]:
+    """The most used pictograms of a user, {pecs_id: count}, empty for anonymous users."""
+    if user_id is None:
+        return {}
+    top = usage_cache.get(user_id)
+    if top is None:
+        rows = session.execute(
+            select(PECSUsage.pecs_id, PECSUsage.count)
+            .where(PECSUsage.user_id == user_id)
+            .order_by(PECSUsage.count.desc())
+            .limit(settings.PECS_USAGE_TOP_N)
+        ).all()
+        top = {pecs_id: count for pecs_id, count in rows}
+        usage_cache.set(user_id, top)
+    return top
+
+
+def usage_boost(count: int, max_count: int) -> float:
+    """Boost added to the similarity of a pictogram used count times, up to PECS_USAGE_BOOST."""
+    if count <= 0 or max_count <= 0:
+        return 0.0
+    return settings.PECS_USAGE_BOOST * math.log1p(count) / math.log1p(max_count)
+
+
+def rank_by_usage(
+    results: List[Dict[str, Any]],
+    usage: Dict[UUID, int],
+    key: Callable[[Dict[str, Any]], UUID] = lambda result: result["pecs"].id
+) -> List[Dict[str, Any]]:
+    """
+    Sort search results by similarity ("score") plus the usage boost.
+
+    Without usage statistics the results are returned unchanged.
+    """
+    if not usage or not results:
+        return results
+    max_count = max(usage.values())
+    return sorted(
+        results,
+        key=lambda result: -(result.get("score", 0.0) + usage_boost(usage.get(key(result), 0), max_count)),
+    )
@@ -0,0 +1,203 @@
+import json
+import os
+import re
+import resource
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import create_engine, insert
+from sqlmodel import Session
+
+from app.models import Nome
+from app.services.pictogram_sync import record_from_item, sync_nomi
+
+_WHITESPACE = re.compile(r"\s*")
+
+
+@dataclass
+class ImportStats:
+    language: str
+    file_path: str
+    rows: int = 0
+    skipped: int = 0
+    batches: int = 0
+    elapsed: float = 0.0
+    peak_memory_kb: int = 0
+    mode: str = "append"
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def iter_json_array(file_path: str, chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """
+    Stream the items of a top-level JSON array without loading the whole file.
+
+    Only one chunk of the file (plus the item being decoded) is kept in memory.
+
+    Args:
+        file_path: Path of the JSON file
+        chunk_size: Number of characters read from the file at a time
+
+    Yields:
+        The decoded items of the array, in order
+
+    Raises:
+        ValueError: The file is not a single well-formed JSON array
+            (json.JSONDecodeError for a malformed item)
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, "r", encoding="utf-8") as f:
+        buffer = ""
+        pos = 0
+        eof = False
+        # "start" before "[", then "first" (an item or "]"), "item" after a
+        # comma, "separator" after an item and "end" after "]"
+        state = "start"
+
+        def fill() -> bool:
+            nonlocal buffer, pos, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            return True
+
+        while True:
+            pos = _WHITESPACE.match(buffer, pos).end()
+            if pos >= len(buffer):
+                if eof:
+                    if state not in ("start", "end"):
+                        raise ValueError(f"Unexpected end of file in {file_path}")
+                    return
+                fill()
+                continue
+
+            char = buffer[pos]
+            if state == "start":
+                if char != "[":
+                    raise ValueError(f"{file_path} does not contain a JSON array")
+                state = "first"
+                pos += 1
+                continue
+            if state == "end":
+                raise ValueError(f"Unexpected data after the JSON array in {file_path}")
+            if char == "]" and state in ("first", "separator"):
+                state = "end"
+                pos += 1
+                continue
+            if state == "separator":
+                if char != ",":
+                    raise ValueError(f"Expected ',' or ']' between the items of {file_path}")
+                state = "item"
+                pos += 1
+                continue
+
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof or not fill():
+                    raise
+                continue
+            # A number cut by the end of the buffer might continue in the next chunk
+            if (
+                not eof
+                and not isinstance(item, (dict, list, str))
+                and (end == len(buffer) or buffer[end] not in ",] \t\r\n")
+            ):
+                fill()
+                continue
+            pos = end
+            state = "separator"
+            yield item
+
+
+def iter_nome_rows(file_path: str, language: str) -> Iterator[Dict[str, Any]]:
+    """Yield the nome rows of a *_pittogrammi.json file, skipping empty names."""
+    for item in iter_json_array(file_path):
+        record = record_from_item(item)
+        if record is None:
+            continue
+        yield {"pictogram_id": record.external_id, "name": record.name, "lang": language}
+
+
+def _peak_memory_kb() -> int:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def import_nomi_file(
+    file_path: str,
+    language: str,
+    database_url: str,
+    batch_size: int = 1000,
+    sync: bool = False
+) -> ImportStats:
+    """
+    Import one language file into the nome table.
+
+    Meant to run in a worker process: it opens its own database connection,
+    streams the file and writes the rows with one multi-row INSERT per batch.
+    With sync=True the rows are diffed against the table instead (see
+    app.services.pictogram_sync.sync_nomi).
+    """
+    stats = ImportStats(language=language, file_path=file_path, mode="sync" if sync else "append")
+    start_time = time.perf_counter()
+
+    # Each worker owns a single connection, never shared with other processes
+    engine = create_engine(database_url, pool_size=1, max_overflow=0)
+    try:
+        with Session(engine) as session:
+            if sync:
+                records = (record_from_item(item) for item in iter_json_array(file_path))
+                result = sync_nomi(session, (record for record in records if record is not None), language)
+                stats.rows = result.inserted + result.updated + result.deleted
+                stats.skipped = result.unchanged
+                stats.batches = 1
+            else:
+                batch: List[Dict[str, Any]] = []
+                for row in iter_nome_rows(file_path, language):
+                    batch.append(row)
+                    if len(batch) >= batch_size:
+                        _insert_batch(session, batch)
+                        stats.rows += len(batch)
+                        stats.batches += 1
+                        batch = []
+                if batch:
+                    _insert_batch(session, batch)
+                    stats.rows += len(batch)
+                    stats.batches += 1
+    finally:
+        engine.dispose()
+
+    stats.elapsed = time.perf_counter() - start_time
+    stats.peak_memory_kb = _peak_memory_kb()
+    return stats
+
+
+def _insert_batch(session: Session, batch: List[Dict[str, Any]]) -> None:
+    session.exec(insert(Nome).values(batch))
+    session.commit()
+
+
+def find_language_files(directory: str, languages: Optional[List[str]] = None) -> Dict[str, str]:
+    """
+    Find the *_pittogrammi.json files of a directory.
+
+    Returns:
+        Mapping language code -> file path, sorted by file size (largest first)
+        so that the slowest languages start first in the worker pool
+    """
+    files = {}
+    for filename in os.listdir(directory):
+        if not filename.endswith("_pittogrammi.json"):
+            continue
+        language = filename.split("_")[0]
+        if languages and language not in languages:
+            continue
+        files[language] = os.path.join(directory, filename)
+    return dict(sorted(files.items(), key=lambda entry: os.path.getsize(entry[1]), reverse=True))
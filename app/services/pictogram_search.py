@@ -1,42 +1,28 @@
-import json
-from typing import List, Tuple, Dict, Optional
+from typing import List, Tuple, Dict, Optional, Union
 from difflib import SequenceMatcher
 from typing import Optional
 from uuid import UUID
 from sqlalchemy import func, text, or_
 from sqlalchemy.orm import Session
 from sqlalchemy import select
+from app.core.log import get_logger
 from app.models import PECS, PECSTranslation 
+from app.services.lexicon import Lexicon, load_lexicon
+from app.services.pecs_usage import rank_by_usage
+
+logger = get_logger(__name__)
 
 
 class PictogramSearch:
     def __init__(self, json_path: str):
         """
-        Initialize the search system by loading pictograms from a JSON file.
+        Initialize the search system on the lexicon of a pictograms JSON file.
         
         Args:
             json_path: Path to the JSON file containing pictograms
         """
-        self.pictograms = self._load_pictograms(json_path)
-        
-    def _load_pictograms(self, json_path: str) -> List[Dict]:
-        """
-        Load pictograms from the JSON file.
-        
-        Args:
-            json_path: Path to the JSON file
-        Returns:
-            List of dictionaries containing pictograms
-        """
-        try:
-            with open(json_path, 'r', encoding='utf-8') as file:
-                return json.load(file)
-        except FileNotFoundError:
-            print(f"Error: File {json_path} not found")
-            return []
-        except json.JSONDecodeError:
-            print(f"Error: The file {json_path} is not a valid JSON")
-            return []
+        # Memory-mapped binary lexicon, shared by the instances (see app.services.lexicon)
+        self.pictograms = load_lexicon(json_path)
 
     def find_similar_word(self, word: str, threshold: float = 0.6) -> List[Tuple[Dict, float]]:
         """
@@ -51,11 +37,11 @@ class PictogramSearch:
         """
         results = []
         
-        for pictogram in self.pictograms:
-            pictogram_name = pictogram['nome']  # Keep 'nome' as the key to match the original JSON
-            
+        for pictogram_id, pictogram_name in self.pictograms.items():
             # Skip if the word is identical
             if pictogram_name:
+                # Keep 'nome' as the key to match the original JSON
+                pictogram = {'id': pictogram_id, 'nome': pictogram_name}
                 if word.lower() == pictogram_name.lower():
                     results.append((pictogram, 1.0))
                     continue
@@ -84,17 +70,19 @@ class PictogramSearch:
         # Sort by descending score
         return sorted(results, key=lambda x: x[1], reverse=True)
 
-def find_id_by_name(name: str, pictograms: List[Dict]) -> Optional[int]:
+def find_id_by_name(name: str, pictograms: Union[Lexicon, List[Dict]]) -> Optional[int]:
     """
     Find a pictogram ID by its name.
     
     Args:
         name: The name to search for
-        pictograms: List of pictograms to search in
+        pictograms: Lexicon or list of pictograms to search in
         
     Returns:
         The ID of the pictogram if found, None otherwise
     """
+    if isinstance(pictograms, Lexicon):
+        return pictograms.find_id(name)
     for item in pictograms:
         if item["nome"] == name:
             return item["id"]
@@ -122,7 +110,13 @@ def create_options_list(missing_word: str, search_service: PictogramSearch) -> L
 
 
 
-def find_pecs_by_name(db: Session, name: str, language: str, similarity_threshold: float = 0.3):
+def find_pecs_by_name(
+    db: Session,
+    name: str,
+    language: str,
+    similarity_threshold: float = 0.3,
+    usage: Optional[Dict[UUID, int]] = None
+):
     """
     Find PECS by name or custom name using fuzzy matching.
     
@@ -131,17 +125,22 @@ def find_pecs_by_name(db: Session, name: str, language: str, similarity_threshol
         name: The name to search for
         language: The language code to search in
         similarity_threshold: Minimum similarity score (0-1) to consider a match
+        usage: Usage counts of the user, {pecs_id: count} (see
+            app.services.pecs_usage); when given, the pictograms the user
+            picks most often are ranked first
         
     Returns:
-        List of dicts with PECS record and translation_name if found, empty list otherwise
+        List of dicts with PECS record, translation_name and similarity score
+        if found, empty list otherwise
     """
     results = []
     
     # Search in custom PECS using similarity
-    custom_pecs_stmt = select(PECS).where(
+    custom_similarity = func.similarity(PECS.name_custom, name)
+    custom_pecs_stmt = select(PECS, custom_similarity.label('score')).where(
         PECS.is_custom == True,
-        func.similarity(PECS.name_custom, name) > similarity_threshold
-    ).order_by(func.similarity(PECS.name_custom, name).desc()).limit(3)
+        custom_similarity > similarity_threshold
+    ).order_by(custom_similarity.desc()).limit(3)
     
     custom_pecs = db.execute(custom_pecs_stmt)
     
@@ -149,28 +148,35 @@ def find_pecs_by_name(db: Session, name: str, language: str, similarity_threshol
         pecs_object = custom_pecs_row[0]
         results.append({
             "pecs": pecs_object,
-            "translation_name": pecs_object.name_custom
+            "translation_name": pecs_object.name_custom,
+            "score": custom_pecs_row.score
         })
     
     # If not found, search in translations with fuzzy matching
     if len(results) < 4:
-        print("No custom PECS found")
+        logger.debug("fuzzy search in translations", custom_matches=len(results))
+        translation_similarity = func.similarity(PECSTranslation.name, name)
         translation_pecs_stmt = select(
             PECS, 
-            PECSTranslation.name.label('translation_name')
+            PECSTranslation.name.label('translation_name'),
+            translation_similarity.label('score')
         ).join(
             PECSTranslation, PECS.id == PECSTranslation.pecs_id
         ).where(
             PECSTranslation.language_code == language,
-            func.similarity(PECSTranslation.name, name) > similarity_threshold
-        ).order_by(func.similarity(PECSTranslation.name, name).desc()).limit(3)
+            translation_similarity > similarity_threshold
+        ).order_by(translation_similarity.desc()).limit(3)
         
         translation_pecs = db.execute(translation_pecs_stmt)
         
         for translation_pecs_row in translation_pecs:
             results.append({
                 "pecs": translation_pecs_row.PECS,
-                "translation_name": translation_pecs_row.translation_name
+                "translation_name": translation_pecs_row.translation_name,
+                "score": translation_pecs_row.score
             })
     
+    if usage:
+        results = rank_by_usage(results, usage)
+    
     return results
\ No newline at end of file
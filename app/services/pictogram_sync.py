@@ -0,0 +1,362 @@
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import delete, exists, insert
+from sqlmodel import Session, select
+
+from app.models import (
+    PECS, PECSTranslation, PECSCategoryItem, CategoryTranslation,
+    FavoritePECS, Nome, PhrasePECS
+)
+
+ARASAAC_URL_PREFIX = "https://api.arasaac.org/v1/pictograms/"
+
+# Maximum number of bound parameters per IN (...) clause
+IN_CHUNK_SIZE = 1000
+
+
+@dataclass(frozen=True)
+class PictogramRecord:
+    """A pictogram as described by an Arasaac dump or a *_pittogrammi.json file."""
+    external_id: int
+    name: str
+    # None means the source does not carry categories: they are left untouched
+    categories: Optional[Tuple[str, ...]] = None
+
+    @property
+    def content_hash(self) -> str:
+        return compute_content_hash(self.name, self.categories)
+
+
+@dataclass
+class SyncPlan:
+    inserts: List[Hashable] = field(default_factory=list)
+    updates: List[Hashable] = field(default_factory=list)
+    deletes: List[Hashable] = field(default_factory=list)
+    unchanged: int = 0
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.inserts or self.updates or self.deletes)
+
+
+@dataclass
+class SyncResult:
+    language: str
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+    elapsed: float = 0.0
+    dry_run: bool = False
+
+
+def compute_content_hash(name: str, categories: Optional[Iterable[str]] = None) -> str:
+    """
+    Compute a stable hash of the content of a pictogram.
+
+    Categories are sorted and deduplicated so that the hash does not depend
+    on the order they appear in the source file.
+    """
+    payload: Dict[str, Any] = {"name": name}
+    if categories is not None:
+        payload["categories"] = sorted(set(categories))
+    encoded = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+
+def diff_hashes(incoming: Dict[Hashable, str], stored: Dict[Hashable, Optional[str]]) -> SyncPlan:
+    """
+    Compare the hashes of the source with the ones stored in the database.
+
+    Args:
+        incoming: Mapping key -> content hash built from the source
+        stored: Mapping key -> content hash currently stored (None if unknown)
+
+    Returns:
+        SyncPlan with the keys to insert, update and delete
+    """
+    plan = SyncPlan()
+    for key, content_hash in incoming.items():
+        if key not in stored:
+            plan.inserts.append(key)
+        elif stored[key] != content_hash:
+            plan.updates.append(key)
+        else:
+            plan.unchanged += 1
+    plan.deletes = [key for key in stored if key not in incoming]
+    return plan
+
+
+def record_from_item(item: Dict[str, Any]) -> Optional[PictogramRecord]:
+    """
+    Build a PictogramRecord from a raw JSON item.
+
+    Both the Arasaac API format ({"_id", "keywords", "categories"}) and the
+    bundled lexicon format ({"id", "nome"}) are supported.
+    Items without a usable name are skipped.
+    """
+    if "_id" in item:
+        keywords = item.get("keywords") or []
+        name = keywords[0].get("keyword", "") if keywords else ""
+        if not name:
+            return None
+        return PictogramRecord(
+            external_id=int(item["_id"]),
+            name=name,
+            categories=tuple(item.get("categories") or ())
+        )
+
+    if item.get("id") is None or not item.get("nome"):
+        return None
+    return PictogramRecord(external_id=int(item["id"]), name=item["nome"])
+
+
+def external_id_from_url(image_url: Optional[str]) -> Optional[int]:
+    """Extract the Arasaac pictogram ID from a PECS image URL."""
+    if not image_url or not image_url.startswith(ARASAAC_URL_PREFIX):
+        return None
+    value = image_url[len(ARASAAC_URL_PREFIX):].split("?")[0]
+    return int(value) if value.isdigit() else None
+
+
+def _chunks(values: List[Any], size: int = IN_CHUNK_SIZE) -> Iterable[List[Any]]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _load_category_index(session: Session, language: str) -> Dict[Tuple[str, str], UUID]:
+    """
+    Load all category names for the language (and English, used as fallback)
+    with a single query.
+    """
+    languages = {language, "en"}
+    rows = session.exec(
+        select(CategoryTranslation.language_code, CategoryTranslation.name, CategoryTranslation.category_id)
+        .where(CategoryTranslation.language_code.in_(languages))
+    ).all()
+    index = {}
+    for language_code, name, category_id in rows:
+        index.setdefault((language_code, name), category_id)
+    return index
+
+
+def _resolve_categories(
+    index: Dict[Tuple[str, str], UUID],
+    categories: Iterable[str],
+    language: str
+) -> List[UUID]:
+    """Resolve category names the same way script/import_pecs.py does."""
+    resolved = []
+    for category_name in categories:
+        if not category_name:
+            continue
+        capitalized = category_name[0].upper() + category_name[1:]
+        category_id = (
+            index.get((language, capitalized))
+            or index.get(("en", capitalized))
+            or index.get((language, category_name))
+        )
+        if category_id and category_id not in resolved:
+            resolved.append(category_id)
+    return resolved
+
+
+def _load_stored_pictograms(session: Session, language: str) -> Dict[int, Tuple[UUID, UUID, Optional[str]]]:
+    """
+    Load the Arasaac pictograms stored for a language.
+
+    Returns:
+        Mapping external_id -> (pecs_id, translation_id, content_hash)
+    """
+    rows = session.exec(
+        select(PECS.id, PECS.image_url, PECSTranslation.id, PECSTranslation.content_hash)
+        .join(PECSTranslation, PECSTranslation.pecs_id == PECS.id)
+        .where(
+            PECS.is_custom == False,
+            PECS.image_url.startswith(ARASAAC_URL_PREFIX),
+            PECSTranslation.language_code == language
+        )
+    ).all()
+
+    stored = {}
+    for pecs_id, image_url, translation_id, content_hash in rows:
+        external_id = external_id_from_url(image_url)
+        # Duplicated pictograms are left alone, only the first one is synced
+        if external_id is not None and external_id not in stored:
+            stored[external_id] = (pecs_id, translation_id, content_hash)
+    return stored
+
+
+def sync_pictograms(
+    session: Session,
+    records: Iterable[PictogramRecord],
+    language: str,
+    dry_run: bool = False
+) -> SyncResult:
+    """
+    Synchronise the PECS catalog of a language with a pictogram source.
+
+    Only the pictograms whose content hash changed are written: new
+    pictograms are inserted, changed ones are updated and for the ones
+    missing from the source the translation (and the names) of the language
+    is deleted. A PECS is deleted only when it is left without translations
+    and no phrase or favorite uses it. Everything is committed in a single
+    transaction, together with the SyncLog rows of the changed PECS (written
+    by the flush events of app.services.sync_log).
+    """
+    start_time = time.perf_counter()
+
+    incoming: Dict[int, PictogramRecord] = {}
+    for record in records:
+        incoming.setdefault(record.external_id, record)
+
+    stored = _load_stored_pictograms(session, language)
+    plan = diff_hashes(
+        {external_id: record.content_hash for external_id, record in incoming.items()},
+        {external_id: row[2] for external_id, row in stored.items()}
+    )
+    result = SyncResult(
+        language=language,
+        inserted=len(plan.inserts),
+        updated=len(plan.updates),
+        deleted=len(plan.deletes),
+        unchanged=plan.unchanged,
+        dry_run=dry_run
+    )
+    if dry_run or plan.is_empty:
+        result.elapsed = time.perf_counter() - start_time
+        return result
+
+    needs_categories = any(
+        incoming[key].categories for key in plan.inserts + plan.updates
+    )
+    category_index = _load_category_index(session, language) if needs_categories else {}
+
+    # Inserts
+    for external_id in plan.inserts:
+        record = incoming[external_id]
+        pecs = PECS(
+            image_url=f"{ARASAAC_URL_PREFIX}{external_id}",
+            is_custom=False
+        )
+        session.add(pecs)
+        session.add(PECSTranslation(
+            pecs_id=pecs.id,
+            language_code=language,
+            name=record.name,
+            content_hash=record.content_hash
+        ))
+        for category_id in _resolve_categories(category_index, record.categories or (), language):
+            session.add(PECSCategoryItem(pecs_id=pecs.id, category_id=category_id))
+
+    # Updates
+    translation_ids = [stored[external_id][1] for external_id in plan.updates]
+    translations = {}
+    for chunk in _chunks(translation_ids):
+        for translation in session.exec(select(PECSTranslation).where(PECSTranslation.id.in_(chunk))):
+            translations[translation.id] = translation
+
+    recategorized = [
+        stored[external_id][0] for external_id in plan.updates
+        if incoming[external_id].categories is not None
+    ]
+    for chunk in _chunks(recategorized):
+        session.exec(delete(PECSCategoryItem).where(PECSCategoryItem.pecs_id.in_(chunk)))
+
+    for external_id in plan.updates:
+        record = incoming[external_id]
+        pecs_id, translation_id, _ = stored[external_id]
+        translation = translations[translation_id]
+        translation.name = record.name
+        translation.content_hash = record.content_hash
+        session.add(translation)
+        if record.categories is not None:
+            for category_id in _resolve_categories(category_index, record.categories, language):
+                session.add(PECSCategoryItem(pecs_id=pecs_id, category_id=category_id))
+
+    # Deletes: the other languages and the users' phrases and favorites may
+    # still use the PECS. Through the ORM so that the SyncLog rows are written
+    for chunk in _chunks([stored[external_id][1] for external_id in plan.deletes]):
+        for translation in session.exec(select(PECSTranslation).where(PECSTranslation.id.in_(chunk))):
+            session.delete(translation)
+    for chunk in _chunks(plan.deletes):
+        session.exec(delete(Nome).where(Nome.lang == language, Nome.pictogram_id.in_(chunk)))
+
+    for chunk in _chunks([stored[external_id][0] for external_id in plan.deletes]):
+        unused = select(PECS).where(
+            PECS.id.in_(chunk),
+            ~exists().where(PECSTranslation.pecs_id == PECS.id),
+            ~exists().where(PhrasePECS.pecs_id == PECS.id),
+            ~exists().where(FavoritePECS.pecs_id == PECS.id)
+        )
+        for pecs in session.exec(unused):
+            session.delete(pecs)
+
+    session.commit()
+
+    result.elapsed = time.perf_counter() - start_time
+    return result
+
+
+def sync_nomi(
+    session: Session,
+    records: Iterable[PictogramRecord],
+    language: str,
+    dry_run: bool = False
+) -> SyncResult:
+    """
+    Synchronise the nome table of a language with a pictogram source.
+
+    Names are grouped by pictogram ID and hashed; only the groups that
+    changed are rewritten, using multi-row statements.
+    """
+    start_time = time.perf_counter()
+
+    incoming_names: Dict[int, List[str]] = {}
+    for record in records:
+        incoming_names.setdefault(record.external_id, []).append(record.name)
+
+    stored_names: Dict[int, List[str]] = {}
+    stored_ids: Dict[int, List[int]] = {}
+    rows = session.exec(select(Nome.id, Nome.pictogram_id, Nome.name).where(Nome.lang == language)).all()
+    for nome_id, pictogram_id, name in rows:
+        stored_names.setdefault(pictogram_id, []).append(name)
+        stored_ids.setdefault(pictogram_id, []).append(nome_id)
+
+    plan = diff_hashes(
+        {key: compute_content_hash("\n".join(sorted(names))) for key, names in incoming_names.items()},
+        {key: compute_content_hash("\n".join(sorted(names))) for key, names in stored_names.items()}
+    )
+    result = SyncResult(
+        language=language,
+        inserted=len(plan.inserts),
+        updated=len(plan.updates),
+        deleted=len(plan.deletes),
+        unchanged=plan.unchanged,
+        dry_run=dry_run
+    )
+    if dry_run or plan.is_empty:
+        result.elapsed = time.perf_counter() - start_time
+        return result
+
+    obsolete_ids = [nome_id for key in plan.updates + plan.deletes for nome_id in stored_ids[key]]
+    for chunk in _chunks(obsolete_ids):
+        session.exec(delete(Nome).where(Nome.id.in_(chunk)))
+
+    new_rows = [
+        {"pictogram_id": key, "name": name, "lang": language}
+        for key in plan.inserts + plan.updates
+        for name in incoming_names[key]
+    ]
+    for chunk in _chunks(new_rows):
+        session.exec(insert(Nome).values(chunk))
+
+    session.commit()
+
+    result.elapsed = time.perf_counter() - start_time
+    return result
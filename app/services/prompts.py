@@ -0,0 +1,106 @@
+"""
+Registry of the prompts of the LLM services.
+
+Each service registers a builder that renders its prompt for a language; the
+registry renders every (service, language) prompt once, on first use, and
+keeps it with its hash and its precompiled parsing regexes. The system
+prompts sent to OpenAI are therefore byte-identical across calls (which lets
+the API reuse its prompt-prefix cache), and the hash identifies the prompt
+version in cache keys and in the status endpoint.
+"""
+import hashlib
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Pattern, Tuple
+
+
+@dataclass(frozen=True)
+class Prompt:
+    service: str
+    language: str
+    system: str
+    # Template of the user message, formatted with the input ({sentence})
+    user: Optional[str] = None
+    patterns: Dict[str, Pattern] = field(default_factory=dict)
+    hash: str = ""
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """What a builder returns; patterns are compiled by the registry."""
+    system: str
+    user: Optional[str] = None
+    patterns: Dict[str, Tuple[str, int]] = field(default_factory=dict)
+
+
+PromptBuilder = Callable[[str], PromptTemplate]
+
+
+class PromptRegistry:
+    def __init__(self) -> None:
+        self._builders: Dict[str, PromptBuilder] = {}
+        # service -> (languages with their own prompt, language used for the others)
+        self._languages: Dict[str, Tuple[FrozenSet[str], str]] = {}
+        self._prompts: Dict[Tuple[str, str], Prompt] = {}
+        self._lock = threading.Lock()
+
+    def register(
+        self, service: str, languages: Iterable[str], fallback: str = "en"
+    ) -> Callable[[PromptBuilder], PromptBuilder]:
+        """
+        Decorator registering the prompt builder of a service.
+
+        The other languages get the prompt of fallback: the language codes
+        come from the requests, so only the supported ones are rendered and
+        kept.
+
+        Usage:
+            @prompt_registry.register("token_2_phrase", SUPPORTED_LANGUAGES)
+            def _token_2_phrase_prompt(language): ...
+        """
+        def decorator(builder: PromptBuilder) -> PromptBuilder:
+            with self._lock:
+                self._builders[service] = builder
+                self._languages[service] = (frozenset(languages), fallback)
+                # A new builder invalidates the prompts rendered by the old one
+                for key in [key for key in self._prompts if key[0] == service]:
+                    del self._prompts[key]
+            return builder
+        return decorator
+
+    def get(self, service: str, language: str) -> Prompt:
+        """Rendered prompt of a service in a language, built on first use."""
+        languages, fallback = self._languages[service]
+        if language not in languages:
+            language = fallback
+        key = (service, language)
+        prompt = self._prompts.get(key)
+        if prompt is not None:
+            return prompt
+
+        with self._lock:
+            prompt = self._prompts.get(key)
+            if prompt is None:
+                template = self._builders[service](language)
+                digest = hashlib.sha256(f"{template.system}\x00{template.user or ''}".encode("utf-8"))
+                prompt = self._prompts[key] = Prompt(
+                    service=service,
+                    language=language,
+                    system=template.system,
+                    user=template.user,
+                    patterns={
+                        name: re.compile(pattern, flags)
+                        for name, (pattern, flags) in template.patterns.items()
+                    },
+                    hash=digest.hexdigest()[:12],
+                )
+            return prompt
+
+    def rendered(self) -> List[Prompt]:
+        """The prompts rendered so far."""
+        with self._lock:
+            return list(self._prompts.values())
+
+
+prompt_registry = PromptRegistry()
@@ -1,20 +1,80 @@
-from openai import OpenAI
 import json
 from typing import List, Dict, Optional
-import os
+
+from app.core.llm_clients import llm_clients
+from app.services.prompts import PromptTemplate, prompt_registry
+
+PROMPTS = {
+    "en": {
+        "system": "You are an assistant that transforms sentences into key tokens. "
+                "Simplify the sentence by using only key and simple words. "
+                "Remove articles and pronouns and convert verbs to infinitive form. "
+                "Return only the key words in quotes, separated by spaces. "
+                "Change proper names of people (Mike, Tom, ....) with nouns like boy, girl, dad, mom, dog, depending on context. (Bob -> child, Lisa -> girl)"
+                "Correct any misspelled words, for example 'andre' to 'andare' or 'booling' to 'bowling'",
+        "user": "Transform the sentence '{sentence}' into key tokens, "
+            "removing articles and pronouns and converting verbs to infinitive form. Return only the key words in quotes, separated by spaces."
+    },
+    "it": {
+        "system": "Sei un assistente che trasforma le frasi in token chiave. "
+                "Semplifica la frase utilizzando solo parole chiave e semplici. "
+                "Rimuovi articoli e pronomi e converti i verbi in forma infinita. "
+                "Restituisci solo le parole chiave tra virgolette, separate da spazi. "
+                "Cambia i nomi propri di persone (Michele, Antonio, ....) con sostantivi come ragazzo, ragazza, papà, mamma, cane, a seconda del contesto. (Michele -> bambino, Maria -> bambina) "    
+                "Correggi eventuali parole scritte male, ad esempio 'andre' in 'andare' o 'booling' in 'bowling'",
+        "user": "Trasforma la frase '{sentence}' in token chiave, "
+            "rimuovendo articoli e pronomi e convertendo i verbi in forma infinita. Restituisci solo le parole chiave tra virgolette, separate da spazi."
+    },
+    "de": {
+        "system": "Du bist ein Assistent, der Sätze in Schlüsselwörter umwandelt. "
+                "Vereinfache den Satz, indem du nur Schlüssel- und einfache Wörter verwendest. "
+                "Entferne Artikel und Pronomen und wandle Verben in die Infinitivform um. "
+                "Gib nur die Schlüsselwörter in Anführungszeichen zurück, getrennt durch Leerzeichen. "
+                "ändern Eigennamen von Personen (Christian, Astrid, ....) durch Substantive wie Junge, Mädchen, Vater, Mutter, Hund, je nach Kontext. (Christian -> kind, Maria -> mädchen)"
+                "Korrigiere falsch geschriebene Wörter, zum Beispiel 'gehe' zu 'gehen'",
+        "user": "Wandle den Satz '{sentence}' in Schlüsselwörter um, "
+            "entferne Artikel und Pronomen und wandle Verben in die Infinitivform um. Gib nur die Schlüsselwörter in Anführungszeichen zurück, getrennt durch Leerzeichen."
+    },
+    "fr": {
+        "system": "Tu es un assistant qui transforme les phrases en jetons clés. "
+                "Simplifie la phrase en utilisant uniquement des mots clés et simples. "
+                "Supprime les articles et les pronoms et convertis les verbes à l'infinitif. "
+                "Renvoie uniquement les mots clés entre guillemets, séparés par des espaces. "
+                "Changement les noms propres de personnes (Jean, Michel, ....) par des noms comme garçon, fille, papa, maman, chien, selon le contexte. (Michele -> enfant, Maria -> fille)"
+                "Corrige les mots mal orthographiés, par exemple 'allé' en 'aller'",
+        "user": "Transforme la phrase '{sentence}' en jetons clés, "
+            "en supprimant les articles et les pronoms et en convertissant les verbes à l'infinitif. Renvoie uniquement les mots clés entre guillemets, séparés par des espaces."
+    },
+    "es": {
+        "system": "Eres un asistente que transforma oraciones en tokens clave. "
+                "Simplifica la oración utilizando solo palabras clave y simples. "
+                "Elimina artículos y pronombres y convierte los verbos a forma infinitiva. "
+                "Devuelve solo las palabras clave entre comillas, separadas por espacios. "
+                "cambiar los nombres propios de personas (Hugo, Paula, ....) con sustantivos como chico, chica, papá, mamá, perro, dependiendo del contexto. Michele -> niño, Maria -> niña"
+                "Corrige palabras mal escritas, por ejemplo 'voi' a 'ir'",
+        "user": "Transforma la oración '{sentence}' en tokens clave, "
+            "eliminando artículos y pronombres y convirtiendo los verbos a forma infinitiva. Devuelve solo las palabras clave entre comillas, separadas por espacios."
+    }
+}
+
+
+@prompt_registry.register("sentence_tokenizer", PROMPTS)
+def _sentence_tokenizer_prompt(language_code: str) -> PromptTemplate:
+    # Return the prompt for the requested language, or default to English
+    prompt = PROMPTS.get(language_code, PROMPTS["en"])
+    return PromptTemplate(system=prompt["system"], user=prompt["user"])
+
 
 class SentenceTokenizer:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: Optional[str] = None):
         """
         Initialize the tokenizer with an OpenAI API key.
         
         Args:
-            api_key: OpenAI API key
+            api_key: OpenAI API key, defaults to OPENAI_API_KEY
         """
-        # Set the API key as an environment variable
-        os.environ["OPENAI_API_KEY"] = api_key
-        # Initialize the client without passing the API key directly
-        self.client = OpenAI()
+        # Shared application client, its connection pool is reused by all the services
+        self.client = llm_clients.client(api_key)
         
 
 
@@ -60,61 +120,8 @@ class SentenceTokenizer:
         Returns:
             Dictionary containing system and user prompts
         """
-        prompts = {
-            "en": {
-                "system": "You are an assistant that transforms sentences into key tokens. "
-                        "Simplify the sentence by using only key and simple words. "
-                        "Remove articles and pronouns and convert verbs to infinitive form. "
-                        "Return only the key words in quotes, separated by spaces. "
-                        "Change proper names of people (Mike, Tom, ....) with nouns like boy, girl, dad, mom, dog, depending on context. (Bob -> child, Lisa -> girl)"
-                        "Correct any misspelled words, for example 'andre' to 'andare' or 'booling' to 'bowling'",
-                "user": "Transform the sentence '{sentence}' into key tokens, "
-                    "removing articles and pronouns and converting verbs to infinitive form. Return only the key words in quotes, separated by spaces."
-            },
-            "it": {
-                "system": "Sei un assistente che trasforma le frasi in token chiave. "
-                        "Semplifica la frase utilizzando solo parole chiave e semplici. "
-                        "Rimuovi articoli e pronomi e converti i verbi in forma infinita. "
-                        "Restituisci solo le parole chiave tra virgolette, separate da spazi. "
-                        "Cambia i nomi propri di persone (Michele, Antonio, ....) con sostantivi come ragazzo, ragazza, papà, mamma, cane, a seconda del contesto. (Michele -> bambino, Maria -> bambina) "    
-                        "Correggi eventuali parole scritte male, ad esempio 'andre' in 'andare' o 'booling' in 'bowling'",
-                "user": "Trasforma la frase '{sentence}' in token chiave, "
-                    "rimuovendo articoli e pronomi e convertendo i verbi in forma infinita. Restituisci solo le parole chiave tra virgolette, separate da spazi."
-            },
-            "de": {
-                "system": "Du bist ein Assistent, der Sätze in Schlüsselwörter umwandelt. "
-                        "Vereinfache den Satz, indem du nur Schlüssel- und einfache Wörter verwendest. "
-                        "Entferne Artikel und Pronomen und wandle Verben in die Infinitivform um. "
-                        "Gib nur die Schlüsselwörter in Anführungszeichen zurück, getrennt durch Leerzeichen. "
-                        "ändern Eigennamen von Personen (Christian, Astrid, ....) durch Substantive wie Junge, Mädchen, Vater, Mutter, Hund, je nach Kontext. (Christian -> kind, Maria -> mädchen)"
-                        "Korrigiere falsch geschriebene Wörter, zum Beispiel 'gehe' zu 'gehen'",
-                "user": "Wandle den Satz '{sentence}' in Schlüsselwörter um, "
-                    "entferne Artikel und Pronomen und wandle Verben in die Infinitivform um. Gib nur die Schlüsselwörter in Anführungszeichen zurück, getrennt durch Leerzeichen."
-            },
-            "fr": {
-                "system": "Tu es un assistant qui transforme les phrases en jetons clés. "
-                        "Simplifie la phrase en utilisant uniquement des mots clés et simples. "
-                        "Supprime les articles et les pronoms et convertis les verbes à l'infinitif. "
-                        "Renvoie uniquement les mots clés entre guillemets, séparés par des espaces. "
-                        "Changement les noms propres de personnes (Jean, Michel, ....) par des noms comme garçon, fille, papa, maman, chien, selon le contexte. (Michele -> enfant, Maria -> fille)"
-                        "Corrige les mots mal orthographiés, par exemple 'allé' en 'aller'",
-                "user": "Transforme la phrase '{sentence}' en jetons clés, "
-                    "en supprimant les articles et les pronoms et en convertissant les verbes à l'infinitif. Renvoie uniquement les mots clés entre guillemets, séparés par des espaces."
-            },
-            "es": {
-                "system": "Eres un asistente que transforma oraciones en tokens clave. "
-                        "Simplifica la oración utilizando solo palabras clave y simples. "
-                        "Elimina artículos y pronombres y convierte los verbos a forma infinitiva. "
-                        "Devuelve solo las palabras clave entre comillas, separadas por espacios. "
-                        "cambiar los nombres propios de personas (Hugo, Paula, ....) con sustantivos como chico, chica, papá, mamá, perro, dependiendo del contexto. Michele -> niño, Maria -> niña"
-                        "Corrige palabras mal escritas, por ejemplo 'voi' a 'ir'",
-                "user": "Transforma la oración '{sentence}' en tokens clave, "
-                    "eliminando artículos y pronombres y convirtiendo los verbos a forma infinitiva. Devuelve solo las palabras clave entre comillas, separadas por espacios."
-            }
-        }
-        
-        # Return the prompt for the requested language, or default to English
-        return prompts.get(language_code, prompts["en"])
+        prompt = prompt_registry.get("sentence_tokenizer", language_code)
+        return {"system": prompt.system, "user": prompt.user}
  
     def find_missing_word(self, sentence: str, missing: str, options_list: str) -> Optional[str]:
         """
@@ -0,0 +1,336 @@
+"""
+Request coalescing ("single-flight") for expensive calls such as the LLM ones.
+
+When identical calls arrive at the same time only the first one (the leader)
+runs, the others wait for it and share its result:
+
+- inside a process, followers wait on the leader's in-flight call;
+- across worker processes, the leader creates a lock file named after the
+  key while it runs and leaves its result, tagged with the id of the flight,
+  in a small file. The workers that found the lock poll for that result
+  instead of running the call again, without ever blocking on a lock (the
+  coroutines of do_async poll with asyncio.sleep, so the event loop keeps
+  running).
+
+A result is only read by the workers that were waiting on its flight: this is
+not a cache, and a call made after the leader ended runs again.
+"""
+import asyncio
+import getpass
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterator, Optional, Tuple, TypeVar
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+# Polling interval of the workers waiting on another one, doubled up to the max
+POLL_INTERVAL = 0.01
+MAX_POLL_INTERVAL = 0.2
+
+_MISSING = object()
+_RUNNING = object()
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+def _is_shareable(result: Any) -> bool:
+    # Error payloads returned by the services are not shared with other workers
+    return not (isinstance(result, dict) and "error" in result)
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key.
+
+    Args:
+        lock_dir: Directory of the lock and result files shared by the workers,
+            None to coalesce only inside the process
+        wait_timeout: Maximum seconds a follower waits for the leader before
+            running the call itself; a lock file older than this is stale
+    """
+
+    def __init__(self, lock_dir: Optional[str] = None, wait_timeout: float = 120.0) -> None:
+        self.lock_dir = lock_dir
+        self.wait_timeout = wait_timeout
+        self.calls = 0
+        self.coalesced = 0
+        self._in_flight: Dict[str, _Call] = {}
+        self._in_flight_tasks: Dict[str, "asyncio.Future[Any]"] = {}
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+        if self.lock_dir:
+            os.makedirs(self.lock_dir, mode=0o700, exist_ok=True)
+
+    def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], T],
+        shareable: Callable[[Any], bool] = _is_shareable
+    ) -> T:
+        """
+        Run fn, unless an identical call is already running: in that case wait
+        for it and return its result (or raise its exception).
+        """
+        digest = self._digest(key)
+
+        with self._lock:
+            self.calls += 1
+            call = self._in_flight.get(digest)
+            leader = call is None
+            if leader:
+                call = self._in_flight[digest] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if call.done.wait(self.wait_timeout):
+                if call.error is not None:
+                    raise call.error
+                return call.result
+            return fn()
+
+        try:
+            call.result = self._run_across_workers(digest, fn, shareable)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(digest, None)
+            call.done.set()
+
+    async def do_async(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[T]],
+        shareable: Callable[[Any], bool] = _is_shareable
+    ) -> T:
+        """
+        Async variant of do: concurrent coroutines with the same key await a
+        single call, which is coalesced with the other workers like in do.
+        """
+        digest = self._digest(key)
+        with self._lock:
+            self.calls += 1
+            task = self._in_flight_tasks.get(digest)
+            if task is None:
+                task = self._in_flight_tasks[digest] = asyncio.ensure_future(
+                    self._run_across_workers_async(digest, fn, shareable)
+                )
+                task.add_done_callback(lambda _: self._in_flight_tasks.pop(digest, None))
+            else:
+                self.coalesced += 1
+        # A cancelled waiter must not cancel the call shared with the others
+        return await asyncio.shield(task)
+
+    @staticmethod
+    def _digest(key: Hashable) -> str:
+        return hashlib.sha1(json.dumps(key, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+    def _paths(self, digest: str) -> Tuple[str, str]:
+        return os.path.join(self.lock_dir, f"{digest}.lock"), os.path.join(self.lock_dir, f"{digest}.json")
+
+    def _run_across_workers(self, digest: str, fn: Callable[[], T], shareable: Callable[[Any], bool]) -> T:
+        if not self.lock_dir:
+            return fn()
+
+        lock_path, result_path = self._paths(digest)
+        try:
+            flight = self._acquire(lock_path)
+        except OSError:
+            # Unusable lock directory: the call is only coalesced in the process
+            return fn()
+        if flight is None:
+            shared = self._wait_for_result(lock_path, result_path)
+            if shared is not _MISSING:
+                return shared
+            # The leader failed, returned an error payload or is too slow
+            return fn()
+
+        try:
+            result = fn()
+            if shareable(result):
+                self._write_result(result_path, flight, result)
+            return result
+        finally:
+            self._release(lock_path)
+
+    async def _run_across_workers_async(
+        self,
+        digest: str,
+        fn: Callable[[], Awaitable[T]],
+        shareable: Callable[[Any], bool]
+    ) -> T:
+        """_run_across_workers for a coroutine: the small file operations run inline, the waits are asyncio.sleep."""
+        if not self.lock_dir:
+            return await fn()
+
+        lock_path, result_path = self._paths(digest)
+        try:
+            flight = self._acquire(lock_path)
+        except OSError:
+            return await fn()
+        if flight is None:
+            shared = await self._wait_for_result_async(lock_path, result_path)
+            if shared is not _MISSING:
+                return shared
+            return await fn()
+
+        try:
+            result = await fn()
+            if shareable(result):
+                self._write_result(result_path, flight, result)
+            return result
+        finally:
+            self._release(lock_path)
+
+    @staticmethod
+    def _release(lock_path: str) -> None:
+        try:
+            os.unlink(lock_path)
+        except OSError:
+            pass
+
+    def _acquire(self, lock_path: str) -> Optional[str]:
+        """Create the lock file, holding a new flight id; None when another worker holds it."""
+        flight = uuid.uuid4().hex
+        tmp_path = f"{lock_path}.{flight}.tmp"
+        with open(tmp_path, "w", encoding="ascii") as f:
+            f.write(flight)
+        try:
+            for attempt in range(2):
+                try:
+                    # Atomic, and the lock is never seen without its flight id
+                    os.link(tmp_path, lock_path)
+                    return flight
+                except FileExistsError:
+                    if attempt or not self._is_stale(lock_path):
+                        return None
+                    # Left by a worker that died during the call. Two workers
+                    # breaking it at once may both lead: the call runs twice
+                    try:
+                        os.unlink(lock_path)
+                    except OSError:
+                        pass
+            return None
+        finally:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    def _is_stale(self, lock_path: str) -> bool:
+        try:
+            return time.time() - os.path.getmtime(lock_path) > self.wait_timeout
+        except OSError:
+            return False
+
+    @staticmethod
+    def _read_lock(lock_path: str) -> Optional[str]:
+        try:
+            with open(lock_path, "r", encoding="ascii") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _poll_intervals(self, flight: Optional[str]) -> Iterator[float]:
+        """The waits between two polls of a flight, until the timeout."""
+        deadline = time.monotonic() + self.wait_timeout
+        interval = POLL_INTERVAL
+        while flight is not None and time.monotonic() < deadline:
+            yield interval
+            interval = min(interval * 2, MAX_POLL_INTERVAL)
+
+    def _poll(self, lock_path: str, result_path: str, flight: str) -> Any:
+        """Result of the flight, _RUNNING while it holds the lock, _MISSING when it ended without one."""
+        # Read before the result: the leader writes the result, then releases
+        holder = self._read_lock(lock_path)
+        shared = self._read_result(result_path)
+        if shared is not None and shared.get("flight") == flight:
+            with self._lock:
+                self.coalesced += 1
+            return shared["result"]
+        return _RUNNING if holder == flight else _MISSING
+
+    def _wait_for_result(self, lock_path: str, result_path: str) -> Any:
+        """Result of the flight holding the lock, _MISSING when it ends without one or times out."""
+        flight = self._read_lock(lock_path)
+        for interval in self._poll_intervals(flight):
+            time.sleep(interval)
+            shared = self._poll(lock_path, result_path, flight)
+            if shared is not _RUNNING:
+                return shared
+        return _MISSING
+
+    async def _wait_for_result_async(self, lock_path: str, result_path: str) -> Any:
+        flight = self._read_lock(lock_path)
+        for interval in self._poll_intervals(flight):
+            await asyncio.sleep(interval)
+            shared = self._poll(lock_path, result_path, flight)
+            if shared is not _RUNNING:
+                return shared
+        return _MISSING
+
+    @staticmethod
+    def _read_result(result_path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(result_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_result(self, result_path: str, flight: str, result: Any) -> None:
+        try:
+            payload = json.dumps({"flight": flight, "result": result}, ensure_ascii=False)
+        except (TypeError, ValueError):
+            return
+        tmp_path = f"{result_path}.{flight}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp_path, result_path)
+        except OSError:
+            pass
+        self._prune()
+
+    def _prune(self) -> None:
+        # Remove the result files no follower waits for anymore, at most once a minute
+        now = time.time()
+        if now - self._last_prune < 60:
+            return
+        self._last_prune = now
+        for entry in os.scandir(self.lock_dir):
+            if not entry.name.endswith((".json", ".tmp")):
+                continue
+            try:
+                if now - entry.stat().st_mtime > self.wait_timeout:
+                    os.unlink(entry.path)
+            except OSError:
+                pass
+
+
+def _default_lock_dir() -> Optional[str]:
+    if not settings.SINGLE_FLIGHT_CROSS_WORKER:
+        return None
+    if settings.SINGLE_FLIGHT_DIR:
+        return settings.SINGLE_FLIGHT_DIR
+    # Private to the user running the workers: the files hold LLM results
+    owner = os.getuid() if hasattr(os, "getuid") else getpass.getuser()
+    return os.path.join(tempfile.gettempdir(), f"pecs-api-single-flight-{owner}")
+
+
+# Shared by the LLM services
+llm_single_flight = SingleFlight(lock_dir=_default_lock_dir())
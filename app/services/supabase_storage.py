@@ -2,6 +2,9 @@ from typing import BinaryIO, Optional
 import uuid
 from supabase import create_client, Client
 from app.core.config import settings
+from app.core.log import get_logger
+
+logger = get_logger(__name__)
 
 class SupabaseStorageService:
     def __init__(self):
@@ -29,7 +32,7 @@ class SupabaseStorageService:
             # Check if bucket exists by listing buckets
             buckets = self.supabase.storage.list_buckets()
             bucket_names = [bucket.name for bucket in buckets]
-            print(f"Available buckets: {bucket_names}")
+            logger.debug("supabase buckets", buckets=bucket_names)
             
             # Assume bucket exists even if we can't see it due to permissions
             # This is a workaround for the case where the bucket exists but we can't see it
@@ -40,16 +43,20 @@ class SupabaseStorageService:
             try:
                 # Try to list files in the bucket to see if we can access it
                 self.supabase.storage.from_(self.bucket_name).list()
-                print(f"Successfully accessed bucket '{self.bucket_name}'")
+                logger.debug("supabase bucket accessible", bucket=self.bucket_name)
             except Exception as bucket_e:
-                print(f"Error accessing bucket '{self.bucket_name}': {str(bucket_e)}")
-                print("This could be due to RLS policies or the bucket not existing.")
-                print("If the bucket exists, make sure you have configured the RLS policies correctly.")
+                logger.warning(
+                    "supabase bucket not accessible, check that it exists and its RLS policies",
+                    bucket=self.bucket_name,
+                    error=str(bucket_e),
+                )
                 # We'll continue anyway and let the actual operations fail if needed
         except Exception as e:
-            print(f"Error listing buckets: {str(e)}")
-            print("This is likely due to Row-Level Security (RLS) policies in Supabase.")
-            print("We'll assume the bucket exists and try to use it directly.")
+            logger.warning(
+                "cannot list supabase buckets, likely RLS policies; using the bucket directly",
+                bucket=self.bucket_name,
+                error=str(e),
+            )
         
     async def upload_file(
         self, 
@@ -97,16 +104,15 @@ class SupabaseStorageService:
                 
                 if signed_url_data and 'signedURL' in signed_url_data:
                     file_url = signed_url_data['signedURL']
-                    print(f"Generated signed URL: {file_url}")
                 else:
                     # Fallback to public URL if signed URL fails
                     file_url = self.supabase.storage.from_(self.bucket_name).get_public_url(file_path)
-                    print(f"Fallback to public URL: {file_url}")
+                    logger.debug("supabase public url fallback", path=file_path)
             except Exception as sign_e:
-                print(f"Error creating signed URL: {str(sign_e)}")
+                logger.warning("cannot create supabase signed url", path=file_path, error=str(sign_e))
                 # Fallback to public URL if signed URL fails
                 file_url = self.supabase.storage.from_(self.bucket_name).get_public_url(file_path)
-                print(f"Fallback to public URL: {file_url}")
+                logger.debug("supabase public url fallback", path=file_path)
                 
             # Remove any query parameters that might be causing issues with the public URL
             # (but keep them for signed URLs)
@@ -114,12 +120,12 @@ class SupabaseStorageService:
                 file_url = file_url.split('?')[0]
                 
             # Log the final URL for debugging
-            print(f"Final URL: {file_url}")
+            logger.debug("supabase file uploaded", path=file_path, signed="token=" in file_url)
             
             return file_url
         except Exception as e:
             error_msg = str(e)
-            print(f"Error uploading file to Supabase: {error_msg}")
+            logger.error("supabase upload failed", path=file_path, error=error_msg)
             
             if "new row violates row-level security policy" in error_msg or "403" in error_msg:
                 raise Exception(
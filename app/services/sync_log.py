@@ -0,0 +1,292 @@
+"""
+Change log of the synchronized entities, read by the tablets to sync offline.
+
+Every flush that writes a PECS, category, phrase or collection (or one of
+their translations and associations) appends a SyncLog row per changed
+entity, in the same transaction, so the log commits and rolls back with the
+write. Changes of the child tables are logged as an update of their parent.
+The user_id of a row is the owner of the entity (None for the shared
+catalog), so each user reads only the changes visible to them. The rows of a
+user are deleted with the user, and the changes made by a user deletion to
+the entities they owned are not logged: their rows would otherwise be shared.
+
+The rows are read in (txid, timestamp, id) order with a keyset cursor, see
+get_changes. Timestamps are UTC.
+"""
+import base64
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID, uuid4
+
+from sqlalchemy import and_, event, func, inspect, insert, or_, select, true
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.models import Collection, PECS, Phrase, SyncLog, User
+
+# Table name -> (entity type, column holding the entity id). The entity
+# types are the ones of SyncLog: PECS are pictograms, phrases sequences and
+# collections sequence groups
+SYNC_TABLES: Dict[str, Tuple[str, str]] = {
+    "pecs": ("pictogram", "id"),
+    "pecs_translations": ("pictogram", "pecs_id"),
+    "pecs_category_items": ("pictogram", "pecs_id"),
+    "pecs_categories": ("category", "id"),
+    "categories_translations": ("category", "category_id"),
+    "phrases": ("sequence", "id"),
+    "phrases_translations": ("sequence", "phrase_id"),
+    "phrase_pecs": ("sequence", "phrase_id"),
+    "collections": ("sequence_group", "id"),
+    "collections_translations": ("sequence_group", "collection_id"),
+    "phrase_collections": ("sequence_group", "collection_id"),
+}
+
+# Entity type -> model with the owner (user_id) of the entity; the
+# categories are shared
+OWNER_MODELS = {"pictogram": PECS, "sequence": Phrase, "sequence_group": Collection}
+
+# (entity type, entity id) -> (action, owner, whether the owner is known)
+Changes = Dict[Tuple[str, UUID], Tuple[str, Optional[UUID], bool]]
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _is_postgres(connection: Connection) -> bool:
+    return connection.dialect.name == "postgresql"
+
+
+def _owners(connection: Connection, entity_type: str, entity_ids: Set[UUID]) -> Dict[UUID, Optional[UUID]]:
+    model = OWNER_MODELS.get(entity_type)
+    if model is None or not entity_ids:
+        return {}
+    rows = connection.execute(select(model.id, model.user_id).where(model.id.in_(entity_ids)))
+    return {entity_id: user_id for entity_id, user_id in rows}
+
+
+def _owner_ids(obj) -> Set[Optional[UUID]]:
+    """The owner of an object and, when the flush changed it, the previous one."""
+    if not hasattr(obj, "user_id"):
+        return set()
+    history = inspect(obj).attrs.user_id.history
+    return {obj.user_id, *history.deleted}
+
+
+def collect_changes(
+    new: Iterable,
+    dirty: Iterable,
+    deleted: Iterable,
+    deleted_users: Set[UUID] = frozenset()
+) -> Changes:
+    """
+    Entity changes of a flush. The owner of an entity changed only through a
+    child table is not known yet. The entities owned by the deleted users
+    (deleted with them or left without owner) are left out.
+    """
+    changes: Changes = {}
+    skipped: Set[Tuple[str, UUID]] = set()
+    for action, objects in (("create", new), ("update", dirty), ("delete", deleted)):
+        for obj in objects:
+            table = SYNC_TABLES.get(getattr(obj, "__tablename__", ""))
+            if table is None:
+                continue
+            entity_type, column = table
+            entity_id = getattr(obj, column, None)
+            if entity_id is None:
+                continue
+            key = (entity_type, entity_id)
+            if column == "id":
+                if deleted_users and _owner_ids(obj) & deleted_users:
+                    skipped.add(key)
+                # The entity itself: its action wins over the ones of its children
+                changes[key] = (action, getattr(obj, "user_id", None), True)
+            elif key not in changes:
+                changes[key] = ("update", None, False)
+    for key in skipped:
+        del changes[key]
+    return changes
+
+
+def write_sync_log(connection: Connection, changes: Changes, deleted_users: Set[UUID] = frozenset()) -> None:
+    """
+    Insert one SyncLog row per change, looking up the unknown owners. The
+    changes of the entities of the deleted users are not logged.
+    """
+    if not changes:
+        return
+    unknown: Dict[str, Set[UUID]] = defaultdict(set)
+    for (entity_type, entity_id), (_, _, owner_known) in changes.items():
+        if not owner_known:
+            unknown[entity_type].add(entity_id)
+    owners = {
+        (entity_type, entity_id): user_id
+        for entity_type, entity_ids in unknown.items()
+        for entity_id, user_id in _owners(connection, entity_type, entity_ids).items()
+    }
+
+    now = _utcnow()
+    rows = []
+    for (entity_type, entity_id), (action, user_id, owner_known) in changes.items():
+        if not owner_known:
+            user_id = owners.get((entity_type, entity_id))
+        if user_id in deleted_users:
+            # Its log rows are deleted with it, and must never become shared
+            continue
+        rows.append({
+            "id": uuid4(),
+            "timestamp": now,
+            "entity_type": entity_type,
+            "entity_id": entity_id,
+            "action": action,
+            "user_id": user_id,
+        })
+    if not rows:
+        return
+    statement = insert(SyncLog.__table__)
+    if _is_postgres(connection):
+        statement = statement.values(txid=func.txid_current())
+    connection.execute(statement, rows)
+
+
+def record_sync_changes(session: Session, entity_type: str, entity_ids: Iterable[UUID], action: str = "update") -> None:
+    """
+    Log changes made with bulk statements (insert()/update()/delete()),
+    which the flush events do not see. Call it before the commit.
+    """
+    changes = {(entity_type, entity_id): (action, None, False) for entity_id in entity_ids}
+    write_sync_log(session.connection(), changes)
+
+
+@event.listens_for(Session, "after_flush")
+def _log_after_flush(session: Session, flush_context) -> None:
+    # new, dirty and deleted still describe the flushed objects here
+    dirty = [obj for obj in session.dirty if session.is_modified(obj, include_collections=False)]
+    deleted_users = {obj.id for obj in session.deleted if isinstance(obj, User)}
+    changes = collect_changes(session.new, dirty, session.deleted, deleted_users)
+    if changes:
+        write_sync_log(session.connection(), changes, deleted_users)
+
+
+@dataclass(frozen=True)
+class Cursor:
+    txid: int
+    timestamp: datetime
+    id: UUID
+
+    def encode(self) -> str:
+        raw = f"{self.txid}|{self.timestamp.isoformat()}|{self.id}".encode("ascii")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    @classmethod
+    def decode(cls, value: str) -> "Cursor":
+        """Raises ValueError when the cursor is malformed."""
+        try:
+            raw = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)).decode("ascii")
+            parts = raw.split("|")
+            if len(parts) == 2:
+                # Cursor issued before the txid column: its rows all have txid 0
+                parts.insert(0, "0")
+            txid, timestamp, entity_id = parts
+            return cls(txid=int(txid), timestamp=datetime.fromisoformat(timestamp), id=UUID(entity_id))
+        except (ValueError, UnicodeDecodeError) as e:
+            raise ValueError("Invalid cursor") from e
+
+
+START_CURSOR = Cursor(0, datetime(1970, 1, 1), UUID(int=0))
+
+
+@dataclass
+class ChangeSet:
+    # (entity type, entity id, action, timestamp of the last change)
+    changes: List[Tuple[str, UUID, str, datetime]]
+    cursor: Cursor
+    has_more: bool
+
+
+def compact_changes(rows: Iterable[Tuple[str, UUID, str, datetime]]) -> List[Tuple[str, UUID, str, datetime]]:
+    """
+    One change per entity, from log rows in order: "delete" when the last
+    action is a delete, "create" when the entity was created, else "update".
+    Entities created and deleted in the same rows are left out.
+    """
+    first: Dict[Tuple[str, UUID], str] = {}
+    last: Dict[Tuple[str, UUID], Tuple[str, datetime]] = {}
+    for entity_type, entity_id, action, timestamp in rows:
+        key = (entity_type, entity_id)
+        first.setdefault(key, action)
+        last[key] = (action, timestamp)
+
+    changes = []
+    for key, (action, timestamp) in last.items():
+        created = first[key] == "create"
+        if action == "delete":
+            if created:
+                continue
+        elif created:
+            action = "create"
+        else:
+            action = "update"
+        changes.append((key[0], key[1], action, timestamp))
+    changes.sort(key=lambda change: change[3])
+    return changes
+
+
+def _settled(session: Session) -> ColumnElement[bool]:
+    """
+    The rows whose transaction ended before every transaction still running.
+
+    A row is stamped at the flush but visible at the commit, and a long
+    transaction (a pictogram sync) commits rows older than the ones read
+    meanwhile: a cursor passing them would skip them. The transactions below
+    the xmin of the snapshot are all over and the ones starting later get a
+    higher txid, so the rows read are never followed by lower ones. A running
+    transaction holds back the newer rows until it ends.
+    Without PostgreSQL the writes are serialized and every row is settled.
+    """
+    if not _is_postgres(session.connection()):
+        return true()
+    return SyncLog.txid < func.txid_snapshot_xmin(func.txid_current_snapshot())
+
+
+def latest_cursor(session: Session) -> Cursor:
+    """Cursor of the last settled row, to start syncing after a full download."""
+    row = session.execute(
+        select(SyncLog.txid, SyncLog.timestamp, SyncLog.id)
+        .where(_settled(session))
+        .order_by(SyncLog.txid.desc(), SyncLog.timestamp.desc(), SyncLog.id.desc())
+        .limit(1)
+    ).first()
+    return Cursor(*row) if row else START_CURSOR
+
+
+def get_changes(session: Session, since: Cursor, user_id: Optional[UUID], limit: int) -> ChangeSet:
+    """
+    Compacted changes after a cursor, visible to a user (the shared ones and
+    the ones of the entities they own). The rows of the transactions that
+    may still be running are left for a next call, see _settled.
+    """
+    visible = SyncLog.user_id.is_(None) if user_id is None else or_(SyncLog.user_id.is_(None), SyncLog.user_id == user_id)
+    rows = session.execute(
+        select(SyncLog.entity_type, SyncLog.entity_id, SyncLog.action, SyncLog.timestamp, SyncLog.id, SyncLog.txid)
+        .where(
+            or_(
+                SyncLog.txid > since.txid,
+                and_(SyncLog.txid == since.txid, SyncLog.timestamp > since.timestamp),
+                and_(SyncLog.txid == since.txid, SyncLog.timestamp == since.timestamp, SyncLog.id > since.id),
+            ),
+            _settled(session),
+            visible,
+        )
+        .order_by(SyncLog.txid, SyncLog.timestamp, SyncLog.id)
+        .limit(limit + 1)
+    ).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    cursor = Cursor(rows[-1].txid, rows[-1].timestamp, rows[-1].id) if rows else since
+    changes = compact_changes((row.entity_type, row.entity_id, row.action, row.timestamp) for row in rows)
+    return ChangeSet(changes=changes, cursor=cursor, has_more=has_more)
@@ -1,10 +1,39 @@
+from functools import lru_cache
+
+from app.services.lemmas import lemma_tables
+
+LINGUE_SUPPORTATE = ("en", "it", "de", "fr", "es")
+
+
+@lru_cache(maxsize=None)
+def _inflect_engine():
+    # Creato una sola volta: la costruzione dell'engine è lenta
+    import inflect
+    return inflect.engine()
+
+
 def to_singolare(parola, lingua):
+    """
+    Forma base di una parola: singolare per i nomi, infinito per i verbi.
+
+    La parola viene cercata nelle tabelle dei lemmi (app/services/lemmas.py),
+    costruite dal lessico dei pittogrammi: il risultato è quindi il nome esatto
+    di un pittogramma. Le parole che non sono nelle tabelle passano per le
+    regole semplificate.
+    """
     lingua = lingua.lower()
-    
+    if lingua not in LINGUE_SUPPORTATE:
+        return "Lingua non supportata"
+
+    lemma = lemma_tables.lemma(parola, lingua)
+    if lemma is not None:
+        return lemma
+    return _regole(parola, lingua)
+
+
+def _regole(parola, lingua):
     if lingua == "en":
-        import inflect
-        p = inflect.engine()
-        risultato = p.singular_noun(parola)
+        risultato = _inflect_engine().singular_noun(parola)
         return risultato if risultato else parola
         
     elif lingua == "it":
@@ -1,17 +1,105 @@
-import os
-from openai import OpenAI
-import json
+import copy
 import re
-import os
-from app.core.config import Settings
+from app.core.cache import TTLCache
+from app.core.config import Settings, settings
+from app.core.llm_clients import llm_clients
+from app.core.log import get_logger
+from app.services.circuit_breaker import get_breaker, is_error_payload
+from app.services.local_tokenizer import local_tokenizer
+from app.services.prompts import PromptTemplate, prompt_registry
+from app.services.single_flight import llm_single_flight
+
+logger = get_logger(__name__)
 
 api_key = Settings().API_KEY
 
+SUPPORTED_LANGUAGES = ["it", "en", "es", "fr", "de"]
+
+# Coppie "chiave: valore" della mappatura e specificazioni di occorrenza
+MAPPING_PAIR = re.compile(r'([^:]+):\s*(.*?)(?:\n|$)')
+OCCURRENCE = re.compile(r'\s*\([^)]*\)')
+
+# Risultati già calcolati, per sequenza di pittogrammi e lingua: una frase
+# salvata viene ricostruita senza chiamare di nuovo OpenAI
+phrase_cache: TTLCache = TTLCache(
+    maxsize=settings.PHRASE_CACHE_MAX_SIZE,
+    ttl=settings.PHRASE_CACHE_TTL_SECONDS,
+    name="phrase"
+)
+
+
+# Client OpenAI condivisi dell'applicazione (pool di connessioni)
+def _get_client():
+    return llm_clients.client(api_key)
+
+
+def _get_async_client():
+    return llm_clients.async_client(api_key)
+
+
+def _check_language(language):
+    if language not in SUPPORTED_LANGUAGES:
+        supported = ", ".join(SUPPORTED_LANGUAGES)
+        raise ValueError(f"Lingua '{language}' non supportata. Lingue supportate: {supported}")
+
+
+def _messages(prompt, sentence):
+    return [
+        {"role": "system", "content": prompt.system},
+        {"role": "user", "content": sentence}
+    ]
+
+
+def _failed(error):
+    # Da chiamare nel blocco except: il traceback finisce nel log
+    logger.exception("phrase llm call failed")
+    return {"error": str(error)}
+
+
+def _complete(prompt, sentence):
+    try:
+        completion = _get_client().chat.completions.create(
+            model=settings.LLM_PHRASE_MODEL,
+            temperature=0.2,
+            messages=_messages(prompt, sentence)
+        )
+        return _parse_response(completion.choices[0].message.content, sentence, prompt)
+    except Exception as e:
+        return _failed(e)
+
+
+async def _acomplete(prompt, sentence):
+    try:
+        completion = await _get_async_client().chat.completions.create(
+            model=settings.LLM_PHRASE_MODEL,
+            temperature=0.2,
+            messages=_messages(prompt, sentence)
+        )
+        return _parse_response(completion.choices[0].message.content, sentence, prompt)
+    except Exception as e:
+        return _failed(e)
+
+
+def _memoize(key, result):
+    # Gli errori e le risposte non riconosciute (frase o mappatura vuota)
+    # non vengono memorizzati: la prossima richiesta riprova
+    if not is_error_payload(result) and result.get("converted_sentence") and result.get("mapping"):
+        phrase_cache.set(key, copy.deepcopy(result))
+    return result
+
+
+def _cached(key):
+    result = phrase_cache.get(key)
+    return copy.deepcopy(result) if result is not None else None
 
 
 def token_2_phrase( sentence, language="it"):
     """
     Corregge una frase incompleta e fornisce la mappatura invertita tra frase corretta e originale.
+
+    Le richieste identiche e contemporanee condividono una sola chiamata a OpenAI.
+    Se OpenAI non risponde (circuito aperto) la frase viene restituita invariata,
+    con ogni parola mappata su se stessa.
     
     Args:
         sentence (str): Frase incompleta da correggere
@@ -21,11 +109,56 @@ def token_2_phrase( sentence, language="it"):
         dict: Un dizionario con frase originale, frase corretta e mappatura invertita
     """
     # Verifica che la lingua sia supportata
-    SUPPORTED_LANGUAGES = ["it", "en", "es", "fr", "de"]
-    if language not in SUPPORTED_LANGUAGES:
-        supported = ", ".join(SUPPORTED_LANGUAGES)
-        raise ValueError(f"Lingua '{language}' non supportata. Lingue supportate: {supported}")
-    
+    _check_language(language)
+
+    prompt = prompt_registry.get("token_2_phrase", language)
+    key = ("token_2_phrase", language, prompt.hash, sentence)
+    cached = _cached(key)
+    if cached is not None:
+        return cached
+
+    return get_breaker("token_2_phrase").call(
+        lambda: llm_single_flight.do(
+            key,
+            lambda: _memoize(key, _complete(prompt, sentence))
+        ),
+        lambda: _token_2_phrase_fallback(sentence)
+    )
+
+
+async def atoken_2_phrase(sentence, language="it"):
+    """
+    Versione asincrona di token_2_phrase, da usare nelle route async: la
+    chiamata a OpenAI non occupa un thread del pool.
+    """
+    _check_language(language)
+
+    prompt = prompt_registry.get("token_2_phrase", language)
+    key = ("token_2_phrase", language, prompt.hash, sentence)
+    cached = _cached(key)
+    if cached is not None:
+        return cached
+
+    async def fetch():
+        return _memoize(key, await _acomplete(prompt, sentence))
+
+    return await get_breaker("token_2_phrase").acall(
+        lambda: llm_single_flight.do_async(key, fetch),
+        lambda: _token_2_phrase_fallback(sentence)
+    )
+
+
+def _token_2_phrase_fallback(sentence):
+    words = sentence.split()
+    return {
+        "original_sentence": sentence,
+        "converted_sentence": " ".join(words),
+        "mapping": {word: word for word in words}
+    }
+
+
+@prompt_registry.register("token_2_phrase", SUPPORTED_LANGUAGES)
+def _token_2_phrase_prompt(language):
     # Dizionario di traduzioni per i termini utilizzati
     TRANSLATIONS = {
         "it": {  # Italiano
@@ -111,61 +244,51 @@ def token_2_phrase( sentence, language="it"):
     - DO NOT add specifications like "first occurrence" or "second occurrence"
     """
     
-    try:
-        # Inizializza il client OpenAI
-        client = OpenAI(api_key=api_key)
-        
-        # Chiamata API
-        completion = client.chat.completions.create(
-            model="gpt-4",
-            temperature=0.2,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": sentence}
-            ]
-        )
-        
-        # Estrai il contenuto della risposta
-        response_text = completion.choices[0].message.content
-        
-        # Inizializza il risultato
-        result = {
-            "original_sentence": sentence,
-            "converted_sentence": "",
-            "mapping": {}
+    return PromptTemplate(
+        system=system_prompt,
+        patterns={
+            "converted": (f'{re.escape(terms["corrected_phrase"])}:\\s*(.*?)(?:\n|$)', 0),
+            "mapping": (f'{re.escape(terms["mapping"])}:(.*?)(?=```|$)', re.DOTALL),
         }
+    )
+
+
+def _parse_response(response_text, sentence, prompt):
+    # Inizializza il risultato
+    result = {
+        "original_sentence": sentence,
+        "converted_sentence": "",
+        "mapping": {}
+    }
+    
+    # Estrai la frase corretta (o semplificata) con regex
+    converted_match = prompt.patterns["converted"].search(response_text)
+    if converted_match:
+        result["converted_sentence"] = converted_match.group(1).strip()
+    
+    # Estrai la mappatura
+    mapping_section = prompt.patterns["mapping"].search(response_text)
+    if mapping_section:
+        mapping_text = mapping_section.group(1).strip()
         
-        # Estrai la frase corretta con regex
-        corrected_match = re.search(f'{re.escape(terms["corrected_phrase"])}:\\s*(.*?)(?:\n|$)', response_text)
-        if corrected_match:
-            result["converted_sentence"] = corrected_match.group(1).strip()
-        
-        # Estrai la mappatura invertita
-        mapping_section = re.search(f'{re.escape(terms["mapping"])}:(.*?)(?=```|$)', response_text, re.DOTALL)
-        if mapping_section:
-            mapping_text = mapping_section.group(1).strip()
-            # Pattern regex per catturare le coppie chiave-valore
-            mapping_pairs = re.findall(r'([^:]+):\s*(.*?)(?:\n|$)', mapping_text)
-            
-            for key, value in mapping_pairs:
-                key = key.strip()
-                value = value.strip()
-                if key and value:
-                    # Rimuovi eventuali specificazioni di occorrenza
-                    value = re.sub(r'\s*\([^)]*\)', '', value)
-                    result["mapping"][key] = value
-        
-        return result
-        
-    except Exception as e:
-        print(f"Errore durante l'elaborazione: {str(e)}")
-        return {"error": str(e)}
+        for key, value in MAPPING_PAIR.findall(mapping_text):
+            key = key.strip()
+            value = value.strip()
+            if key and value:
+                # Rimuovi eventuali specificazioni di occorrenza
+                value = OCCURRENCE.sub('', value)
+                result["mapping"][key] = value
+    
+    return result
 
 
 def phrase_2_token( sentence, language="it"):
     """
     Semplifica una frase grammaticalmente corretta in una sequenza di token essenziali.
     
+    Se OpenAI non risponde (circuito aperto) la frase viene semplificata con il
+    tokenizer locale basato sul lessico dei pittogrammi.
+
     Args:
         api_key (str): Chiave API OpenAI
         sentence (str): Frase completa e corretta da semplificare
@@ -175,11 +298,52 @@ def phrase_2_token( sentence, language="it"):
         dict: Un dizionario con frase originale, frase semplificata e mappatura
     """
     # Verifica che la lingua sia supportata
-    SUPPORTED_LANGUAGES = ["it", "en", "es", "fr", "de"]
-    if language not in SUPPORTED_LANGUAGES:
-        supported = ", ".join(SUPPORTED_LANGUAGES)
-        raise ValueError(f"Lingua '{language}' non supportata. Lingue supportate: {supported}")
-    
+    _check_language(language)
+
+    prompt = prompt_registry.get("phrase_2_token", language)
+    key = ("phrase_2_token", language, prompt.hash, sentence)
+    cached = _cached(key)
+    if cached is not None:
+        return cached
+
+    return get_breaker("phrase_2_token").call(
+        lambda: _memoize(key, _complete(prompt, sentence)),
+        lambda: _phrase_2_token_fallback(sentence, language)
+    )
+
+
+async def aphrase_2_token(sentence, language="it"):
+    """
+    Versione asincrona di phrase_2_token.
+    """
+    _check_language(language)
+
+    prompt = prompt_registry.get("phrase_2_token", language)
+    key = ("phrase_2_token", language, prompt.hash, sentence)
+    cached = _cached(key)
+    if cached is not None:
+        return cached
+
+    async def fetch():
+        return _memoize(key, await _acomplete(prompt, sentence))
+
+    return await get_breaker("phrase_2_token").acall(
+        fetch,
+        lambda: _phrase_2_token_fallback(sentence, language)
+    )
+
+
+def _phrase_2_token_fallback(sentence, language):
+    tokens = local_tokenizer.tokenize(sentence, language)
+    return {
+        "original_sentence": sentence,
+        "converted_sentence": " ".join(token["token"] for token in tokens),
+        "mapping": {token["origin"]: token["token"] for token in tokens}
+    }
+
+
+@prompt_registry.register("phrase_2_token", SUPPORTED_LANGUAGES)
+def _phrase_2_token_prompt(language):
     # Dizionario di traduzioni per i termini utilizzati
     TRANSLATIONS = {
         "it": {  # Italiano
@@ -266,54 +430,10 @@ def phrase_2_token( sentence, language="it"):
     - DO NOT add specifications like "first occurrence" or "second occurrence"
     """
     
-    try:
-        # Inizializza il client OpenAI
-        client = OpenAI(api_key=api_key)
-        
-        # Chiamata API
-        completion = client.chat.completions.create(
-            model="gpt-4",
-            temperature=0.2,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": sentence}
-            ]
-        )
-        
-        # Estrai il contenuto della risposta
-        response_text = completion.choices[0].message.content
-        
-        # Inizializza il risultato
-        result = {
-            "original_sentence": sentence,
-            "converted_sentence": "",
-            "mapping": {}
+    return PromptTemplate(
+        system=system_prompt,
+        patterns={
+            "converted": (f'{re.escape(terms["simplified_phrase"])}:\\s*(.*?)(?:\n|$)', 0),
+            "mapping": (f'{re.escape(terms["mapping"])}:(.*?)(?=```|$)', re.DOTALL),
         }
-        
-        # Estrai la frase semplificata con regex
-        simplified_match = re.search(f'{re.escape(terms["simplified_phrase"])}:\\s*(.*?)(?:\n|$)', response_text)
-        if simplified_match:
-            result["converted_sentence"] = simplified_match.group(1).strip()
-        
-        # Estrai la mappatura
-        mapping_section = re.search(f'{re.escape(terms["mapping"])}:(.*?)(?=```|$)', response_text, re.DOTALL)
-        if mapping_section:
-            mapping_text = mapping_section.group(1).strip()
-            # Pattern regex per catturare le coppie chiave-valore
-            mapping_pairs = re.findall(r'([^:]+):\s*(.*?)(?:\n|$)', mapping_text)
-            
-            for key, value in mapping_pairs:
-                key = key.strip()
-                value = value.strip()
-                if key and value:
-                    # Rimuovi eventuali specificazioni di occorrenza
-                    value = re.sub(r'\s*\([^)]*\)', '', value)
-                    result["mapping"][key] = value
-        
-        return result
-        
-    except Exception as e:
-        print(f"Errore durante l'elaborazione: {str(e)}")
-        return {"error": str(e)}
-
-
+    )
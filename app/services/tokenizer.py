@@ -1,17 +1,87 @@
 import json
-from openai import OpenAI
-import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 
-class TextTokenizer:
-    def __init__(self, api_key):
-        os.environ["OPENAI_API_KEY"] = api_key
-        # Initialize the client without passing the API key directly
-        self.client = OpenAI()
-        
-        # Prompt base in diverse lingue
-        self.prompts = {
-            "en": {
-                "system": """You are a linguistic analysis assistant that transforms sentences into key tokens. Your task is to analyze the input sentence and extract the main components, transforming them into a structured JSON format.
+from app.core.config import settings
+from app.core.llm_clients import llm_clients
+from app.services.circuit_breaker import get_breaker
+from app.services.local_tokenizer import local_tokenizer
+from app.services.prompts import PromptTemplate, prompt_registry
+from app.services.single_flight import llm_single_flight
+
+# Appended to the system prompt in batched mode
+BATCH_INSTRUCTIONS = """
+
+BATCH MODE: the user message is a JSON array of objects {"index": n, "sentence": "..."}.
+Tokenize every sentence independently with the rules above and return a JSON object
+{"results": [{"index": n, "tokens": [{"origin": "...", "token": "..."}, ...]}, ...]}
+with exactly one entry per input sentence and the same index."""
+
+
+def estimate_tokens(text):
+    """Rough token count of a text (about 4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def pack_batches(items, token_budget, max_items):
+    """
+    Split (index, sentence) items into batches whose estimated size stays
+    within token_budget. A sentence larger than the budget gets its own batch.
+    """
+    batches = []
+    batch = []
+    size = 0
+    for item in items:
+        # Index, quotes and separators of the JSON array
+        cost = estimate_tokens(item[1]) + 8
+        if batch and (size + cost > token_budget or len(batch) >= max_items):
+            batches.append(batch)
+            batch = []
+            size = 0
+        batch.append(item)
+        size += cost
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _valid_tokens(tokens):
+    return isinstance(tokens, list) and all(
+        isinstance(token, dict)
+        and isinstance(token.get("origin"), str)
+        and isinstance(token.get("token"), str)
+        for token in tokens
+    )
+
+
+def parse_batch_response(response_text, indexes):
+    """
+    Extract the valid {index: tokens} results of a batched response.
+    Unknown indexes and malformed token lists are dropped, so that the
+    missing items can be retried.
+    """
+    try:
+        payload = json.loads(response_text)
+    except (TypeError, json.JSONDecodeError):
+        return {}
+    entries = payload.get("results") if isinstance(payload, dict) else payload
+    if not isinstance(entries, list):
+        return {}
+
+    results = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        index = entry.get("index")
+        if isinstance(index, int) and index in indexes and _valid_tokens(entry.get("tokens")):
+            results[index] = entry["tokens"]
+    return results
+
+
+# Prompt base in diverse lingue
+PROMPTS = {
+    "en": {
+        "system": """You are a linguistic analysis assistant that transforms sentences into key tokens. Your task is to analyze the input sentence and extract the main components, transforming them into a structured JSON format.
 
 For each significant element of the sentence:
 1. Identify nouns with their associated articles and adjectives (e.g., "the boy", "the red apple")
@@ -25,10 +95,10 @@ For each identified token, create a JSON object with:
 - "token": the base form or lemma
 
 Return a complete and well-formed JSON array, without additional explanations.""",
-                "user": "Transform this sentence into structured tokens: \"{sentence}\""
-            },
-            "it": {
-                "system": """Sei un assistente specializzato in analisi linguistica che trasforma frasi in token chiave. Il tuo compito è analizzare la frase di input ed estrarre i componenti principali, trasformandoli in un formato strutturato JSON.
+        "user": "Transform this sentence into structured tokens: \"{sentence}\""
+    },
+    "it": {
+        "system": """Sei un assistente specializzato in analisi linguistica che trasforma frasi in token chiave. Il tuo compito è analizzare la frase di input ed estrarre i componenti principali, trasformandoli in un formato strutturato JSON.
 
 Per ogni elemento significativo della frase:
 1. Identifica i sostantivi con i loro articoli e aggettivi associati (es. "il bambino", "la mela rossa")
@@ -42,10 +112,10 @@ Per ogni token identificato, crea un oggetto JSON con:
 - "token": la forma base o lemma
 
 Restituisci un array JSON completo e ben formattato, senza spiegazioni aggiuntive.""",
-                "user": "Trasforma questa frase in token strutturati: \"{sentence}\""
-            },
-            "de": {
-                "system": """Du bist ein Assistent für linguistische Analyse, der Sätze in Schlüssel-Tokens umwandelt. Deine Aufgabe ist es, den Eingabesatz zu analysieren und die Hauptkomponenten zu extrahieren, um sie in ein strukturiertes JSON-Format zu transformieren.
+        "user": "Trasforma questa frase in token strutturati: \"{sentence}\""
+    },
+    "de": {
+        "system": """Du bist ein Assistent für linguistische Analyse, der Sätze in Schlüssel-Tokens umwandelt. Deine Aufgabe ist es, den Eingabesatz zu analysieren und die Hauptkomponenten zu extrahieren, um sie in ein strukturiertes JSON-Format zu transformieren.
 
 Für jedes bedeutsame Element des Satzes:
 1. Identifiziere Substantive mit ihren zugehörigen Artikeln und Adjektiven (z.B. "der Junge", "der rote Apfel")
@@ -59,10 +129,10 @@ Für jeden identifizierten Token erstelle ein JSON-Objekt mit:
 - "token": die Grundform oder das Lemma
 
 Gib ein vollständiges und korrekt formatiertes JSON-Array zurück, ohne zusätzliche Erklärungen.""",
-                "user": "Transformiere diesen Satz in strukturierte Tokens: \"{sentence}\""
-            },
-            "fr": {
-                "system": """Vous êtes un assistant d'analyse linguistique qui transforme les phrases en jetons clés. Votre tâche consiste à analyser la phrase d'entrée et à extraire les composants principaux, en les transformant en un format JSON structuré.
+        "user": "Transformiere diesen Satz in strukturierte Tokens: \"{sentence}\""
+    },
+    "fr": {
+        "system": """Vous êtes un assistant d'analyse linguistique qui transforme les phrases en jetons clés. Votre tâche consiste à analyser la phrase d'entrée et à extraire les composants principaux, en les transformant en un format JSON structuré.
 
 Pour chaque élément significatif de la phrase :
 1. Identifiez les noms avec leurs articles et adjectifs associés (par exemple, "le garçon", "la pomme rouge")
@@ -76,10 +146,10 @@ Pour chaque jeton identifié, créez un objet JSON avec :
 - "token" : la forme de base ou le lemme
 
 Retournez un tableau JSON complet et bien formé, sans explications supplémentaires.""",
-                "user": "Transformez cette phrase en jetons structurés : \"{sentence}\""
-            },
-            "es": {
-                "system": """Eres un asistente de análisis lingüístico que transforma oraciones en tokens clave. Tu tarea es analizar la oración de entrada y extraer los componentes principales, transformándolos en un formato JSON estructurado.
+        "user": "Transformez cette phrase en jetons structurés : \"{sentence}\""
+    },
+    "es": {
+        "system": """Eres un asistente de análisis lingüístico que transforma oraciones en tokens clave. Tu tarea es analizar la oración de entrada y extraer los componentes principales, transformándolos en un formato JSON estructurado.
 
 Para cada elemento significativo de la oración:
 1. Identifica sustantivos con sus artículos y adjetivos asociados (p.ej., "el niño", "la manzana roja")
@@ -93,9 +163,35 @@ Para cada token identificado, crea un objeto JSON con:
 - "token": la forma base o lema
 
 Devuelve un array JSON completo y bien formado, sin explicaciones adicionales.""",
-                "user": "Transforma esta oración en tokens estructurados: \"{sentence}\""
-            }
-        }
+        "user": "Transforma esta oración en tokens estructurados: \"{sentence}\""
+    }
+}
+
+
+def _tokenizer_prompt(language_code, batch=False):
+    # Unknown languages use the English prompt
+    language_data = PROMPTS.get(language_code, PROMPTS["en"])
+    system = language_data["system"] + (BATCH_INSTRUCTIONS if batch else "")
+    return PromptTemplate(system=system, user=language_data["user"])
+
+
+prompt_registry.register("tokenizer", PROMPTS)(_tokenizer_prompt)
+prompt_registry.register("tokenizer_batch", PROMPTS)(lambda language_code: _tokenizer_prompt(language_code, batch=True))
+
+# JSON array of token objects inside a non-JSON response
+JSON_ARRAY = re.compile(r'\[\s*\{.*\}\s*\]', re.DOTALL)
+
+
+def is_token_list(result):
+    # Any other answer (error payload, unexpected JSON) is a failed call
+    return isinstance(result, list)
+
+
+class TextTokenizer:
+    def __init__(self, api_key=None):
+        # Shared application client, its connection pool is reused by all the services
+        self.client = llm_clients.client(api_key)
+        self.prompts = PROMPTS
     
     def tokenize(self, sentence, language_code="en"):
         """
@@ -106,10 +202,25 @@ Devuelve un array JSON completo y bien formado, sin explicaciones adicionales.""
             language_code: ISO language code (en, it, de, fr, es)
             
         Returns:
-            String containing the tokenized result
+            List of {"origin", "token"} dictionaries
         """
-        # Get the prompt for the specified language or default to English
-        language_data = self.prompts.get(language_code, self.prompts["en"])
+        # Identical concurrent requests (e.g. a phrase broadcast to a classroom)
+        # share a single OpenAI call. When OpenAI fails, is too slow or does
+        # not return a list the breaker answers with the local lexicon tokenizer.
+        prompt = prompt_registry.get("tokenizer", language_code)
+        return get_breaker("tokenizer").call(
+            lambda: llm_single_flight.do(
+                ("tokenize", language_code, prompt.hash, sentence),
+                lambda: self._tokenize(sentence, language_code),
+                shareable=is_token_list
+            ),
+            lambda: local_tokenizer.tokenize(sentence, language_code),
+            is_failure=lambda result: not is_token_list(result)
+        )
+
+    def _tokenize(self, sentence, language_code):
+        # Rendered once per language, the system prompt is byte-identical across calls
+        prompt = prompt_registry.get("tokenizer", language_code)
         
         try:
             completion = self.client.chat.completions.create(
@@ -117,8 +228,8 @@ Devuelve un array JSON completo y bien formado, sin explicaciones adicionales.""
                 temperature=0.1,  # Low temperature for more deterministic results
                 response_format={"type": "json_object"},  # Ensure JSON response
                 messages=[
-                    {"role": "system", "content": language_data["system"]},
-                    {"role": "user", "content": language_data["user"].format(sentence=sentence)}
+                    {"role": "system", "content": prompt.system},
+                    {"role": "user", "content": prompt.user.format(sentence=sentence)}
                 ]
             )
             
@@ -133,8 +244,7 @@ Devuelve un array JSON completo y bien formado, sin explicaciones adicionales.""
                 return tokens
             except json.JSONDecodeError:
                 # If response isn't valid JSON, extract JSON array using string manipulation
-                import re
-                json_array = re.search(r'\[\s*\{.*\}\s*\]', response_text, re.DOTALL)
+                json_array = JSON_ARRAY.search(response_text)
                 if json_array:
                     return json.loads(json_array.group(0))
                 return {"error": "Failed to parse response", "raw_response": response_text}
@@ -142,22 +252,76 @@ Devuelve un array JSON completo y bien formado, sin explicaciones adicionales.""
         except Exception as e:
             return {"error": str(e)}
     
-    def tokenize_batch(self, sentences, language_code="en"):
+    def _tokenize_many(self, batch, language_code):
+        # One request for a batch of (index, sentence) items
+        prompt = prompt_registry.get("tokenizer_batch", language_code)
+        
+        try:
+            completion = self.client.chat.completions.create(
+                model="gpt-4o-mini",
+                temperature=0.1,
+                response_format={"type": "json_object"},
+                messages=[
+                    {"role": "system", "content": prompt.system},
+                    {"role": "user", "content": json.dumps(
+                        [{"index": index, "sentence": sentence} for index, sentence in batch],
+                        ensure_ascii=False
+                    )}
+                ]
+            )
+        except Exception as e:
+            return {"error": str(e)}
+        
+        return parse_batch_response(completion.choices[0].message.content, {index for index, _ in batch})
+
+    def _tokenize_batches(self, items, language_code):
+        batches = pack_batches(items, settings.TOKENIZE_BATCH_TOKEN_BUDGET, settings.TOKENIZE_BATCH_MAX_SENTENCES)
+        breaker = get_breaker("tokenizer")
+        
+        def run(batch):
+            # A failed request (or an open circuit) leaves the whole batch to retry
+            return breaker.call(lambda: self._tokenize_many(batch, language_code), lambda: {})
+        
+        results = {}
+        with ThreadPoolExecutor(max_workers=max(1, settings.TOKENIZE_BATCH_CONCURRENCY)) as executor:
+            for batch_results in executor.map(run, batches):
+                results.update(batch_results)
+        return results
+
+    def tokenize_batch(self, sentences, language_code="en", batched=True):
         """
         Tokenize multiple sentences.
         
+        In batched mode many sentences are packed in one request, sized by
+        TOKENIZE_BATCH_TOKEN_BUDGET. The items missing or malformed in the
+        response are retried in new batches, then one by one with tokenize.
+        Duplicated sentences are tokenized once.
+        
         Args:
             sentences: List of sentences to tokenize
             language_code: ISO language code (en, it, de, fr, es)
+            batched: False to make one request per sentence
             
         Returns:
             List of tokenized results
         """
-        results = []
-        for sentence in sentences:
-            results.append({
-                "sentence": sentence,
-                "tokens": self.tokenize(sentence, language_code)
-            })
-        return results
+        unique = list(dict.fromkeys(sentences))
+        tokens = {}
+        
+        if batched:
+            pending = list(enumerate(unique))
+            for _ in range(1 + settings.TOKENIZE_BATCH_RETRIES):
+                if not pending:
+                    break
+                found = self._tokenize_batches(pending, language_code)
+                for index, _ in pending:
+                    if index in found:
+                        tokens[unique[index]] = found[index]
+                pending = [(index, sentence) for index, sentence in pending if index not in found]
+        
+        for sentence in unique:
+            if sentence not in tokens:
+                tokens[sentence] = self.tokenize(sentence, language_code)
+        
+        return [{"sentence": sentence, "tokens": tokens[sentence]} for sentence in sentences]
 
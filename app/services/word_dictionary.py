@@ -0,0 +1,227 @@
+"""
+Compact, memory-mapped form of the spelling dictionaries
+(app/services/dizionari/dizionario_<lang>.txt).
+
+Each text file (one word per line) is compiled into a .dic file next to it,
+on first use or with script/build_dictionaries.py, holding the distinct
+words sorted by their bytes in one blob plus their offsets:
+
+    header   b"PDIC", format version, encoding (0 latin-1, 1 UTF-8), n (uint32 each)
+    offsets  uint32[n+1] start of each word in the blob, plus its end
+    words    the words concatenated, sorted
+
+The words are latin-1 when they all fit, so that one byte is one letter for
+the edit distance. The sorted blob is an implicit trie: the words sharing a
+prefix are a contiguous range, and the children of a prefix are found by
+binary search on the byte that follows it. Membership and prefix
+enumeration are binary searches; similar() walks the trie computing one
+Levenshtein row per node and prunes the branches already too far from the
+word.
+"""
+import mmap
+import os
+import struct
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.log import get_logger
+
+logger = get_logger(__name__)
+
+MAGIC = b"PDIC"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sIII")
+LATIN1, UTF8 = 0, 1
+ENCODINGS = {LATIN1: "latin-1", UTF8: "utf-8"}
+
+DICTIONARY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dizionari")
+
+
+def dictionary_path(text_path: str) -> str:
+    return os.path.splitext(text_path)[0] + ".dic"
+
+
+def compile_dictionary(words: Iterable[str]) -> bytes:
+    words = {word.strip() for word in words} - {""}
+    try:
+        encoded = sorted(word.encode("latin-1") for word in words)
+        encoding = LATIN1
+    except UnicodeEncodeError:
+        encoded = sorted(word.encode("utf-8") for word in words)
+        encoding = UTF8
+
+    offsets = array("I", [0])
+    position = 0
+    for word in encoded:
+        position += len(word)
+        offsets.append(position)
+    return b"".join((
+        HEADER.pack(MAGIC, FORMAT_VERSION, encoding, len(encoded)),
+        offsets.tobytes(),
+        b"".join(encoded),
+    ))
+
+
+def build_dictionary_file(text_path: str) -> str:
+    """Compile a dizionario_<lang>.txt file into its .dic file, returns its path."""
+    with open(text_path, "r", encoding="utf-8") as f:
+        data = compile_dictionary(f)
+    path = dictionary_path(text_path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return path
+
+
+class WordDictionary:
+    """Read-only sorted word list, from a memory map or bytes."""
+
+    def __init__(self, data) -> None:
+        self._buffer = data
+        view = memoryview(data)
+        magic, version, encoding, count = HEADER.unpack_from(view)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("Not a word dictionary, or built by another version")
+        start = HEADER.size
+        self._offsets = view[start:start + 4 * (count + 1)].cast("I")
+        self._words = view[start + 4 * (count + 1):]
+        self._encoding = ENCODINGS[encoding]
+        self._count = count
+
+    @classmethod
+    def open(cls, path: str) -> "WordDictionary":
+        with open(path, "rb") as f:
+            # The map stays valid after the file is closed
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _encode(self, word: str) -> Optional[bytes]:
+        try:
+            return word.encode(self._encoding)
+        except UnicodeEncodeError:
+            return None
+
+    def _word(self, index: int) -> bytes:
+        return bytes(self._words[self._offsets[index]:self._offsets[index + 1]])
+
+    def _lower_bound(self, key: bytes) -> int:
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._word(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def __contains__(self, word: str) -> bool:
+        key = self._encode(word)
+        if not key:
+            return False
+        index = self._lower_bound(key)
+        return index < self._count and self._word(index) == key
+
+    def with_prefix(self, prefix: str, limit: int = 10) -> List[str]:
+        """Up to limit words starting with prefix, in sorted order."""
+        key = self._encode(prefix)
+        if key is None:
+            return []
+        words = []
+        index = self._lower_bound(key)
+        while index < self._count and len(words) < limit:
+            word = self._word(index)
+            if not word.startswith(key):
+                break
+            words.append(word.decode(self._encoding))
+            index += 1
+        return words
+
+    def similar(self, word: str, max_distance: int = 2) -> List[Tuple[str, int]]:
+        """
+        Words within max_distance edits (insertions, deletions,
+        substitutions) of word, as (word, distance) by increasing distance.
+        """
+        key = self._encode(word)
+        if key is None:
+            return []
+        offsets, words, size = self._offsets, self._words, len(key)
+        found: List[Tuple[int, int]] = []
+        # (first word, end of the range, depth, Levenshtein row of the prefix):
+        # the words of the range share their first depth bytes
+        too_far = max_distance + 1
+        stack = [(0, self._count, 0, [min(column, too_far) for column in range(size + 1)])]
+        while stack:
+            low, high, depth, row = stack.pop()
+            if low < high and offsets[low + 1] - offsets[low] == depth:
+                # The prefix itself is a word, sorted first
+                if row[size] <= max_distance:
+                    found.append((low, row[size]))
+                low += 1
+            while low < high:
+                byte = words[offsets[low] + depth]
+                end = self._children_end(low, high, depth, byte)
+                # Only the cells within max_distance of the diagonal can stay
+                # under the bound, the others are left at the bound + 1
+                next_row = [too_far] * (size + 1)
+                first = max(1, depth + 1 - max_distance)
+                if first == 1:
+                    next_row[0] = depth + 1
+                best = next_row[0]
+                for column in range(first, min(size, depth + 1 + max_distance) + 1):
+                    cost = row[column - 1] + (key[column - 1] != byte)
+                    if row[column] < cost:
+                        cost = row[column] + 1
+                    if next_row[column - 1] < cost:
+                        cost = next_row[column - 1] + 1
+                    next_row[column] = cost
+                    if cost < best:
+                        best = cost
+                if best <= max_distance:
+                    stack.append((low, end, depth + 1, next_row))
+                low = end
+        found.sort(key=lambda item: (item[1], item[0]))
+        return [(self._word(index).decode(self._encoding), distance) for index, distance in found]
+
+    def _children_end(self, low: int, high: int, depth: int, byte: int) -> int:
+        # First word of [low, high) whose byte at depth is greater than byte
+        offsets, words = self._offsets, self._words
+        while low < high:
+            middle = (low + high) // 2
+            if words[offsets[middle] + depth] <= byte:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+
+_dictionaries: Dict[str, Optional[WordDictionary]] = {}
+_lock = threading.Lock()
+
+
+def _open_or_build(text_path: str) -> WordDictionary:
+    path = dictionary_path(text_path)
+    try:
+        if os.path.getmtime(path) >= os.path.getmtime(text_path):
+            return WordDictionary.open(path)
+    except (OSError, ValueError):
+        # Missing, or built by another version
+        pass
+    try:
+        return WordDictionary.open(build_dictionary_file(text_path))
+    except OSError as e:
+        logger.warning("dictionary not writable, compiled in memory", path=path, error=str(e))
+    with open(text_path, "r", encoding="utf-8") as f:
+        return WordDictionary(compile_dictionary(f))
+
+
+def load_dictionary(language: str, directory: str = DICTIONARY_DIR) -> Optional[WordDictionary]:
+    """The dictionary of a language, loaded once per process; None when there is none."""
+    text_path = os.path.join(directory, f"dizionario_{language}.txt")
+    with _lock:
+        if text_path not in _dictionaries:
+            _dictionaries[text_path] = _open_or_build(text_path) if os.path.exists(text_path) else None
+        return _dictionaries[text_path]
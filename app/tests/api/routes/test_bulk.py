@@ -0,0 +1,100 @@
+import uuid
+from typing import Dict
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.models import User, PECS, PECSTranslation, FavoritePECS
+
+
+def test_create_nomi_bulk(
+    client: TestClient, superuser_token_headers: Dict[str, str], db: Session
+) -> None:
+    pictogram_id = 900000 + uuid.uuid4().int % 100000
+    data = [
+        {"pictogram_id": pictogram_id, "name": "bulk a", "lang": "it"},
+        {"pictogram_id": pictogram_id, "name": "bulk a", "lang": "it"},
+        {"pictogram_id": pictogram_id, "name": "bulk b", "lang": "it"},
+    ]
+    response = client.post(
+        f"{settings.API_V1_STR}/nomi/bulk",
+        headers=superuser_token_headers,
+        json=data,
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["created"] == 2
+    assert content["skipped"] == 1
+    assert [item["status"] for item in content["results"]] == ["created", "skipped", "created"]
+
+    # Sending the same payload again creates nothing
+    response = client.post(
+        f"{settings.API_V1_STR}/nomi/bulk",
+        headers=superuser_token_headers,
+        json=data,
+    )
+    assert response.json()["created"] == 0
+
+
+def test_add_pecs_translations_bulk(
+    client: TestClient, superuser_token_headers: Dict[str, str], db: Session
+) -> None:
+    pecs = PECS(image_url="https://example.com/bulk.jpg", is_custom=False)
+    db.add(pecs)
+    db.commit()
+    db.refresh(pecs)
+
+    data = [
+        {"pecs_id": str(pecs.id), "language_code": "en", "name": "Bulk"},
+        {"pecs_id": str(pecs.id), "language_code": "en", "name": "Bulk again"},
+        {"pecs_id": str(uuid.uuid4()), "language_code": "en", "name": "Missing"},
+    ]
+    response = client.post(
+        f"{settings.API_V1_STR}/translations/pecs/bulk",
+        headers=superuser_token_headers,
+        json=data,
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert [item["status"] for item in content["results"]] == ["created", "skipped", "failed"]
+
+    translations = db.exec(
+        select(PECSTranslation).where(PECSTranslation.pecs_id == pecs.id)
+    ).all()
+    assert len(translations) == 1
+    assert str(translations[0].id) == content["results"][0]["id"]
+
+
+def test_add_pecs_to_favorites_bulk(
+    client: TestClient, superuser_token_headers: Dict[str, str], db: Session
+) -> None:
+    user = db.exec(select(User).where(User.email == settings.FIRST_SUPERUSER)).first()
+    pecs = PECS(image_url="https://example.com/bulk-favorite.jpg", is_custom=False)
+    db.add(pecs)
+    db.commit()
+    db.refresh(pecs)
+
+    response = client.post(
+        f"{settings.API_V1_STR}/users/{user.id}/favorites/pecs/bulk",
+        headers=superuser_token_headers,
+        json=[str(pecs.id), str(pecs.id), str(uuid.uuid4())],
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert [item["status"] for item in content["results"]] == ["created", "skipped", "failed"]
+    assert db.get(FavoritePECS, (user.id, pecs.id)) is not None
+
+
+def test_bulk_too_many_items(
+    client: TestClient, superuser_token_headers: Dict[str, str]
+) -> None:
+    data = [
+        {"pictogram_id": 1, "name": "too many", "lang": "it"}
+    ] * (settings.BULK_MAX_ITEMS + 1)
+    response = client.post(
+        f"{settings.API_V1_STR}/nomi/bulk",
+        headers=superuser_token_headers,
+        json=data,
+    )
+    assert response.status_code == 413
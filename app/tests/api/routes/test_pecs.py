@@ -135,3 +135,40 @@ def test_delete_pecs(
         headers=superuser_token_headers,
     )
     assert response.status_code == 404
+
+
+def test_get_pecs_not_modified(
+    client: TestClient, superuser_token_headers: Dict[str, str], db: Session
+) -> None:
+    pecs = PECS(
+        image_url="https://example.com/etag.jpg",
+        is_custom=False
+    )
+    db.add(pecs)
+    db.commit()
+    db.refresh(pecs)
+
+    response = client.get(f"{settings.API_V1_STR}/pecs/{pecs.id}")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert "Last-Modified" in response.headers
+    assert response.headers["Cache-Control"].startswith("public")
+
+    response = client.get(
+        f"{settings.API_V1_STR}/pecs/{pecs.id}",
+        headers={"If-None-Match": etag},
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+
+    # Any write to the catalog changes the ETag
+    pecs.name_custom = "Changed"
+    db.add(pecs)
+    db.commit()
+
+    response = client.get(
+        f"{settings.API_V1_STR}/pecs/{pecs.id}",
+        headers={"If-None-Match": etag},
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
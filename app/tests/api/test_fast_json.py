@@ -0,0 +1,56 @@
+import json
+import uuid
+from datetime import datetime
+from typing import List
+
+import pytest
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+
+from app.api.fast_json import fast_json
+from app.core.config import settings
+from app.models import PECS, PECSRead, PECSTranslation, PhraseRead, PhrasePECSRead
+
+
+@pytest.fixture(autouse=True)
+def enabled(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "FAST_JSON_RESPONSES", True)
+
+
+def test_same_json_as_the_response_model() -> None:
+    phrase_id, pecs_id = uuid.uuid4(), uuid.uuid4()
+    phrases = [PhraseRead(
+        id=phrase_id,
+        created_at=datetime(2025, 1, 2, 3, 4, 5),
+        user_id=uuid.uuid4(),
+        pecs_items=[PhrasePECSRead(
+            phrase_id=phrase_id,
+            pecs_id=pecs_id,
+            position=0,
+            pecs_info={"id": pecs_id, "name": "mela", "image_url": "x.png", "language_code": "it"},
+        )],
+    )]
+    response = fast_json(phrases, List[PhraseRead])
+    assert response.media_type == "application/json"
+    assert json.loads(response.body) == jsonable_encoder(phrases)
+
+
+def test_validates_orm_objects_and_keeps_headers() -> None:
+    pecs = PECS(image_url="x.png", created_at=datetime(2025, 1, 1))
+    pecs.translations = [PECSTranslation(pecs_id=pecs.id, language_code="it", name="mela")]
+    sub_response = Response()
+    del sub_response.headers["content-length"]
+    sub_response.headers["ETag"] = 'W/"pecs-3"'
+
+    response = fast_json([pecs], List[PECSRead], sub_response)
+    body = json.loads(response.body)
+    assert body[0]["id"] == str(pecs.id)
+    assert body[0]["translations"][0]["name"] == "mela"
+    assert response.headers["etag"] == 'W/"pecs-3"'
+    assert response.headers["content-length"] == str(len(response.body))
+
+
+def test_disabled(monkeypatch) -> None:
+    monkeypatch.setattr(settings, "FAST_JSON_RESPONSES", False)
+    content = [{"a": 1}]
+    assert fast_json(content, List[dict]) is content
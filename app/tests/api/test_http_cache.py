@@ -0,0 +1,58 @@
+import uuid
+from typing import Iterator
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.api.deps import get_db
+from app.api.routes import pecs
+from app.core.config import settings
+from app.models import PECS, PECSTranslation
+
+# Fixtures engine and session: a SQLite database with every table
+pytest_plugins = ["app.tests.utils.db"]
+
+
+@pytest.fixture
+def client(engine) -> Iterator[TestClient]:
+    app = FastAPI()
+    app.include_router(pecs.router, prefix=settings.API_V1_STR)
+
+    def session() -> Iterator[Session]:
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_db] = session
+    yield TestClient(app)
+
+
+def add_pecs(engine) -> PECS:
+    with Session(engine, expire_on_commit=False) as session:
+        item = PECS(image_url="1.png")
+        session.add_all([item, PECSTranslation(pecs_id=item.id, language_code="it", name="mela")])
+        session.commit()
+        return item
+
+
+def test_item_not_modified(engine, client: TestClient) -> None:
+    item = add_pecs(engine)
+    url = f"{settings.API_V1_STR}/pecs/{item.id}"
+    etag = client.get(url).headers["etag"]
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_unknown_item_is_not_found_with_the_catalog_etag(engine, client: TestClient) -> None:
+    item = add_pecs(engine)
+    etag = client.get(f"{settings.API_V1_STR}/pecs/{item.id}").headers["etag"]
+
+    response = client.get(f"{settings.API_V1_STR}/pecs/{uuid.uuid4()}", headers={"If-None-Match": etag})
+    assert response.status_code == 404
+
+
+def test_invalid_item_id_is_a_validation_error(client: TestClient) -> None:
+    response = client.get(f"{settings.API_V1_STR}/pecs/not-a-uuid", headers={"If-None-Match": "*"})
+    assert response.status_code == 422
@@ -0,0 +1,76 @@
+from typing import Iterator
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.api.deps import get_db
+from app.api.routes import phrases
+from app.core.config import settings
+from app.models import (
+    PECS,
+    Phrase,
+    PhrasePECS,
+    PhraseTranslation,
+    PECSTranslation,
+    User,
+)
+from app.tests.utils.queries import assert_max_queries
+
+# Fixtures engine and session: a SQLite database with every table
+pytest_plugins = ["app.tests.utils.db"]
+
+
+@pytest.fixture(autouse=True)
+def no_snapshot_builds(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "SNAPSHOT_AUTO_BUILD", False)
+
+
+@pytest.fixture
+def client(engine) -> Iterator[TestClient]:
+    app = FastAPI()
+    app.include_router(phrases.router, prefix=settings.API_V1_STR)
+
+    def session() -> Iterator[Session]:
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_db] = session
+    yield TestClient(app)
+
+
+def add_phrase(engine, pictograms: int) -> Phrase:
+    with Session(engine, expire_on_commit=False) as session:
+        user = User(email="a@b.com", hashed_password="x")
+        phrase = Phrase(user_id=user.id)
+        session.add_all([user, phrase, PhraseTranslation(phrase_id=phrase.id, language_code="it", text="io mangio")])
+        for position in range(pictograms):
+            pecs = PECS(image_url=f"{position}.png")
+            session.add_all([
+                pecs,
+                PECSTranslation(pecs_id=pecs.id, language_code="it", name=f"parola {position}"),
+                PhrasePECS(phrase_id=phrase.id, pecs_id=pecs.id, position=position),
+            ])
+        session.commit()
+        return phrase
+
+
+def test_get_phrase_budget(engine, client: TestClient) -> None:
+    phrase = add_phrase(engine, pictograms=5)
+    # Phrase, translations and items, then a PECS and its translations per
+    # item: the budget keeps the per-item loads from growing
+    with assert_max_queries(3 + 2 * 5):
+        response = client.get(f"{settings.API_V1_STR}/phrases/{phrase.id}")
+    assert response.status_code == 200
+    assert len(response.json()["pecs_items"]) == 5
+
+
+def test_over_budget_lists_the_repeated_statements(engine, client: TestClient) -> None:
+    phrase = add_phrase(engine, pictograms=5)
+    with pytest.raises(AssertionError) as error:
+        with assert_max_queries(5):
+            client.get(f"{settings.API_V1_STR}/phrases/{phrase.id}")
+    message = str(error.value)
+    assert "over the budget of 5" in message
+    assert "5x SELECT pecs." in message
@@ -0,0 +1,47 @@
+from app.core.cache import TTLCache
+
+
+class FakeTimer:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_get_set_and_expiry() -> None:
+    timer = FakeTimer()
+    cache: TTLCache[str, int] = TTLCache(maxsize=10, ttl=5, timer=timer)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    timer.now = 5
+    assert cache.get("a") is None
+    assert cache.hits == 1
+    assert cache.misses == 1
+    assert len(cache) == 0
+
+
+def test_evicts_least_recently_used() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_discard_where() -> None:
+    cache: TTLCache[tuple[str, int], str] = TTLCache(maxsize=10, ttl=60)
+    cache.set(("user-1", 1), "x")
+    cache.set(("user-1", 2), "y")
+    cache.set(("user-2", 1), "z")
+    assert cache.discard_where(lambda key, value: key[0] == "user-1") == 2
+    assert len(cache) == 1
+
+
+def test_disabled_cache_stores_nothing() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=10, ttl=0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
@@ -0,0 +1,75 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core.compression import CompressionMiddleware, choose_encoding, compression_stats
+from app.core.config import settings
+
+BODY = b'{"image_url": "https://api.arasaac.org/v1/pictograms/2239"}' * 100
+
+
+@pytest.fixture
+def client() -> TestClient:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware)
+
+    @app.get("/json")
+    def json_body() -> Response:
+        return Response(BODY, media_type="application/json", headers={"ETag": '"v1"'})
+
+    @app.get("/small")
+    def small_body() -> Response:
+        return Response(b"{}", media_type="application/json")
+
+    @app.get("/image")
+    def image_body() -> Response:
+        return Response(BODY, media_type="image/png")
+
+    @app.get("/stream")
+    def stream_body() -> StreamingResponse:
+        return StreamingResponse(iter([BODY, BODY]), media_type="application/json")
+
+    return TestClient(app)
+
+
+def test_choose_encoding() -> None:
+    available = ["br", "zstd", "gzip"]
+    assert choose_encoding("gzip, deflate, br", available) == "br"
+    assert choose_encoding("gzip;q=1.0, br;q=0.5", available) == "gzip"
+    assert choose_encoding("br;q=0, gzip", available) == "gzip"
+    assert choose_encoding("*", available) == "br"
+    assert choose_encoding("identity", available) is None
+    assert choose_encoding("", available) is None
+
+
+def test_compresses_json(client: TestClient) -> None:
+    before = {stats["encoding"]: stats["responses"] for stats in compression_stats.snapshot()}
+    response = client.get("/json", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == 'W/"v1"'
+    # Decoded by the client
+    assert response.content == BODY
+    assert int(response.headers["content-length"]) < len(BODY) / 5
+
+    stats = {stats["encoding"]: stats for stats in compression_stats.snapshot()}
+    assert stats["gzip"]["responses"] == before.get("gzip", 0) + 1
+    assert stats["gzip"]["uncompressed_bytes"] >= len(BODY)
+
+
+def test_passes_through(client: TestClient) -> None:
+    for path in ("/small", "/image", "/stream"):
+        response = client.get(path, headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+    assert client.get("/stream", headers={"Accept-Encoding": "gzip"}).content == BODY * 2
+    assert "content-encoding" not in client.get("/json", headers={"Accept-Encoding": "identity"}).headers
+
+
+def test_large_bodies_compressed_in_a_thread(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "COMPRESSION_THREAD_MIN_SIZE", 1024)
+    with client.stream("GET", "/json", headers={"Accept-Encoding": "gzip"}) as response:
+        raw = b"".join(response.iter_raw())
+    assert gzip.decompress(raw) == BODY
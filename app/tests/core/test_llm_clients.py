@@ -0,0 +1,66 @@
+import asyncio
+from collections.abc import Iterator
+
+import pytest
+
+from app.core.llm_clients import LLMClients
+from app.core.metrics import llm_tokens
+from app.tests.utils.openai_stub import OpenAIStub, canned_responder
+
+
+@pytest.fixture
+def stub() -> Iterator[OpenAIStub]:
+    with OpenAIStub() as server:
+        yield server
+
+
+def ask(client, text: str) -> str:
+    completion = client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[{"role": "user", "content": text}],
+    )
+    return completion.choices[0].message.content
+
+
+def test_sync_client_is_shared_and_reuses_connections(stub: OpenAIStub) -> None:
+    clients = LLMClients(base_url=stub.base_url)
+    assert clients.client("sk-test") is clients.client("sk-test")
+
+    for i in range(10):
+        assert str(i) in ask(clients.client("sk-test"), f"frase {i}")
+
+    assert stub.requests == 10
+    assert stub.connections == 1
+    asyncio.run(clients.aclose())
+
+
+def test_async_client_reuses_connections_and_closes(stub: OpenAIStub) -> None:
+    clients = LLMClients(base_url=stub.base_url)
+
+    async def main() -> None:
+        client = clients.async_client("sk-test")
+        for i in range(10):
+            completion = await client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": f"frase {i}"}],
+            )
+            assert str(i) in completion.choices[0].message.content
+        await clients.aclose()
+        assert client.is_closed()
+
+    asyncio.run(main())
+    assert stub.requests == 10
+    assert stub.connections == 1
+
+
+def test_canned_responses_and_token_usage() -> None:
+    responder = canned_responder({"mela": "canned mela", "la mela rossa": "canned rossa"})
+    with OpenAIStub(responder=responder) as server:
+        clients = LLMClients(base_url=server.base_url)
+        before = llm_tokens.value("gpt-4o-mini", "prompt")
+        assert ask(clients.client("sk-test"), 'Tokenizza: "la mela rossa"') == "canned rossa"
+        assert ask(clients.client("sk-test"), "una mela") == "canned mela"
+        assert "pera" in ask(clients.client("sk-test"), "pera")
+        # The usage of the responses is counted by the client event hooks
+        assert llm_tokens.value("gpt-4o-mini", "prompt") > before
+        asyncio.run(clients.aclose())
@@ -0,0 +1,117 @@
+import json
+import logging
+import queue
+from logging.handlers import QueueListener
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.log import (
+    JSONFormatter,
+    LogContextMiddleware,
+    _QueueHandler,
+    get_logger,
+    sample_rate,
+)
+
+
+class _Collect(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.records = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(record)
+
+
+@pytest.fixture
+def collected():
+    handler = _Collect()
+    logger = logging.getLogger("app.tests.log")
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    yield handler
+    logger.removeHandler(handler)
+
+
+class _Expensive:
+    converted = 0
+
+    def __str__(self) -> str:
+        _Expensive.converted += 1
+        return "expensive"
+
+
+def test_disabled_level_does_not_convert_fields(collected) -> None:
+    logger = get_logger("app.tests.log")
+    _Expensive.converted = 0
+    logger.debug("skipped", value=_Expensive())
+    assert collected.records == [] and _Expensive.converted == 0
+
+    logger.info("kept", value=_Expensive(), count=3)
+    (record,) = collected.records
+    assert _Expensive.converted == 1
+    assert record.getMessage() == "kept"
+    assert record.fields == {"value": "expensive", "count": 3}
+
+
+def test_json_formatter(collected) -> None:
+    logger = get_logger("app.tests.log")
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("failed", word="casa")
+    entry = json.loads(JSONFormatter().format(collected.records[0]))
+    assert entry["level"] == "error"
+    assert entry["event"] == "failed"
+    assert entry["word"] == "casa"
+    assert "ValueError: boom" in entry["exception"]
+
+
+def test_queue_handler_writes_from_the_listener_thread() -> None:
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    output = _Collect()
+    listener = QueueListener(records, output)
+    logger = logging.getLogger("app.tests.queue")
+    handler = _QueueHandler(records)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    listener.start()
+    try:
+        get_logger("app.tests.queue").info("queued", n=1)
+    finally:
+        listener.stop()
+        logger.removeHandler(handler)
+    (record,) = output.records
+    assert record.getMessage() == "queued" and record.fields == {"n": 1}
+
+
+def test_sampling_per_route(monkeypatch, collected) -> None:
+    monkeypatch.setattr(settings, "LOG_SAMPLE_RATES", {"/api": 1.0, "/api/noisy": 0.0})
+    assert sample_rate("/api/noisy/x") == 0.0
+    assert sample_rate("/api/other") == 1.0
+    assert sample_rate("/health") == 1.0
+
+    logger = get_logger("app.tests.log")
+    app = FastAPI()
+    app.add_middleware(LogContextMiddleware)
+
+    @app.get("/api/noisy")
+    def noisy() -> dict:
+        logger.info("dropped")
+        logger.warning("always kept")
+        return {}
+
+    @app.get("/api/other")
+    def other() -> dict:
+        logger.info("sampled")
+        return {}
+
+    client = TestClient(app)
+    client.get("/api/noisy")
+    client.get("/api/other")
+    assert [record.getMessage() for record in collected.records] == ["always kept", "sampled"]
+    assert all(len(record.request_id) == 16 for record in collected.records)
+    assert collected.records[0].request_id != collected.records[1].request_id
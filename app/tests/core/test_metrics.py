@@ -0,0 +1,82 @@
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.api.routes import metrics
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import (
+    LLM_EVENT_HOOKS,
+    MetricsMiddleware,
+    http_db_queries,
+    http_llm_duration,
+    llm_tokens,
+    registry,
+)
+
+
+def _openai(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json={
+        "model": "gpt-4o-mini-2024-07-18",
+        "choices": [],
+        "usage": {"prompt_tokens": 120, "completion_tokens": 30},
+    })
+
+
+def test_request_breakdown() -> None:
+    engine = create_engine("sqlite://")
+    llm = httpx.Client(transport=httpx.MockTransport(_openai), event_hooks=LLM_EVENT_HOOKS)
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics-test/items/{item_id}")
+    def item(item_id: int) -> dict:
+        with engine.connect() as connection:
+            for _ in range(3):
+                connection.execute(text("SELECT 1"))
+        llm.post("https://api.openai.com/v1/chat/completions", json={"model": "gpt-test", "messages": []})
+        return {"id": item_id}
+
+    client = TestClient(app)
+    before = http_db_queries.count("/metrics-test/items/{item_id}")
+    client.get("/metrics-test/items/1")
+    client.get("/metrics-test/items/2")
+    client.get("/metrics-test/missing")
+
+    route = "/metrics-test/items/{item_id}"
+    assert http_db_queries.count(route) == before + 2
+    # Both requests ran 3 statements: in the le="5" bucket, not in le="2"
+    output = registry.render()
+    assert f'http_request_db_queries_bucket{{route="{route}",le="2.0"}} 0' in output
+    assert f'http_request_db_queries_bucket{{route="{route}",le="5.0"}} 2' in output
+    assert f'http_request_db_queries_sum{{route="{route}"}} 6' in output
+    assert http_llm_duration.count(route) == 2
+    assert f'http_requests_total{{method="GET",route="{route}",status="200"}} 2' in output
+    assert 'route="unmatched",status="404"' in output
+    assert llm_tokens.value("gpt-test", "prompt") >= 240
+    assert llm_tokens.value("gpt-test", "completion") >= 60
+
+
+def test_cache_hit_rates_exported() -> None:
+    cache = TTLCache(maxsize=10, ttl=60, name="metrics_test")
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("b")
+    output = registry.render()
+    assert 'cache_hits_total{cache="metrics_test"} 1' in output
+    assert 'cache_misses_total{cache="metrics_test"} 1' in output
+    assert "# TYPE cache_hits counter" in output
+
+
+def test_metrics_token(monkeypatch) -> None:
+    app = FastAPI()
+    app.include_router(metrics.router)
+    client = TestClient(app)
+
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scraper-token")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer scraper-token"})
+    assert response.status_code == 200
+    assert "# TYPE http_requests counter" in response.text
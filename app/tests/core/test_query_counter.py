@@ -0,0 +1,52 @@
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.core.query_counter import RepeatedQueryMiddleware, count_queries, statement_shape
+
+
+def test_statement_shape() -> None:
+    assert statement_shape("SELECT * FROM pecs\n WHERE id = 'a''b' AND n > 10") == (
+        "SELECT * FROM pecs WHERE id = ? AND n > ?"
+    )
+    assert statement_shape("SELECT x FROM t WHERE t.id = %(pk_1)s") == statement_shape(
+        "SELECT x FROM t WHERE t.id = %(pk_2)s"
+    )
+    assert statement_shape("SELECT x FROM t WHERE id IN (?, ?, ?)") == "SELECT x FROM t WHERE id IN (...)"
+
+
+def test_count_queries_on_one_engine() -> None:
+    engine, other = create_engine("sqlite://"), create_engine("sqlite://")
+    with count_queries(engine) as queries:
+        with engine.connect() as connection, other.connect() as other_connection:
+            for value in range(3):
+                connection.execute(text(f"SELECT {value}"))
+            other_connection.execute(text("SELECT 1"))
+    assert len(queries) == 3
+    assert queries.repeated() == [("SELECT ?", 3)]
+    assert "3x SELECT ?" in queries.report()
+
+
+def test_middleware_warns_on_repeated_statements(caplog) -> None:
+    engine = create_engine("sqlite://")
+    app = FastAPI()
+    app.add_middleware(RepeatedQueryMiddleware, threshold=3)
+
+    @app.get("/items/{count}")
+    def items(count: int) -> dict:
+        with engine.connect() as connection:
+            for value in range(count):
+                connection.execute(text(f"SELECT {value}"))
+        return {}
+
+    client = TestClient(app)
+    with caplog.at_level(logging.WARNING, logger="app.core.query_counter"):
+        client.get("/items/3")
+        assert caplog.records == []
+        client.get("/items/4")
+    (record,) = caplog.records
+    assert record.getMessage() == "repeated sql statement"
+    assert record.fields["route"] == "/items/{count}"
+    assert record.fields["count"] == 4
@@ -0,0 +1,90 @@
+import gzip
+import json
+import os
+
+import pytest
+from sqlmodel import Session
+
+from app.api.http_cache import parse_byte_range
+from app.core.config import settings
+from app.models import (
+    CategoryTranslation,
+    PECS,
+    PECSCategory,
+    PECSCategoryItem,
+    PECSTranslation,
+    User,
+)
+from app.services.catalog_snapshot import build_snapshot_data, get_snapshot_file, read_manifest, write_snapshot
+
+# Fixtures engine and session: a SQLite database with every table
+pytest_plugins = ["app.tests.utils.db"]
+
+
+@pytest.fixture(autouse=True)
+def snapshot_dir(monkeypatch: pytest.MonkeyPatch, tmp_path) -> None:
+    monkeypatch.setattr(settings, "SNAPSHOT_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "SNAPSHOT_AUTO_BUILD", False)
+
+
+def add_pecs(session: Session, name: str, language: str = "it", **fields) -> PECS:
+    pecs = PECS(image_url=f"{name}.png", **fields)
+    session.add(pecs)
+    session.add(PECSTranslation(pecs_id=pecs.id, language_code=language, name=name))
+    return pecs
+
+
+def test_snapshot_content(session: Session) -> None:
+    apple = add_pecs(session, "mela")
+    add_pecs(session, "apple", language="en")
+    add_pecs(session, "mia mela", is_custom=True, user_id=User(email="a@b.com", hashed_password="x").id)
+    food = PECSCategory(icon="food", color="#fff")
+    session.add(food)
+    session.add(CategoryTranslation(category_id=food.id, language_code="it", name="cibo"))
+    session.add(PECSCategoryItem(pecs_id=apple.id, category_id=food.id))
+    session.commit()
+
+    data = build_snapshot_data(session, "it")
+    # Only the shared PECS of the language
+    assert data["pecs"]["name"] == ["mela"]
+    assert data["pecs"]["id"] == [str(apple.id)]
+    assert data["categories"]["name"] == ["cibo"]
+    assert data["category_items"] == {"pecs_id": [str(apple.id)], "category_id": [str(food.id)]}
+    assert data["catalog_versions"]["pecs"] > 0
+
+
+def test_write_snapshot(session: Session, tmp_path) -> None:
+    add_pecs(session, "mela")
+    session.commit()
+    manifest = write_snapshot(session, "it")
+    snapshot = get_snapshot_file("it", "gzip")
+    assert snapshot.etag == manifest["files"]["gzip"]["etag"]
+    assert snapshot.size == os.path.getsize(snapshot.path)
+    with open(snapshot.path, "rb") as f:
+        assert json.loads(gzip.decompress(f.read()))["pecs"]["name"] == ["mela"]
+
+    # Same catalog, same file
+    assert write_snapshot(session, "it")["files"] == manifest["files"]
+
+    # The previous file is kept for the downloads in progress, the older ones removed
+    for name in ("pera", "uva"):
+        add_pecs(session, name)
+        session.commit()
+        write_snapshot(session, "it")
+    gzip_files = [name for name in os.listdir(tmp_path) if name.endswith(".json.gz")]
+    assert len(gzip_files) == 2
+    assert read_manifest("it")["files"]["gzip"]["file"] in gzip_files
+    assert get_snapshot_file("en", "gzip") is None
+
+
+def test_parse_byte_range() -> None:
+    assert parse_byte_range("bytes=0-9", 100) == (0, 9)
+    assert parse_byte_range("bytes=90-", 100) == (90, 99)
+    assert parse_byte_range("bytes=-10", 100) == (90, 99)
+    assert parse_byte_range("bytes=50-500", 100) == (50, 99)
+    # Served whole
+    assert parse_byte_range("bytes=0-1,5-6", 100) is None
+    assert parse_byte_range("items=0-9", 100) is None
+    assert parse_byte_range("bytes=9-0", 100) is None
+    with pytest.raises(ValueError):
+        parse_byte_range("bytes=100-", 100)
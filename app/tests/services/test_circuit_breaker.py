@@ -0,0 +1,113 @@
+import asyncio
+from pathlib import Path
+
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from app.services.local_tokenizer import LocalTokenizer
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_breaker(clock: FakeClock) -> CircuitBreaker:
+    return CircuitBreaker(
+        "test",
+        failure_rate=0.5,
+        window_size=4,
+        min_calls=4,
+        slow_call_seconds=5.0,
+        open_seconds=30.0,
+        timer=clock,
+    )
+
+
+def fail():
+    raise RuntimeError("openai down")
+
+
+def test_failures_open_the_circuit() -> None:
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+
+    assert breaker.call(lambda: "llm", lambda: "local") == "llm"
+    assert breaker.call(lambda: {"error": "rate limit"}, lambda: "local") == "local"
+    assert breaker.call(fail, lambda: "local") == "local"
+    assert breaker.state == CLOSED
+    assert breaker.call(fail, lambda: "local") == "local"
+    assert breaker.state == OPEN
+
+    # While open the call is not even attempted
+    calls = []
+    assert breaker.call(lambda: calls.append(1), lambda: "local") == "local"
+    assert calls == []
+    snapshot = breaker.snapshot()
+    assert snapshot["rejected"] == 1
+    assert snapshot["opened"] == 1
+    assert snapshot["fallbacks"] == 4
+    assert snapshot["retry_in_seconds"] == 30.0
+
+
+def test_half_open_probe_closes_or_reopens() -> None:
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.call(fail, lambda: None)
+    assert breaker.state == OPEN
+
+    clock.now = 31.0
+    assert breaker.state == HALF_OPEN
+    assert breaker.call(fail, lambda: "local") == "local"
+    assert breaker.state == OPEN
+
+    clock.now = 62.0
+    assert breaker.call(lambda: "llm", lambda: "local") == "llm"
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()["window_calls"] == 0
+
+
+def test_slow_calls_count_as_failures_but_keep_their_result() -> None:
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+
+    def slow():
+        clock.now += 6.0
+        return "llm"
+
+    for _ in range(4):
+        assert breaker.call(slow, lambda: "local") == "llm"
+    assert breaker.state == OPEN
+    assert breaker.snapshot()["slow_calls"] == 4
+
+
+def test_local_tokenizer_matches_the_lexicon(tmp_path: Path) -> None:
+    (tmp_path / "it_pittogrammi.json").write_text(
+        '[{"nome": "bambino"}, {"nome": "mela"}, {"nome": "olio di oliva"}, {"nome": "mangiare"}]',
+        encoding="utf-8",
+    )
+    tokenizer = LocalTokenizer(data_dir=str(tmp_path))
+
+    tokens = tokenizer.tokenize("Il bambino mangia le mele con l'olio di oliva", "it")
+
+    assert [token["token"] for token in tokens] == ["bambino", "mangiare", "mela", "olio di oliva"]
+    assert tokens[-1]["origin"] == "olio di oliva"
+
+
+def test_async_calls_go_through_the_breaker() -> None:
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+
+    async def fail_async():
+        raise RuntimeError("openai down")
+
+    async def ok():
+        return "llm"
+
+    assert asyncio.run(breaker.acall(ok, lambda: "local")) == "llm"
+    for _ in range(3):
+        assert asyncio.run(breaker.acall(fail_async, lambda: "local")) == "local"
+    assert breaker.state == OPEN
+    assert asyncio.run(breaker.acall(ok, lambda: "local")) == "local"
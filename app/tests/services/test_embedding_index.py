@@ -0,0 +1,84 @@
+import uuid
+from pathlib import Path
+
+import pytest
+from sqlmodel import Session
+
+from app.api.routes import analyze
+from app.models import PECS, PECSTranslation, User
+from app.services.embedding_index import EmbeddingIndex, build_index, load_index_items
+
+np = pytest.importorskip("numpy")
+
+# Fixtures engine and session: a SQLite database with every table
+pytest_plugins = ["app.tests.utils.db"]
+
+WORDS = ["macchina", "automobile", "auto", "mela", "frutta", "rossa"]
+VECTORS = np.array([
+    [1.0, 0.1, 0.0],
+    [0.9, 0.2, 0.0],
+    [0.95, 0.0, 0.1],
+    [0.0, 1.0, 0.1],
+    [0.1, 0.9, 0.0],
+    [0.0, 0.3, 1.0],
+], dtype=np.float32)
+
+
+@pytest.fixture
+def index(tmp_path: Path) -> tuple[EmbeddingIndex, dict[str, str]]:
+    ids = {"macchina": str(uuid.uuid4()), "mela rossa": str(uuid.uuid4()), "zzz": str(uuid.uuid4())}
+    indexed = build_index([(pecs_id, name) for name, pecs_id in ids.items()], WORDS, VECTORS, str(tmp_path), "it")
+    # "zzz" has no known word
+    assert indexed == 2
+    return EmbeddingIndex(str(tmp_path)), ids
+
+
+def test_search_finds_names_close_in_meaning(index: tuple[EmbeddingIndex, dict[str, str]]) -> None:
+    semantic_index, ids = index
+
+    matches = semantic_index.search("Automobile", "it", k=2, min_score=0.5)
+
+    assert [match.name for match in matches] == ["macchina"]
+    assert matches[0].pecs_id == ids["macchina"]
+    assert semantic_index.search("frutta", "it", k=1, min_score=0.5)[0].name == "mela rossa"
+    assert semantic_index.search("automobile", "it", min_score=0.5, exclude=[ids["macchina"]]) == []
+
+
+def test_unknown_words_and_languages(index: tuple[EmbeddingIndex, dict[str, str]]) -> None:
+    semantic_index, _ = index
+
+    assert semantic_index.search("xyz", "it") == []
+    assert not semantic_index.available("en")
+    assert semantic_index.search("automobile", "en") == []
+
+
+def add_custom_pecs(session: Session) -> tuple[PECS, PECS]:
+    user = User(email="a@b.com", hashed_password="x")
+    shared = PECS(image_url="macchina.png")
+    custom = PECS(image_url="mia-auto.png", is_custom=True, user_id=user.id)
+    session.add_all([
+        user, shared, custom,
+        PECSTranslation(pecs_id=shared.id, language_code="it", name="macchina"),
+        PECSTranslation(pecs_id=custom.id, language_code="it", name="auto"),
+    ])
+    session.commit()
+    return shared, custom
+
+
+def test_custom_pictograms_are_not_indexed(session: Session) -> None:
+    shared, _ = add_custom_pecs(session)
+
+    assert load_index_items(session, "it") == [(str(shared.id), "macchina")]
+
+
+def test_custom_pictograms_listed_by_an_index_are_not_returned(
+    session: Session, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    shared, custom = add_custom_pecs(session)
+    # An index that lists the custom pictogram anyway
+    build_index([(str(custom.id), "auto"), (str(shared.id), "macchina")], WORDS, VECTORS, str(tmp_path), "it")
+    monkeypatch.setattr(analyze, "semantic_index", EmbeddingIndex(str(tmp_path)))
+
+    # "auto" is the name of the custom pictogram, its closest match
+    assert analyze.find_semantic_pictogram(session, "auto", "auto", "it") is None
+    assert analyze.find_semantic_pictogram(session, "macchina", "macchina", "it")["url"] == "macchina.png"
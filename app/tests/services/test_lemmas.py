@@ -0,0 +1,84 @@
+from pathlib import Path
+
+from app.services.lemmas import LemmaTables, build_lemma_table, write_lemma_file
+from app.services.to_singolare import to_singolare
+
+
+def test_build_lemma_table_keeps_known_forms() -> None:
+    names = {"amico", "mela", "mangiare", "mele scure", "casa", "caso"}
+    dictionary = {"amici", "amichi", "mele", "mangio", "mangia", "mangiamo", "case", "casi"}
+
+    table = build_lemma_table(names, "it", dictionary)
+
+    # Multi-word names are not inflected
+    assert "mele scure" not in table
+    assert table["amico"] == ["amichi", "amici"]
+    assert table["mela"] == ["mele"]
+    assert table["mangiare"] == ["mangia", "mangiamo", "mangio"]
+    # "case" is the plural of casa, not the feminine plural of caso
+    assert "case" in table["casa"]
+    assert table["caso"] == ["casi"]
+
+
+def test_build_lemma_table_prefers_verbs_to_gender_forms() -> None:
+    names = {"mostro", "mostrare", "calmo", "alto", "altare", "amo", "amare"}
+    dictionary = {
+        "mostra", "mostri", "mostrato", "calma", "calmare", "alta", "altari", "altri",
+        "ama", "amari", "amaro", "ami",
+    }
+
+    table = build_lemma_table(names, "it", dictionary)
+
+    # mostra is the present of mostrare, not the feminine of mostro
+    assert table["mostrare"] == ["mostra", "mostrato"]
+    assert table["mostro"] == ["mostri"]
+    # calmare is not a name: calma is left out rather than given to calmo
+    assert table["calmo"] == []
+    # altare is a noun (altari), so alta stays the feminine of alto
+    assert table["alto"] == ["alta"]
+    assert table["altare"] == ["altari"]
+    # amari is the plural of amaro: amare is still a verb
+    assert table["amare"] == ["ama"]
+    # The plurals still come first
+    assert table["amo"] == ["ami"]
+
+
+def test_build_lemma_table_skips_short_and_non_alphabetic_names() -> None:
+    names = {"la", "10", "quale?", "sedia"}
+    dictionary = {"le", "10i", "sedie"}
+
+    table = build_lemma_table(names, "it", dictionary)
+
+    assert table == {"la": [], "sedia": ["sedie"]}
+
+
+def test_lemma_tables_lookup(tmp_path: Path) -> None:
+    write_lemma_file({"mela": ["mele"], "pane": []}, str(tmp_path / "it.tsv"))
+    tables = LemmaTables(lemma_dir=str(tmp_path))
+
+    assert not tables.is_loaded("it")
+    assert tables.lemma("Mele", "it") == "mela"
+    assert tables.lemma("pane", "it") == "pane"
+    assert tables.lemma("pani", "it") is None
+    assert tables.lemma("mele", "en") is None
+
+
+def test_to_singolare_uses_the_bundled_tables() -> None:
+    assert to_singolare("treni", "it") == "treno"
+    assert to_singolare("mele", "it") == "mela"
+    # Base forms present in the lexicon are kept as they are
+    assert to_singolare("pane", "it") == "pane"
+    # Verb forms are not taken for the gender forms of nouns
+    for verb_form, infinitive in [
+        ("mostra", "mostrare"), ("aiuta", "aiutare"), ("nuota", "nuotare"), ("gioca", "giocare"),
+        ("lavora", "lavorare"), ("abbraccia", "abbracciare"), ("ama", "amare"),
+    ]:
+        assert to_singolare(verb_form, "it") == infinitive
+    assert to_singolare("alta", "it") == "alto"
+    assert to_singolare("mice", "en") == "mouse"
+    assert to_singolare("perros", "es") == "perro"
+    # No word list for English and German: the rules apply
+    assert to_singolare("thing", "en") == "thing"
+    assert to_singolare("dass", "de") == "dass"
+    assert to_singolare("une", "fr") == "une"
+    assert to_singolare("treni", "xx") == "Lingua non supportata"
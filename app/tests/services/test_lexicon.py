@@ -0,0 +1,40 @@
+import json
+import os
+
+from app.services.lexicon import Lexicon, compile_lexicon, lexicon_path, load_lexicon
+from app.services.pictogram_search import PictogramSearch, find_id_by_name
+
+ITEMS = [
+    {"id": 3, "nome": "nonna"},
+    {"id": 1, "nome": "ape"},
+    {"id": 7, "nome": None},
+    {"id": 2, "nome": "olio di oliva"},
+    {"id": 9, "nome": "ape"},
+    {"id": 4, "nome": "perché"},
+]
+
+
+def test_lookup_matches_the_json() -> None:
+    lexicon = Lexicon(compile_lexicon(ITEMS))
+    assert len(lexicon) == len(ITEMS)
+    # The first entry of the file wins, like the scan of the list
+    for name in ("ape", "nonna", "olio di oliva", "perché"):
+        assert lexicon.find_id(name) == find_id_by_name(name, ITEMS)
+    assert lexicon.find_id("Ape") is None
+    assert lexicon.find_id("") is None
+    assert list(lexicon.items()) == [(item["id"], item["nome"] or "") for item in ITEMS]
+
+
+def test_load_builds_the_file(tmp_path) -> None:
+    json_path = str(tmp_path / "it_pittogrammi.json")
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(ITEMS, f)
+
+    lexicon = load_lexicon(json_path)
+    assert os.path.exists(lexicon_path(json_path))
+    assert load_lexicon(json_path) is lexicon
+    assert find_id_by_name("olio di oliva", lexicon) == 2
+
+    search = PictogramSearch(json_path)
+    assert search.find_similar_word("ape")[0] == ({"id": 1, "nome": "ape"}, 1.0)
+    assert len(load_lexicon(str(tmp_path / "xx_pittogrammi.json"))) == 0
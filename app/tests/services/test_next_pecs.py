@@ -0,0 +1,95 @@
+import time
+import uuid
+
+from app.services.next_pecs import NextPECSIndex, _Successors
+
+I, WANT, EAT, DRINK, APPLE, WATER = (uuid.uuid4() for _ in range(6))
+ALICE, BOB = uuid.uuid4(), uuid.uuid4()
+
+
+def make_index(phrases: list) -> NextPECSIndex:
+    return NextPECSIndex(loader=lambda: list(phrases), refresh_seconds=0)
+
+
+def ids(predictions: list) -> list:
+    return [prediction.pecs_id for prediction in predictions]
+
+
+def test_successors_stay_sorted() -> None:
+    successors = _Successors()
+    for pecs in (1, 2, 2, 3, 3, 3):
+        successors.add(pecs, 1)
+    assert list(successors.ids) == [3, 2, 1]
+    successors.add(3, -3)
+    assert list(successors.ids) == [2, 1]
+    assert successors.total == 3
+    successors.add(7, -1)
+    assert successors.total == 3
+
+
+def test_predicts_from_context() -> None:
+    index = make_index([
+        (uuid.uuid4(), ALICE, [I, WANT, EAT, APPLE]),
+        (uuid.uuid4(), ALICE, [I, WANT, DRINK, WATER]),
+        (uuid.uuid4(), BOB, [I, WANT, DRINK, WATER]),
+    ])
+    assert ids(index.predict([], k=1)) == [I]
+    assert ids(index.predict([I], k=1)) == [WANT]
+    assert ids(index.predict([I, WANT], k=2)) == [DRINK, EAT]
+    assert ids(index.predict([WANT, DRINK], k=1)) == [WATER]
+    scores = [prediction.score for prediction in index.predict([I, WANT], k=5)]
+    assert scores == sorted(scores, reverse=True)
+    assert 0 < sum(scores) <= 1
+
+
+def test_prefers_the_user_habits() -> None:
+    index = make_index([
+        (uuid.uuid4(), ALICE, [WANT, EAT]),
+        (uuid.uuid4(), BOB, [WANT, DRINK]),
+        (uuid.uuid4(), BOB, [WANT, DRINK]),
+    ])
+    assert ids(index.predict([WANT], k=1)) == [DRINK]
+    assert ids(index.predict([WANT], user_id=ALICE, k=1)) == [EAT]
+
+
+def test_incremental_updates() -> None:
+    phrase_id = uuid.uuid4()
+    index = make_index([(phrase_id, ALICE, [WANT, EAT])])
+    assert ids(index.predict([WANT], k=1)) == [EAT]
+
+    index.set_phrase(phrase_id, ALICE, [WANT, DRINK])
+    assert ids(index.predict([WANT], k=1)) == [DRINK]
+
+    index.remove_phrase(phrase_id)
+    assert index.predict([WANT]) == []
+    assert index.predict([]) == []
+
+
+def test_rebuild_keeps_concurrent_writes() -> None:
+    phrases = [(uuid.uuid4(), ALICE, [WANT, EAT])]
+    new_phrase = uuid.uuid4()
+    index = NextPECSIndex(loader=lambda: list(phrases), refresh_seconds=0)
+    index.predict([])
+
+    def slow_loader():
+        # A phrase saved while the rebuild reads the database
+        index.set_phrase(new_phrase, BOB, [WANT, DRINK])
+        return list(phrases)
+
+    index.loader = slow_loader
+    index.rebuild()
+    assert set(ids(index.predict([WANT], k=2))) == {EAT, DRINK}
+
+
+def test_prediction_is_fast() -> None:
+    phrases = [
+        (uuid.uuid4(), ALICE, [uuid.UUID(int=(i * 7 + j) % 500) for j in range(6)])
+        for i in range(5000)
+    ]
+    index = make_index(phrases)
+    previous = phrases[0][2][:2]
+    index.predict(previous)
+    start = time.perf_counter()
+    for _ in range(100):
+        index.predict(previous, user_id=ALICE, k=10)
+    assert (time.perf_counter() - start) / 100 < 0.001
@@ -0,0 +1,69 @@
+import uuid
+from types import SimpleNamespace
+from typing import Iterator
+
+import pytest
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.services import pecs_usage
+from app.services.pecs_usage import get_top_usage, rank_by_usage, record_usage, usage_cache
+
+# Fixtures engine and session: a SQLite database with every table
+pytest_plugins = ["app.tests.utils.db"]
+
+
+@pytest.fixture(autouse=True)
+def clear_usage_cache() -> Iterator[None]:
+    usage_cache.clear()
+    yield
+    usage_cache.clear()
+
+
+def test_record_usage_accumulates(session: Session) -> None:
+    user_id, apple, pear = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    record_usage(session, user_id, [apple, pear, apple])
+    record_usage(session, user_id, [pear], weight=3)
+    session.commit()
+
+    assert get_top_usage(session, user_id) == {apple: 2, pear: 4}
+    assert get_top_usage(session, uuid.uuid4()) == {}
+    assert get_top_usage(session, None) == {}
+
+
+def test_record_usage_updates_cached_top(session: Session, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "PECS_USAGE_TOP_N", 2)
+    user_id = uuid.uuid4()
+    first, second, third = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    record_usage(session, user_id, [first] * 5 + [second] * 3)
+    session.commit()
+    assert get_top_usage(session, user_id) == {first: 5, second: 3}
+
+    # Served from memory, trimmed to the top N
+    record_usage(session, user_id, [third] * 4)
+    session.commit()
+    assert usage_cache.get(user_id) == {first: 5, third: 4}
+
+    usage_cache.clear()
+    assert get_top_usage(session, user_id) == {first: 5, third: 4}
+
+
+def test_rank_by_usage() -> None:
+    def result(score: float) -> dict:
+        return {"pecs": SimpleNamespace(id=uuid.uuid4()), "score": score}
+
+    exact, close, used = result(1.0), result(0.8), result(0.75)
+    results = [exact, close, used]
+
+    assert rank_by_usage(results, {}) is results
+    # The boost of the most used pictogram is PECS_USAGE_BOOST
+    assert rank_by_usage(results, {used["pecs"].id: 10}) == [used, exact, close]
+    # Rarely used pictograms get a smaller boost
+    usage = {used["pecs"].id: 1, uuid.uuid4(): 1000}
+    assert rank_by_usage(results, usage) == [exact, close, used]
+
+
+def test_usage_boost() -> None:
+    assert pecs_usage.usage_boost(0, 10) == 0.0
+    assert pecs_usage.usage_boost(10, 10) == pytest.approx(settings.PECS_USAGE_BOOST)
+    assert 0 < pecs_usage.usage_boost(2, 10) < pecs_usage.usage_boost(5, 10)
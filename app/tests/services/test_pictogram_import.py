@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from app.services.pictogram_import import iter_json_array
+
+ITEMS = [
+    {"id": 1, "nome": "ape"},
+    {"id": 2, "nome": "virgolette \" e graffe { } [ ] , dentro"},
+    {"id": 3, "nome": "barra \\ e unicode è 😀"},
+    12345,
+    -0.5e10,
+    [1, [2, [3, []]], {"a": [4]}],
+    "testo",
+    True,
+    None,
+    {},
+]
+
+
+def write(tmp_path, text: str) -> str:
+    path = tmp_path / "pittogrammi.json"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 1 << 16])
+def test_items_match_json_load(tmp_path, chunk_size: int) -> None:
+    path = write(tmp_path, json.dumps(ITEMS, ensure_ascii=False, indent=2))
+    assert list(iter_json_array(path, chunk_size=chunk_size)) == ITEMS
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 1 << 16])
+def test_numbers_cut_by_the_chunks(tmp_path, chunk_size: int) -> None:
+    path = write(tmp_path, "[123456789,1.25e-3 ,\n-42,0]")
+    assert list(iter_json_array(path, chunk_size=chunk_size)) == [123456789, 1.25e-3, -42, 0]
+
+
+@pytest.mark.parametrize("text", ["[]", " [ ] \n", ""])
+def test_empty(tmp_path, text: str) -> None:
+    assert list(iter_json_array(write(tmp_path, text), chunk_size=1)) == []
+
+
+@pytest.mark.parametrize("text", [
+    '{"id": 1}',
+    "[1, 2",
+    "[1 2]",
+    "[1,,2]",
+    "[,1]",
+    "[1,]",
+    '["non chiusa]',
+    '[{"id": 1]',
+    "[tru]",
+    "[1] 2",
+])
+@pytest.mark.parametrize("chunk_size", [1, 1 << 16])
+def test_malformed_input_is_rejected(tmp_path, text: str, chunk_size: int) -> None:
+    with pytest.raises(ValueError):
+        list(iter_json_array(write(tmp_path, text), chunk_size=chunk_size))
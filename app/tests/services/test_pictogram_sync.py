@@ -0,0 +1,94 @@
+import uuid
+
+from sqlmodel import Session, select
+
+from app.models import PECS, FavoritePECS, Nome, PECSTranslation
+from app.services.pictogram_sync import (
+    ARASAAC_URL_PREFIX,
+    PictogramRecord,
+    compute_content_hash,
+    diff_hashes,
+    external_id_from_url,
+    record_from_item,
+    sync_pictograms,
+)
+
+# Fixtures engine and session: a SQLite database with every table
+pytest_plugins = ["app.tests.utils.db"]
+
+
+def test_content_hash_ignores_category_order() -> None:
+    assert compute_content_hash("mela", ["food", "fruit"]) == compute_content_hash(
+        "mela", ["fruit", "food", "fruit"]
+    )
+    assert compute_content_hash("mela", ["food"]) != compute_content_hash("mele", ["food"])
+    assert compute_content_hash("mela") != compute_content_hash("mela", [])
+
+
+def test_diff_hashes() -> None:
+    incoming = {1: "a", 2: "b", 3: "c"}
+    stored = {2: "b", 3: "old", 4: "d"}
+    plan = diff_hashes(incoming, stored)
+    assert plan.inserts == [1]
+    assert plan.updates == [3]
+    assert plan.deletes == [4]
+    assert plan.unchanged == 1
+    assert not plan.is_empty
+    assert diff_hashes(incoming, dict(incoming)).is_empty
+
+
+def test_diff_hashes_treats_missing_hash_as_changed() -> None:
+    plan = diff_hashes({1: "a"}, {1: None})
+    assert plan.updates == [1]
+
+
+def test_record_from_item() -> None:
+    arasaac = record_from_item(
+        {"_id": 2239, "keywords": [{"keyword": "ape"}], "categories": ["animal"]}
+    )
+    assert arasaac is not None
+    assert (arasaac.external_id, arasaac.name, arasaac.categories) == (2239, "ape", ("animal",))
+
+    lexicon = record_from_item({"id": 2243, "nome": "nonna"})
+    assert lexicon is not None
+    assert lexicon.categories is None
+
+    assert record_from_item({"id": 2243, "nome": ""}) is None
+    assert record_from_item({"_id": 1, "keywords": []}) is None
+
+
+def test_external_id_from_url() -> None:
+    assert external_id_from_url("https://api.arasaac.org/v1/pictograms/2239") == 2239
+    assert external_id_from_url("https://api.arasaac.org/v1/pictograms/2239?download=false") == 2239
+    assert external_id_from_url("https://example.com/image.jpg") is None
+
+
+def add_pictogram(session: Session, external_id: int, *languages: str) -> PECS:
+    pecs = PECS(image_url=f"{ARASAAC_URL_PREFIX}{external_id}")
+    session.add(pecs)
+    for language in languages:
+        session.add(PECSTranslation(pecs_id=pecs.id, language_code=language, name=f"{language}-{external_id}"))
+        session.add(Nome(pictogram_id=external_id, name=f"{language}-{external_id}", lang=language))
+    return pecs
+
+
+def test_missing_pictogram_deletes_only_its_language(session: Session) -> None:
+    translated = add_pictogram(session, 1, "it", "en")
+    favorite = add_pictogram(session, 2, "it")
+    unused = add_pictogram(session, 3, "it")
+    kept = add_pictogram(session, 4, "it")
+    session.add(FavoritePECS(user_id=uuid.uuid4(), pecs_id=favorite.id))
+    session.commit()
+    pecs_ids = [translated.id, favorite.id, unused.id, kept.id]
+
+    record = PictogramRecord(external_id=4, name="it-4")
+    result = sync_pictograms(session, [record], "it")
+
+    assert result.deleted == 3
+    remaining = set(session.exec(select(PECS.id).where(PECS.id.in_(pecs_ids))).all())
+    # The English translation and the favorite keep their PECS, the unused one goes
+    assert remaining == {translated.id, favorite.id, kept.id}
+    translations = session.exec(select(PECSTranslation.pecs_id, PECSTranslation.language_code)).all()
+    assert sorted(translations, key=str) == sorted([(translated.id, "en"), (kept.id, "it")], key=str)
+    names = session.exec(select(Nome.pictogram_id, Nome.lang)).all()
+    assert sorted(names) == [(1, "en"), (4, "it")]
@@ -0,0 +1,54 @@
+import re
+
+from app.services.prompts import PromptRegistry, PromptTemplate
+
+
+def test_prompts_are_rendered_once_and_hashed() -> None:
+    registry = PromptRegistry()
+    renders: list[str] = []
+
+    @registry.register("echo", ["it", "en"])
+    def echo_prompt(language: str) -> PromptTemplate:
+        renders.append(language)
+        return PromptTemplate(
+            system=f"Answer in {language}",
+            user="Sentence: {sentence}",
+            patterns={"answer": (r"Answer:\s*(.*)", re.IGNORECASE)},
+        )
+
+    first = registry.get("echo", "it")
+    assert registry.get("echo", "it") is first
+    assert renders == ["it"]
+
+    other = registry.get("echo", "en")
+    assert other.hash != first.hash
+    assert len(first.hash) == 12
+    assert first.patterns["answer"].search("answer: ciao").group(1) == "ciao"
+    assert {prompt.language for prompt in registry.rendered()} == {"it", "en"}
+
+
+def test_registering_again_drops_the_rendered_prompts() -> None:
+    registry = PromptRegistry()
+    registry.register("echo", ["it"])(lambda language: PromptTemplate(system="v1"))
+    old = registry.get("echo", "it")
+
+    registry.register("echo", ["it"])(lambda language: PromptTemplate(system="v2"))
+
+    assert registry.get("echo", "it").hash != old.hash
+
+
+def test_unsupported_languages_share_the_fallback_prompt() -> None:
+    registry = PromptRegistry()
+    renders: list[str] = []
+
+    @registry.register("echo", ["it", "en"])
+    def echo_prompt(language: str) -> PromptTemplate:
+        renders.append(language)
+        return PromptTemplate(system=f"Answer in {language}")
+
+    fallback = registry.get("echo", "en")
+    for language in ("xx", "en-GB", "a" * 100):
+        assert registry.get("echo", language) is fallback
+
+    assert renders == ["en"]
+    assert len(registry.rendered()) == 1
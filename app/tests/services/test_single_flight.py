@@ -0,0 +1,181 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from app.services.single_flight import SingleFlight
+
+
+def slow_call(counter: list, result: object, delay: float = 0.2):
+    def call():
+        counter.append(1)
+        time.sleep(delay)
+        return result
+    return call
+
+
+@pytest.mark.parametrize("cross_worker", [False, True])
+def test_concurrent_identical_calls_are_coalesced(tmp_path: Path, cross_worker: bool) -> None:
+    flight = SingleFlight(lock_dir=str(tmp_path) if cross_worker else None)
+    counter: list = []
+    call = slow_call(counter, {"tokens": ["mela"]})
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(flight.do, ("tokenize", "it", "mela"), call) for _ in range(8)]
+        results = [future.result() for future in futures]
+
+    assert len(counter) == 1
+    assert all(result == {"tokens": ["mela"]} for result in results)
+    assert flight.coalesced == 7
+
+
+def test_different_keys_are_not_coalesced() -> None:
+    flight = SingleFlight()
+    counter: list = []
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        first = executor.submit(flight.do, "a", slow_call(counter, 1))
+        second = executor.submit(flight.do, "b", slow_call(counter, 2))
+        assert (first.result(), second.result()) == (1, 2)
+
+    assert len(counter) == 2
+
+
+def test_errors_are_shared_with_waiting_callers() -> None:
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def failing_call():
+        started.set()
+        time.sleep(0.2)
+        raise RuntimeError("boom")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(flight.do, "key", failing_call)
+        started.wait()
+        follower = executor.submit(flight.do, "key", failing_call)
+        for future in (leader, follower):
+            with pytest.raises(RuntimeError):
+                future.result()
+
+
+def test_results_are_not_reused_after_the_flight(tmp_path: Path) -> None:
+    flight = SingleFlight(lock_dir=str(tmp_path))
+    counter: list = []
+    call = slow_call(counter, ["x"], delay=0)
+
+    assert flight.do("key", call) == ["x"]
+    assert flight.do("key", call) == ["x"]
+    assert len(counter) == 2
+
+
+def test_workers_share_the_result_of_the_flight(tmp_path: Path) -> None:
+    # Two instances on the same directory stand for two worker processes
+    leader, follower = SingleFlight(lock_dir=str(tmp_path)), SingleFlight(lock_dir=str(tmp_path))
+    counter: list = []
+    call = slow_call(counter, {"tokens": ["mela"]}, delay=0.3)
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        first = executor.submit(leader.do, "key", call)
+        time.sleep(0.1)
+        second = executor.submit(follower.do, "key", call)
+        # A different key is not held back by the running call
+        started = time.monotonic()
+        assert executor.submit(follower.do, "other", slow_call(counter, 1, delay=0)).result() == 1
+        assert time.monotonic() - started < 0.2
+        assert first.result() == second.result() == {"tokens": ["mela"]}
+
+    assert len(counter) == 2
+    assert follower.coalesced == 1
+    assert not list(tmp_path.glob("*.lock"))
+
+
+def test_followers_stop_waiting_after_the_timeout(tmp_path: Path) -> None:
+    leader = SingleFlight(lock_dir=str(tmp_path))
+    follower = SingleFlight(lock_dir=str(tmp_path), wait_timeout=0.1)
+    counter: list = []
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        first = executor.submit(leader.do, "key", slow_call(counter, "slow", delay=0.5))
+        time.sleep(0.05)
+        assert executor.submit(follower.do, "key", slow_call(counter, "own", delay=0)).result() == "own"
+        assert first.result() == "slow"
+
+
+def test_stale_lock_is_broken(tmp_path: Path) -> None:
+    flight = SingleFlight(lock_dir=str(tmp_path), wait_timeout=1)
+    lock_path = tmp_path / f"{flight._digest('key')}.lock"
+    lock_path.write_text("dead")
+    os.utime(lock_path, (time.time() - 10, time.time() - 10))
+
+    assert flight.do("key", lambda: "ran") == "ran"
+    assert not lock_path.exists()
+
+
+def test_error_payloads_are_not_shared_across_workers(tmp_path: Path) -> None:
+    flight = SingleFlight(lock_dir=str(tmp_path))
+    counter: list = []
+    call = slow_call(counter, {"error": "timeout"}, delay=0)
+
+    flight.do("key", call)
+    flight.do("key", call)
+    assert len(counter) == 2
+
+
+def test_async_identical_calls_are_coalesced() -> None:
+    flight = SingleFlight()
+    counter: list = []
+
+    async def call():
+        counter.append(1)
+        await asyncio.sleep(0.05)
+        return {"tokens": ["mela"]}
+
+    async def main():
+        return await asyncio.gather(*(flight.do_async(("tokenize", "it", "mela"), call) for _ in range(8)))
+
+    results = asyncio.run(main())
+
+    assert len(counter) == 1
+    assert all(result == {"tokens": ["mela"]} for result in results)
+    assert flight.coalesced == 7
+
+
+def _async_worker(lock_dir: str, counter_path: str, barrier, results) -> None:
+    flight = SingleFlight(lock_dir=lock_dir)
+
+    async def call():
+        with open(counter_path, "a", encoding="ascii") as f:
+            f.write("1")
+        await asyncio.sleep(0.5)
+        return {"tokens": ["mela"]}
+
+    barrier.wait()
+    results.put(asyncio.run(flight.do_async("key", call)))
+
+
+def test_async_calls_are_coalesced_across_processes(tmp_path: Path) -> None:
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(2)
+    results = context.Queue()
+    counter_path = tmp_path / "counter"
+    counter_path.write_text("")
+    lock_dir = tmp_path / "locks"
+
+    workers = [
+        context.Process(target=_async_worker, args=(str(lock_dir), str(counter_path), barrier, results))
+        for _ in range(2)
+    ]
+    for worker in workers:
+        worker.start()
+    shared = [results.get(timeout=30) for _ in workers]
+    for worker in workers:
+        worker.join(timeout=30)
+
+    assert shared == [{"tokens": ["mela"]}] * 2
+    assert counter_path.read_text() == "1"
@@ -0,0 +1,141 @@
+import base64
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlmodel import Session, select
+
+from app.api.deps import get_current_user, get_db
+from app.api.routes import sync
+from app.core.config import settings
+from app.models import PECS, PECSTranslation, SyncLog, User
+from app.services.sync_log import START_CURSOR, Cursor, compact_changes, get_changes
+
+# Fixtures engine and session: a SQLite database with every table
+pytest_plugins = ["app.tests.utils.db"]
+
+T0 = datetime(2025, 1, 1)
+
+
+def logged(session: Session) -> list:
+    rows = session.exec(select(SyncLog.entity_type, SyncLog.entity_id, SyncLog.action, SyncLog.user_id)).all()
+    return sorted(rows, key=str)
+
+
+def test_flush_writes_one_row_per_entity(session: Session) -> None:
+    owner = uuid.uuid4()
+    pecs = PECS(image_url="x.png", user_id=owner, is_custom=True)
+    session.add(pecs)
+    session.add(PECSTranslation(pecs_id=pecs.id, language_code="it", name="mela"))
+    session.commit()
+    assert logged(session) == [("pictogram", pecs.id, "create", owner)]
+
+    # A child change is an update of the parent, with its owner
+    session.add(PECSTranslation(pecs_id=pecs.id, language_code="en", name="apple"))
+    session.commit()
+    assert ("pictogram", pecs.id, "update", owner) in logged(session)
+
+
+def test_rollback_discards_the_rows(session: Session) -> None:
+    session.add(PECS(image_url="x.png"))
+    session.flush()
+    session.rollback()
+    assert logged(session) == []
+
+
+def test_deleted_user_changes_stay_private(engine, session: Session) -> None:
+    # The database deletes the log rows of the user (ON DELETE CASCADE)
+    session.exec(text("PRAGMA foreign_keys=ON"))
+    alice = User(email="alice@example.com", hashed_password="x")
+    bob = User(email="bob@example.com", hashed_password="x")
+    pecs = PECS(image_url="x.png", user_id=alice.id, is_custom=True)
+    session.add_all([alice, bob, pecs, PECSTranslation(pecs_id=pecs.id, language_code="it", name="mela")])
+    session.commit()
+    bob_id = bob.id
+
+    session.delete(alice)
+    session.commit()
+    # Not one row is left shared for the entities of alice
+    assert logged(session) == []
+
+    app = FastAPI()
+    app.include_router(sync.router, prefix=settings.API_V1_STR)
+
+    def db_session():
+        with Session(engine) as db:
+            yield db
+
+    app.dependency_overrides[get_db] = db_session
+    app.dependency_overrides[get_current_user] = lambda: User(id=bob_id, email="bob@example.com", hashed_password="x")
+    response = TestClient(app).get(f"{settings.API_V1_STR}/sync/changes", params={"since": START_CURSOR.encode()})
+    assert response.status_code == 200
+    assert response.json()["changes"] == []
+
+
+def test_compact_changes() -> None:
+    a, b, c, d = (uuid.uuid4() for _ in range(4))
+    rows = [
+        ("pictogram", a, "create", T0),
+        ("pictogram", a, "update", T0 + timedelta(seconds=1)),
+        ("pictogram", b, "update", T0),
+        ("pictogram", b, "delete", T0 + timedelta(seconds=2)),
+        ("sequence", c, "create", T0),
+        ("sequence", c, "delete", T0 + timedelta(seconds=3)),
+        ("category", d, "update", T0),
+        ("category", d, "update", T0 + timedelta(seconds=4)),
+    ]
+    assert compact_changes(rows) == [
+        ("pictogram", a, "create", T0 + timedelta(seconds=1)),
+        ("pictogram", b, "delete", T0 + timedelta(seconds=2)),
+        ("category", d, "update", T0 + timedelta(seconds=4)),
+    ]
+
+
+def test_get_changes_pages_with_the_cursor(session: Session) -> None:
+    alice, bob = uuid.uuid4(), uuid.uuid4()
+    for index in range(5):
+        session.add(SyncLog(
+            entity_type="sequence", entity_id=uuid.UUID(int=index), action="update",
+            user_id=alice if index % 2 else None, timestamp=T0 + timedelta(seconds=index)
+        ))
+    session.add(SyncLog(entity_type="sequence", entity_id=uuid.uuid4(), action="update", user_id=bob, timestamp=T0))
+    session.commit()
+
+    start = START_CURSOR
+    first = get_changes(session, start, alice, limit=3)
+    assert [change[1] for change in first.changes] == [uuid.UUID(int=i) for i in range(3)]
+    assert first.has_more
+
+    second = get_changes(session, Cursor.decode(first.cursor.encode()), alice, limit=3)
+    assert [change[1] for change in second.changes] == [uuid.UUID(int=3), uuid.UUID(int=4)]
+    assert not second.has_more
+
+    # Bob sees only the shared changes and his own
+    assert len(get_changes(session, start, bob, limit=10).changes) == 4
+
+
+def test_get_changes_follows_the_transaction_order(session: Session) -> None:
+    # Stamped earlier by a transaction that committed later: still read after the cursor
+    late = SyncLog(entity_type="category", entity_id=uuid.uuid4(), action="update", timestamp=T0, txid=20)
+    session.add(SyncLog(entity_type="category", entity_id=uuid.uuid4(), action="update", timestamp=T0 + timedelta(seconds=5), txid=10))
+    session.commit()
+
+    first = get_changes(session, START_CURSOR, None, limit=10)
+    assert first.cursor.txid == 10
+    session.add(late)
+    session.commit()
+    assert [change[1] for change in get_changes(session, first.cursor, None, limit=10).changes] == [late.entity_id]
+
+
+def test_cursor_without_txid_is_accepted() -> None:
+    entity_id = uuid.uuid4()
+    legacy = base64.urlsafe_b64encode(f"{T0.isoformat()}|{entity_id}".encode()).decode().rstrip("=")
+    assert Cursor.decode(legacy) == Cursor(0, T0, entity_id)
+
+
+def test_cursor_rejects_garbage() -> None:
+    with pytest.raises(ValueError):
+        Cursor.decode("not a cursor")
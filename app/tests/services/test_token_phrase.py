@@ -0,0 +1,68 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import token_phrase
+
+RESPONSE = """```
+Frase originale: io mangiare mela
+Frase corretta: Io mangio la mela
+
+Mappatura invertita:
+io: Io
+mangiare: mangio
+mela: la mela
+```"""
+
+
+class FakeCompletions:
+    def __init__(self) -> None:
+        self.calls: list = []
+        self.response = RESPONSE
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        message = SimpleNamespace(content=self.response)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+@pytest.fixture
+def fake_client(monkeypatch: pytest.MonkeyPatch) -> FakeCompletions:
+    completions = FakeCompletions()
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    monkeypatch.setattr(token_phrase, "_get_async_client", lambda: client)
+    token_phrase.phrase_cache.clear()
+    yield completions
+    token_phrase.phrase_cache.clear()
+
+
+def test_atoken_2_phrase_is_memoized(fake_client: FakeCompletions) -> None:
+    first = asyncio.run(token_phrase.atoken_2_phrase("io mangiare mela", "it"))
+    second = asyncio.run(token_phrase.atoken_2_phrase("io mangiare mela", "it"))
+
+    assert first == second
+    assert first["converted_sentence"] == "Io mangio la mela"
+    assert first["mapping"] == {"io": "Io", "mangiare": "mangio", "mela": "la mela"}
+    assert len(fake_client.calls) == 1
+
+    # Another language is another entry
+    asyncio.run(token_phrase.atoken_2_phrase("io mangiare mela", "en"))
+    assert len(fake_client.calls) == 2
+
+
+def test_unparsed_response_is_not_memoized(fake_client: FakeCompletions) -> None:
+    fake_client.response = "Non ho capito la frase."
+    first = asyncio.run(token_phrase.atoken_2_phrase("io mangiare mela", "it"))
+    assert first["converted_sentence"] == "" and first["mapping"] == {}
+
+    fake_client.response = RESPONSE
+    second = asyncio.run(token_phrase.atoken_2_phrase("io mangiare mela", "it"))
+    assert second["converted_sentence"] == "Io mangio la mela"
+    assert len(fake_client.calls) == 2
+
+
+def test_atoken_2_phrase_rejects_unsupported_language(fake_client: FakeCompletions) -> None:
+    with pytest.raises(ValueError):
+        asyncio.run(token_phrase.atoken_2_phrase("io mangiare mela", "xx"))
+    assert fake_client.calls == []
@@ -0,0 +1,95 @@
+import asyncio
+import json
+from collections.abc import Iterator
+from typing import Any
+
+import pytest
+
+from app.core.llm_clients import LLMClients
+from app.services.circuit_breaker import get_breaker
+from app.services.local_tokenizer import local_tokenizer
+from app.services.tokenizer import TextTokenizer, pack_batches, parse_batch_response
+from app.tests.utils.openai_stub import OpenAIStub
+
+
+def test_pack_batches_respects_the_budget() -> None:
+    items = list(enumerate(["parola " * 10] * 10))
+
+    batches = pack_batches(items, token_budget=60, max_items=100)
+
+    assert [len(batch) for batch in batches] == [2, 2, 2, 2, 2]
+    assert [item for batch in batches for item in batch] == items
+    assert len(pack_batches(items, token_budget=10_000, max_items=4)) == 3
+
+
+def test_parse_batch_response_keeps_only_valid_items() -> None:
+    response = json.dumps({"results": [
+        {"index": 0, "tokens": [{"origin": "mela", "token": "mela"}]},
+        {"index": 1, "tokens": "mela"},
+        {"index": 7, "tokens": []},
+    ]})
+
+    assert parse_batch_response(response, {0, 1}) == {0: [{"origin": "mela", "token": "mela"}]}
+    assert parse_batch_response("not json", {0}) == {}
+
+
+class BatchResponder:
+    """Tokenizes by words, dropping the sentences containing "skip" the first time."""
+
+    def __init__(self) -> None:
+        self.batches: list[list[int]] = []
+
+    def __call__(self, messages: list[dict[str, Any]]) -> str:
+        items = json.loads(messages[-1]["content"])
+        self.batches.append([item["index"] for item in items])
+        first_call = len(self.batches) == 1
+        return json.dumps({"results": [
+            {"index": item["index"], "tokens": [{"origin": w, "token": w} for w in item["sentence"].split()]}
+            for item in items
+            if not (first_call and "skip" in item["sentence"])
+        ]})
+
+
+@pytest.fixture
+def responder() -> BatchResponder:
+    return BatchResponder()
+
+
+@pytest.fixture
+def tokenizer(responder: BatchResponder) -> Iterator[TextTokenizer]:
+    with OpenAIStub(responder=responder) as stub:
+        clients = LLMClients(base_url=stub.base_url)
+        tokenizer = TextTokenizer("sk-test")
+        tokenizer.client = clients.client("sk-test")
+        yield tokenizer
+        asyncio.run(clients.aclose())
+
+
+def test_tokenize_batch_packs_sentences_and_retries_failed_items(
+    tokenizer: TextTokenizer, responder: BatchResponder
+) -> None:
+    sentences = ["io mangio mela", "skip questa frase", "io mangio mela", "vado a scuola"]
+
+    results = tokenizer.tokenize_batch(sentences, "it")
+
+    assert [result["sentence"] for result in results] == sentences
+    assert [token["token"] for token in results[1]["tokens"]] == ["skip", "questa", "frase"]
+    assert results[0]["tokens"] == results[2]["tokens"]
+    # One request for the 3 distinct sentences, one retry for the dropped one
+    assert responder.batches == [[0, 1, 2], [1]]
+
+
+def test_tokenize_answers_with_the_local_tokenizer_when_the_result_is_not_a_list() -> None:
+    # Valid JSON, not an error payload, but not a list of tokens either
+    with OpenAIStub(responder=lambda messages: json.dumps({"frase": "io mangio la mela"})) as stub:
+        clients = LLMClients(base_url=stub.base_url)
+        tokenizer = TextTokenizer("sk-test")
+        tokenizer.client = clients.client("sk-test")
+        fallbacks = get_breaker("tokenizer").counters["fallbacks"]
+
+        result = tokenizer.tokenize("io mangio la mela", "it")
+
+        asyncio.run(clients.aclose())
+
+    assert result == local_tokenizer.tokenize("io mangio la mela", "it")
+    assert get_breaker("tokenizer").counters["fallbacks"] == fallbacks + 1
@@ -0,0 +1,45 @@
+from app.services.word_dictionary import WordDictionary, compile_dictionary, dictionary_path, load_dictionary
+
+WORDS = ["casa", "case", "caso", "cassa", "causa", "mela", "mele", "melone", "perché", "a", "casa", ""]
+
+
+def levenshtein(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(current[j - 1] + 1, previous[j] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def test_membership_and_prefix() -> None:
+    dictionary = WordDictionary(compile_dictionary(WORDS))
+    assert len(dictionary) == 10
+    assert "casa" in dictionary
+    assert "perché" in dictionary
+    assert "cas" not in dictionary
+    assert "" not in dictionary
+    assert dictionary.with_prefix("cas") == ["casa", "case", "caso", "cassa"]
+    assert dictionary.with_prefix("cas", limit=2) == ["casa", "case"]
+    assert dictionary.with_prefix("x") == []
+
+
+def test_similar_matches_brute_force() -> None:
+    dictionary = WordDictionary(compile_dictionary(WORDS))
+    for word in ("casa", "csa", "mlone", "perche", "zzz", "a"):
+        for max_distance in (0, 1, 2):
+            expected = {(w, levenshtein(word, w)) for w in set(WORDS) if w and levenshtein(word, w) <= max_distance}
+            found = dictionary.similar(word, max_distance)
+            assert set(found) == expected
+            assert [distance for _, distance in found] == sorted(distance for _, distance in found)
+
+
+def test_non_latin_words_use_utf8(tmp_path) -> None:
+    (tmp_path / "dizionario_xx.txt").write_text("мама\nмать\ncasa\n", encoding="utf-8")
+    dictionary = load_dictionary("xx", directory=str(tmp_path))
+    assert (tmp_path / "dizionario_xx.dic").exists()
+    assert "мама" in dictionary
+    assert [word for word, _ in dictionary.similar("мамa", 2)] == ["мама"]
+    assert load_dictionary("yy", directory=str(tmp_path)) is None
+    assert dictionary_path(str(tmp_path / "dizionario_xx.txt")).endswith(".dic")
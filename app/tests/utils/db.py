@@ -0,0 +1,38 @@
+from collections.abc import Iterator
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel
+
+import app.models  # noqa: F401  (registers every table in SQLModel.metadata)
+
+
+def create_sqlite_engine() -> Engine:
+    """
+    In-memory SQLite database with every table, so that the flush listeners
+    writing other tables (SyncLog, CatalogVersion) find them. A single
+    connection is shared with the threadpool of the sync routes.
+    """
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def engine() -> Iterator[Engine]:
+    """
+    Fresh database of a test. Load the fixtures in the test module with:
+
+        pytest_plugins = ["app.tests.utils.db"]
+    """
+    engine = create_sqlite_engine()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session(engine: Engine) -> Iterator[Session]:
+    with Session(engine) as session:
+        yield session
@@ -0,0 +1,177 @@
+"""
+Local stub of the OpenAI chat completions API, for offline tests and benchmarks.
+
+The server speaks HTTP/1.1 with keep-alive and counts the TCP connections it
+accepts, so the tests can check that the shared clients reuse them. Point the
+clients to it with LLMClients(base_url=stub.base_url) or OPENAI_BASE_URL.
+canned_responder serves fixed answers (the benchmark corpora), the usage of
+each response estimates the tokens as OpenAI would report them.
+
+Run it standalone with:
+    python -m app.tests.utils.openai_stub --port 8089 --latency 0.2
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+
+def default_responder(messages: list[dict[str, Any]]) -> str:
+    # Echo of the user message, enough for the parsers to return something
+    user = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+    return json.dumps({"tokens": [{"origin": word, "token": word} for word in str(user).split()]})
+
+
+def canned_responder(
+    responses: dict[str, str],
+    fallback: Callable[[list[dict[str, Any]]], str] = default_responder,
+) -> Callable[[list[dict[str, Any]]], str]:
+    """
+    Responder answering responses[key] for the longest key found in the user
+    message (the prompts wrap the sentence in an instruction), fallback for
+    the other messages.
+    """
+    keys = sorted(responses, key=len, reverse=True)
+
+    def responder(messages: list[dict[str, Any]]) -> str:
+        user = next((str(m["content"]) for m in reversed(messages) if m.get("role") == "user"), "")
+        for key in keys:
+            if key in user:
+                return responses[key]
+        return fallback(messages)
+
+    return responder
+
+
+def estimate_tokens(text: str) -> int:
+    # About 4 characters per token, as the OpenAI tokenizers on these languages
+    return max(1, len(text) // 4)
+
+
+class OpenAIStub:
+    """
+    Args:
+        responder: Builds the assistant message content from the request messages
+        latency: Seconds waited before each response
+        jitter: Up to this many seconds added at random to the latency, from
+            a generator seeded with seed so that the runs are reproducible
+        port: Port to listen on, 0 for a free one
+    """
+
+    def __init__(
+        self,
+        responder: Callable[[list[dict[str, Any]]], str] = default_responder,
+        latency: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        jitter: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        self.responder = responder
+        self.latency = latency
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _handler_class(self) -> type[BaseHTTPRequestHandler]:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self) -> None:
+                super().setup()
+                # One handler per TCP connection, it serves all its requests
+                with stub._lock:
+                    stub.connections += 1
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with stub._lock:
+                    stub.requests += 1
+                    delay = stub.latency + (stub._random.uniform(0, stub.jitter) if stub.jitter else 0.0)
+                if delay:
+                    time.sleep(delay)
+
+                if not self.path.endswith("/chat/completions"):
+                    self._send(404, {"error": {"message": "not found"}})
+                    return
+                messages = body.get("messages", [])
+                content = stub.responder(messages)
+                prompt_tokens = sum(estimate_tokens(str(m.get("content", ""))) for m in messages)
+                completion_tokens = estimate_tokens(content)
+                self._send(200, {
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "stub"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens,
+                    },
+                })
+
+            def _send(self, status: int, payload: dict[str, Any]) -> None:
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
+
+    def start(self) -> "OpenAIStub":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "OpenAIStub":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stub of the OpenAI chat completions API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds waited before each response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Up to this many seconds added to the latency")
+    args = parser.parse_args()
+
+    stub = OpenAIStub(latency=args.latency, host=args.host, port=args.port, jitter=args.jitter)
+    print(f"OpenAI stub listening on {stub.base_url}")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
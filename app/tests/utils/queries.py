@@ -0,0 +1,23 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from sqlalchemy.engine import Engine
+
+from app.core.query_counter import QueryLog, count_queries
+
+
+@contextmanager
+def assert_max_queries(budget: int, engine=Engine) -> Iterator[QueryLog]:
+    """
+    Fail when the block runs more than budget SQL statements, listing the
+    repeated ones (the N+1 patterns).
+
+        with assert_max_queries(3):
+            client.get(f"{settings.API_V1_STR}/phrases/{phrase_id}")
+    """
+    with count_queries(engine) as queries:
+        yield queries
+    if len(queries) > budget:
+        raise AssertionError(
+            f"{len(queries)} SQL statements, over the budget of {budget}\n{queries.report()}"
+        )
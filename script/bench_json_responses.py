@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+"""
+Compare the JSON serialization of the large list routes: the default FastAPI
+path (response_model validation, dump to dicts, json encoding) against
+app.api.fast_json. Runs on generated data, without a database.
+
+Examples:
+    python script/bench_json_responses.py
+    python script/bench_json_responses.py --phrases 500 --pecs 1000 --repeat 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, List
+
+# Add the parent directory to the path so we can import app modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.api.fast_json import fast_json
+from app.core.config import settings
+from app.models import PECS, PECSRead, PECSTranslation, PhraseRead, PhrasePECSRead, PhraseTranslationRead
+
+
+def make_phrases(count: int, items: int) -> List[PhraseRead]:
+    phrases = []
+    for n in range(count):
+        phrase_id = uuid.uuid4()
+        pecs_items = []
+        for position in range(items):
+            pecs_id = uuid.uuid4()
+            pecs_items.append(PhrasePECSRead(
+                phrase_id=phrase_id,
+                pecs_id=pecs_id,
+                position=position,
+                pecs_info={
+                    "id": pecs_id,
+                    "image_url": f"https://api.arasaac.org/v1/pictograms/{2000 + position}?download=false",
+                    "name": f"parola {position}",
+                    "language_code": "it",
+                },
+            ))
+        phrases.append(PhraseRead(
+            id=phrase_id,
+            created_at=datetime.now(),
+            user_id=uuid.uuid4(),
+            translations=[PhraseTranslationRead(
+                id=uuid.uuid4(), phrase_id=phrase_id, language_code="it", text=f"frase numero {n}"
+            )],
+            pecs_items=pecs_items,
+        ))
+    return phrases
+
+
+def make_pecs(count: int) -> List[PECS]:
+    # ORM objects, as returned by get_pecs_by_language
+    pecs_list = []
+    for n in range(count):
+        pecs = PECS(image_url=f"https://api.arasaac.org/v1/pictograms/{n}?download=false", created_at=datetime.now())
+        pecs.translations = [
+            PECSTranslation(pecs_id=pecs.id, language_code=language, name=f"nome {n}")
+            for language in ("it", "en")
+        ]
+        pecs_list.append(pecs)
+    return pecs_list
+
+
+def default_path(content: Any, response_model: Any) -> bytes:
+    field = create_model_field(name="Response", type_=response_model, mode="serialization")
+    value = asyncio.run(serialize_response(field=field, response_content=content, is_coroutine=False))
+    return JSONResponse(value).body
+
+
+def fast_path(content: Any, response_model: Any) -> bytes:
+    return fast_json(content, response_model).body
+
+
+def timed(function: Callable[[], bytes], repeat: int) -> float:
+    function()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the JSON serialization of the list routes")
+    parser.add_argument("--phrases", type=int, default=100, help="Phrases in the response")
+    parser.add_argument("--items", type=int, default=6, help="PECS per phrase")
+    parser.add_argument("--pecs", type=int, default=1000, help="PECS in the response")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    # Opt-in in the app: measured here whatever the environment says
+    settings.FAST_JSON_RESPONSES = True
+
+    cases = [
+        (f"{args.phrases} phrases", make_phrases(args.phrases, args.items), List[PhraseRead]),
+        (f"{args.pecs} PECS", make_pecs(args.pecs), List[PECSRead]),
+    ]
+    for name, content, response_model in cases:
+        # Same document, only the whitespace differs
+        assert json.loads(default_path(content, response_model)) == json.loads(fast_path(content, response_model))
+        default = timed(lambda: default_path(content, response_model), args.repeat)
+        fast = timed(lambda: fast_path(content, response_model), args.repeat)
+        print(f"{name}: default {default * 1000:.2f} ms, fast_json {fast * 1000:.2f} ms ({default / fast:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+"""
+Compile the spelling dictionaries (dizionario_<lang>.txt) into the .dic files read by the API.
+
+The API also builds a missing or outdated .dic file on first use; run this
+at deploy time when the source directory is read-only for the app.
+
+Examples:
+    python script/build_dictionaries.py
+    python script/build_dictionaries.py --directory app/services/dizionari
+"""
+import argparse
+import glob
+import os
+import sys
+
+# Add the parent directory to the path so we can import app modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.word_dictionary import DICTIONARY_DIR, WordDictionary, build_dictionary_file
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compile the spelling dictionaries")
+    parser.add_argument("--directory", default=DICTIONARY_DIR, help="Directory containing the dizionario_*.txt files")
+    args = parser.parse_args()
+
+    text_paths = sorted(glob.glob(os.path.join(args.directory, "dizionario_*.txt")))
+    if not text_paths:
+        sys.exit(f"Error: no dizionario_*.txt files found in '{args.directory}'")
+    for text_path in text_paths:
+        path = build_dictionary_file(text_path)
+        words = len(WordDictionary.open(path))
+        print(f"{os.path.basename(path)}: {words} words, {os.path.getsize(path)} bytes "
+              f"(text {os.path.getsize(text_path)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+"""
+Build the semantic pictogram index of a language from static word vectors.
+
+The vectors are read from a fastText/word2vec .vec text file, for example
+https://fasttext.cc/docs/en/crawl-vectors.html (cc.it.300.vec). The names come
+from the pecs_translations table, custom pictograms excluded. Requires numpy (pip install numpy).
+
+Examples:
+    python script/build_embedding_index.py --language it --vectors cc.it.300.vec
+    python script/build_embedding_index.py --language en --vectors cc.en.300.vec --max-vocab 100000
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add the parent directory to the path so we can import app modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlmodel import Session
+
+from app.core.db import engine
+from app.services.embedding_index import (
+    DEFAULT_INDEX_DIR, build_index, load_index_items, load_word_vectors, np, tokenize_words
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the semantic pictogram index of a language")
+    parser.add_argument("--language", required=True)
+    parser.add_argument("--vectors", required=True, help="Word vectors in .vec text format")
+    parser.add_argument("--max-vocab", type=int, default=50000, help="Most frequent words kept for the queries")
+    parser.add_argument("--output-dir", default=DEFAULT_INDEX_DIR)
+    args = parser.parse_args()
+
+    if np is None:
+        sys.exit("numpy is required to build the index: pip install numpy")
+
+    start = time.time()
+    with Session(engine) as session:
+        items = load_index_items(session, args.language)
+    print(f"{len(items)} {args.language} names")
+
+    # The words of the names are always in the vocabulary
+    required = {word for _, name in items for word in tokenize_words(name)}
+    words, vectors = load_word_vectors(args.vectors, max_words=args.max_vocab, required=required)
+    print(f"{len(words)} word vectors of dimension {vectors.shape[1]}")
+
+    indexed = build_index(items, words, vectors, args.output_dir, args.language)
+    print(f"{indexed} names indexed in {args.output_dir} ({time.time() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+"""
+Build the lemma tables (app/data/lemmi/<lang>.tsv) used by to_singolare.
+
+The tables are generated from the pictogram lexicon and filtered with the
+bundled dictionaries (see app/services/lemmas.py); the languages without a
+dictionary get no table. Run it again after the lexicon or the dictionary
+files change.
+
+Examples:
+    python script/build_lemmas.py
+    python script/build_lemmas.py --languages it es
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add the parent directory to the path so we can import app modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.lemmas import LANGUAGES, LEMMA_DIR, build_lemma_table, load_dictionary, load_lexicon, write_lemma_file
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the lemma tables from the pictogram lexicon")
+    parser.add_argument("--languages", nargs="+", default=list(LANGUAGES), choices=LANGUAGES)
+    parser.add_argument("--output-dir", default=LEMMA_DIR)
+    args = parser.parse_args()
+
+    for language in args.languages:
+        start = time.time()
+        path = os.path.join(args.output_dir, f"{language}.tsv")
+        dictionary = load_dictionary(language)
+        if dictionary is None:
+            # A stale table would still override the rules of to_singolare
+            if os.path.exists(path):
+                os.remove(path)
+            print(f"{language}: no dictionary, skipped")
+            continue
+        table = build_lemma_table(load_lexicon(language), language, dictionary)
+        write_lemma_file(table, path)
+        forms = sum(len(f) for f in table.values())
+        print(f"{language}: {len(table)} base forms, {forms} inflected forms -> {path} in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
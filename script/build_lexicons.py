@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+"""
+Compile the *_pittogrammi.json lexicons into the binary .lex files read by the API.
+
+The API also builds a missing or outdated .lex file on first use; run this
+at deploy time when the data directory is read-only for the app.
+
+Examples:
+    python script/build_lexicons.py
+    python script/build_lexicons.py --directory app/data
+"""
+import argparse
+import glob
+import os
+import sys
+
+# Add the parent directory to the path so we can import app modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.lexicon import Lexicon, build_lexicon_file
+
+DEFAULT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app", "data")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compile the pictogram lexicons")
+    parser.add_argument("--directory", default=DEFAULT_DIRECTORY, help="Directory containing the *_pittogrammi.json files")
+    args = parser.parse_args()
+
+    json_paths = sorted(glob.glob(os.path.join(args.directory, "*_pittogrammi.json")))
+    if not json_paths:
+        sys.exit(f"Error: no *_pittogrammi.json files found in '{args.directory}'")
+    for json_path in json_paths:
+        path = build_lexicon_file(json_path)
+        entries = len(Lexicon.open(path))
+        print(f"{os.path.basename(path)}: {entries} entries, {os.path.getsize(path)} bytes "
+              f"(JSON {os.path.getsize(json_path)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+"""
+Build the catalog snapshots served by /sync/snapshot/{language}.
+
+The API rebuilds them in the background after the catalog changes; run this
+after a deploy or a bulk import to have them ready before the first request.
+zstd snapshots are built only when zstandard is installed.
+
+Examples:
+    python script/build_snapshots.py
+    python script/build_snapshots.py --language it --language en
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add the parent directory to the path so we can import app modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlmodel import Session
+
+from app.core.db import engine
+from app.services.catalog_snapshot import snapshot_dir, snapshot_languages, write_snapshot
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the per-language catalog snapshots")
+    parser.add_argument("--language", action="append", help="Language to build, repeatable (default: all)")
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        languages = args.language or snapshot_languages(session)
+        for language in languages:
+            start = time.time()
+            manifest = write_snapshot(session, language)
+            sizes = ", ".join(f"{encoding} {entry['size']} bytes" for encoding, entry in manifest["files"].items())
+            print(f"{language}: {sizes} ({time.time() - start:.1f}s)")
+    print(f"Snapshots written to {snapshot_dir()}")
+
+
+if __name__ == "__main__":
+    main()
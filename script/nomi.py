@@ -1,107 +1,88 @@
+#!/usr/bin/env python
+"""
+Import the *_pittogrammi.json lexicon files into the nome table.
+
+Languages are processed in parallel worker processes. Each worker streams its
+file and writes through its own database connection with batched multi-row
+inserts, so peak memory is bounded by the number of workers and not by the
+number of languages.
+
+Examples:
+    python script/nomi.py --directory app/data
+    python script/nomi.py --directory app/data --languages it en --workers 2
+    python script/nomi.py --directory app/data --sync
+"""
+import argparse
+import multiprocessing
 import os
-import json
+import sys
 import time
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Add the parent directory to the path so we can import app modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.config import settings
+from app.services.pictogram_import import find_language_files, import_nomi_file
+
 
-# Configurazione del database
-DB_USER = "postgres"
-DB_PASSWORD = "root"
-#DB_HOST = "localhost"
-DB_HOST_local = "host.docker.internal" # host.docker.internal dal container, localhost dalla macchina host
-DB_PORT = "5432"
-DB_NAME = "pecs"
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Parallel multi-language import of the nome table")
+    parser.add_argument("--directory", default="./data", help="Directory containing the *_pittogrammi.json files")
+    parser.add_argument("--languages", nargs="*", help="Languages to import (default: all the files found)")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1), help="Number of worker processes")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows per INSERT statement")
+    parser.add_argument("--sync", action="store_true", help="Diff against the table instead of appending rows")
+    parser.add_argument("--database-url", default=str(settings.SQLALCHEMY_DATABASE_URI), help="Database URL")
+    args = parser.parse_args()
 
-# Connessione al database (SQLAlchemy 2.0 style)
-DATABASE_URL = f"postgresql+psycopg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    if not os.path.isdir(args.directory):
+        print(f"Error: directory '{args.directory}' does not exist")
+        sys.exit(1)
 
-def process_json_files(directory):
-    """
-    Processa tutti i file JSON nella directory specificata utilizzando
-    inserimenti diretti nel database per massima velocità
-    """
-    all_items = []
-    
-    # Prima raccogliamo tutti gli elementi da tutti i file
-    for filename in os.listdir(directory):
-        if filename.endswith("_pittogrammi.json"):
-            lang = filename.split("_")[0]
-            file_path = os.path.join(directory, filename)
-            
-            with open(file_path, 'r', encoding='utf-8') as file:
-                data = json.load(file)
-            
-            for item in data:
-                # Salta gli elementi con nome None o vuoto
-                if item.get("nome") is None or item.get("nome") == "":
-                    continue
-                if item["nome"]:    
-                    all_items.append({
-                        "pictogram_id": item["id"],
-                        "name": item["nome"],
-                        "lang": lang
-                    })
-                    
-    
-    total_items = len(all_items)
-    print(f"Trovati {total_items} elementi da processare")
-    
-    # Crea la connessione al database (SQLAlchemy 2.0 style)
-    engine = create_engine(DATABASE_URL)
-    
-    # Ora processiamo tutti gli elementi in una singola transazione
-    successes = 0
+    files = find_language_files(args.directory, args.languages)
+    if not files:
+        print(f"Error: no *_pittogrammi.json files found in '{args.directory}'")
+        sys.exit(1)
+
+    workers = max(1, min(args.workers, len(files)))
+    print(f"Importing {len(files)} languages ({', '.join(files)}) with {workers} workers")
+
+    start_time = time.perf_counter()
+    total_rows = 0
     failures = 0
-    start_time = time.time()
-    
-    # Costruisci la query di inserimento
-    # Ignora i duplicati (ON CONFLICT DO NOTHING)
-    query = text("""
-        INSERT INTO nome (pictogram_id, name, lang)
-        VALUES (:pictogram_id, :name, :lang)
-        ON CONFLICT DO NOTHING
-    """)
-    
-    # Esegui la query per ogni elemento in transazioni separate
-    for i, item in enumerate(all_items):
-        # Crea una nuova sessione per ogni elemento
-        with Session(engine) as session:
+
+    # spawn: workers start from a clean interpreter and never inherit the parent's connections
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        futures = {
+            executor.submit(import_nomi_file, file_path, language, args.database_url, args.batch_size, args.sync): language
+            for language, file_path in files.items()
+        }
+        for future in as_completed(futures):
+            language = futures[future]
             try:
-                # Esegui la query
-                session.execute(query, item)
-                # Commit immediatamente
-                session.commit()
-                successes += 1
-            except SQLAlchemyError as e:
+                stats = future.result()
+            except Exception as e:
                 failures += 1
-                print(f"Errore durante l'inserimento di {item}: {str(e)}")
-                # Non è necessario il rollback esplicito, la sessione farà rollback automaticamente
-        
-        # Mostra il progresso ogni 100 elementi
-        if (i + 1) % 100 == 0 or i + 1 == total_items:
-            percent_complete = ((i + 1) / total_items) * 100
-            print(f"Progresso: {i + 1}/{total_items} elementi ({percent_complete:.1f}%)")
-    
-    end_time = time.time()
-    elapsed_time = end_time - start_time
-    
-    print(f"\nElaborazione completata in {elapsed_time:.2f} secondi")
-    print(f"Elementi processati con successo: {successes}/{total_items}")
-    print(f"Elementi falliti: {failures}/{total_items}")
-    print(f"Velocità media: {successes/elapsed_time:.2f} elementi/secondo")
+                print(f"{language}: failed: {str(e)}")
+                continue
+
+            total_rows += stats.rows
+            print(
+                f"{language}: {stats.rows} rows written in {stats.batches} batches, "
+                f"{stats.skipped} unchanged, {stats.elapsed:.2f}s "
+                f"({stats.rows_per_second:.0f} rows/s, peak memory {stats.peak_memory_kb / 1024:.1f} MB)"
+            )
+
+    elapsed = time.perf_counter() - start_time
+    throughput = total_rows / elapsed if elapsed > 0 else 0
+    print(f"\nImport completed in {elapsed:.2f} seconds")
+    print(f"Rows written: {total_rows} ({throughput:.0f} rows/s)")
+    if failures:
+        print(f"Failed languages: {failures}")
+        sys.exit(1)
 
 
-# Esempio di utilizzo
 if __name__ == "__main__":
-    # Specifica la directory dove sono presenti i file JSON
-    json_directory = "./data"  # Modifica questo percorso se necessario
-    
-    # Verifica se la directory esiste
-    if not os.path.exists(json_directory):
-        print(f"La directory {json_directory} non esiste. Creazione...")
-        os.makedirs(json_directory)
-        print(f"Creata la directory {json_directory}. Inserisci i file JSON e riavvia lo script.")
-    else:
-        # Processa i file
-        process_json_files(json_directory)
+    main()
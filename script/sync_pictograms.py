@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+"""
+Incrementally synchronise the pictogram catalog with a new Arasaac dump.
+
+Each file is diffed against the database using per-pictogram content hashes
+and only the changed pictograms are written.
+
+Examples:
+    # Sync the PECS catalog from Arasaac dumps (it.json, en.json, ...)
+    python script/sync_pictograms.py script/pictograms/*.json
+
+    # Sync the nome table from the bundled lexicon files
+    python script/sync_pictograms.py --nomi app/data/*_pittogrammi.json
+
+    # Only show what would change
+    python script/sync_pictograms.py --dry-run script/pictograms/it.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+# Add the parent directory to the path so we can import app modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlmodel import Session
+
+from app.core.db import engine
+from app.services.pictogram_sync import record_from_item, sync_nomi, sync_pictograms
+
+
+def language_from_filename(file_path: str) -> str:
+    """Extract the language code from 'it.json' or 'it_pittogrammi.json'."""
+    filename = os.path.basename(file_path)
+    return os.path.splitext(filename)[0].split("_")[0]
+
+
+def load_records(file_path: str) -> list:
+    with open(file_path, "r", encoding="utf-8") as f:
+        items = json.load(f)
+    if isinstance(items, dict):
+        items = [items]
+    records = (record_from_item(item) for item in items)
+    return [record for record in records if record is not None]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Incremental pictogram sync driven by content hashes")
+    parser.add_argument("files", nargs="+", help="JSON files to sync, one per language")
+    parser.add_argument("--lang", help="Language code (default: taken from the file name)")
+    parser.add_argument("--nomi", action="store_true", help="Sync the nome table instead of the PECS catalog")
+    parser.add_argument("--dry-run", action="store_true", help="Compute the changes without writing them")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    for file_path in args.files:
+        if not os.path.isfile(file_path):
+            print(f"Error: file '{file_path}' not found")
+            sys.exit(1)
+
+        language = args.lang or language_from_filename(file_path)
+        records = load_records(file_path)
+
+        with Session(engine) as session:
+            if args.nomi:
+                result = sync_nomi(session, records, language, dry_run=args.dry_run)
+            else:
+                result = sync_pictograms(session, records, language, dry_run=args.dry_run)
+
+        prefix = "[dry-run] " if result.dry_run else ""
+        print(
+            f"{prefix}{language}: {result.inserted} inserted, {result.updated} updated, "
+            f"{result.deleted} deleted, {result.unchanged} unchanged ({result.elapsed:.2f}s)"
+        )
+
+    print(f"Sync completed in {time.time() - start_time:.2f} seconds")
+
+
+if __name__ == "__main__":
+    main()